@@ -68,15 +68,17 @@ echo [Step 6/6] Installing required packages...
 echo    This may take 5-10 minutes...
 echo.
 pip install flask==2.3.2 --quiet
-echo    [1/5] Flask installed
+echo    [1/6] Flask installed
 pip install flask-cors==4.0.0 --quiet
-echo    [2/5] Flask-CORS installed
+echo    [2/6] Flask-CORS installed
 pip install pillow==10.0.0 --quiet
-echo    [3/5] Pillow installed
+echo    [3/6] Pillow installed
 pip install numpy==1.24.3 --quiet
-echo    [4/5] NumPy installed
+echo    [4/6] NumPy installed
 pip install requests==2.31.0 --quiet
-echo    [5/5] Requests installed
+echo    [5/6] Requests installed
+pip install waitress==2.1.2 --quiet
+echo    [6/6] Waitress (production server) installed
 
 if errorlevel 1 (
     color 0C
@@ -98,6 +100,7 @@ echo                  ✅ INSTALLATION COMPLETE!
 echo ════════════════════════════════════════════════════════════
 echo.
 echo 🚀 TO RUN: Double-click RUN.bat
+echo 🏭 PRODUCTION: Double-click SERVE.bat
 echo 🌐 ACCESS: http://localhost:5000
 echo.
 pause
\ No newline at end of file
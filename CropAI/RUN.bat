@@ -21,6 +21,7 @@ echo.
 REM Auto-open browser
 start http://localhost:5000
 
+set APP_ENV=development
 python app.py
 
 if errorlevel 1 (
@@ -0,0 +1,30 @@
+@echo off
+color 0B
+title AI Crop Recommendation System - Production Server
+
+echo.
+echo ════════════════════════════════════════════════════════════
+echo      🌾 AI CROP RECOMMENDATION SYSTEM (PRODUCTION) 🌾
+echo ════════════════════════════════════════════════════════════
+echo.
+
+cd backend
+call venv\Scripts\activate.bat
+
+set APP_ENV=production
+echo [*] Starting production server (waitress)...
+echo ✅ Server starting on: http://localhost:5000
+echo 💡 Press Ctrl+C to stop the server
+echo.
+
+python serve.py
+
+if errorlevel 1 (
+    color 0C
+    echo.
+    echo [ERROR] Server failed to start!
+    echo Make sure you ran INSTALL.bat first
+    echo.
+)
+
+pause
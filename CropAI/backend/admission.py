@@ -0,0 +1,230 @@
+"""
+Admission control for AI Crop Recommendation System
+
+Two checks run before an analysis request touches its image:
+
+1. A token bucket per client (a configured API key, or the address when
+   the request has none; unknown keys are ignored so they cannot be
+   rotated to get fresh buckets):
+   RATE_LIMIT_PER_MINUTE tokens a minute, up to RATE_LIMIT_BURST saved
+   up. A request costing more than the burst (a large batch) is let in
+   on a full bucket and leaves it in debt, so it is still charged in
+   full. Too few tokens means 429 with Retry-After set to when enough
+   will have arrived.
+2. A limit on analyses in progress in this process. Each one can hold a
+   decoded image of up to MAX_DECODE_PIXELS (see uploads.py), so the
+   number of slots is derived from available memory, shared between the
+   WEB_WORKERS processes, unless ADMISSION_MAX_CONCURRENT is set. With
+   every slot taken the request gets 503 at once instead of queueing
+   until the process runs out of memory.
+
+Buckets live in process memory by default. With RATE_LIMIT_STORE =
+'sqlite' they are kept in one SQLite file that every worker process
+shares, and each check is a single atomic UPSERT.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Upload spool held in memory per request by werkzeug
+UPLOAD_SPOOL_BYTES = 500 * 1024
+
+# features.STRIP_ROWS, repeated so that sizing the analysis slots at
+# startup does not import NumPy and Pillow
+STRIP_ROWS = 128
+
+
+class MemoryRateLimiter:
+    """Token buckets in a dict; only this process sees them"""
+
+    def __init__(self, rate, burst, max_clients=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client -> (tokens, updated), least recent first
+        self._lock = threading.Lock()
+
+    def acquire(self, client, cost=1):
+        """
+        Take `cost` tokens from a client's bucket (going into debt above the burst)
+        Returns: (allowed, seconds until enough tokens would be available)
+        """
+        needed = min(cost, self.burst)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= needed
+            if allowed:
+                tokens -= cost
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (needed - tokens) / self.rate
+
+
+class SQLiteRateLimiter:
+    """Token buckets in a SQLite file shared by every server process"""
+
+    # Delete buckets that have refilled completely at most this often (seconds)
+    PRUNE_INTERVAL = 60
+
+    def __init__(self, path, rate, burst):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self._local = threading.local()
+        self._last_prune = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_buckets '
+                '(client TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+
+    def acquire(self, client, cost=1):
+        """
+        Take `cost` tokens from a client's bucket (going into debt above the burst)
+        Returns: (allowed, seconds until enough tokens would be available)
+        """
+        needed = min(cost, self.burst)
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            # Refill and take in one statement; the update is skipped when short
+            allowed = conn.execute(
+                'INSERT INTO rate_buckets (client, tokens, updated_at) VALUES (:client, :burst - :cost, :now) '
+                'ON CONFLICT(client) DO UPDATE SET '
+                '    tokens = min(:burst, tokens + (:now - updated_at) * :rate) - :cost, updated_at = :now '
+                'WHERE min(:burst, tokens + (:now - updated_at) * :rate) >= :needed',
+                {'client': client, 'burst': self.burst, 'rate': self.rate, 'cost': cost, 'needed': needed,
+                 'now': now}
+            ).rowcount == 1
+        if now - self._last_prune > self.PRUNE_INTERVAL:
+            self._prune(now)
+        if allowed:
+            return True, 0.0
+        row = conn.execute('SELECT tokens, updated_at FROM rate_buckets WHERE client = ?', (client,)).fetchone()
+        tokens = min(self.burst, row[0] + (now - row[1]) * self.rate) if row else self.burst
+        return False, max(needed - tokens, 0.0) / self.rate
+
+    def _prune(self, now):
+        """Forget buckets that are full again (the same as having no bucket); debts are kept"""
+        self._last_prune = now
+        with self._connection() as conn:
+            conn.execute('DELETE FROM rate_buckets WHERE tokens + (? - updated_at) * ? >= ?',
+                         (now, self.rate, self.burst))
+
+    def _connection(self):
+        """One connection per thread (and per process after a fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class ConcurrencyLimiter:
+    """A fixed number of analysis slots; acquiring never waits longer than asked"""
+
+    def __init__(self, slots):
+        self.slots = slots
+        self._semaphore = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+        self.in_use = 0
+
+    def acquire(self, timeout=0):
+        """Take a slot; returns False if none frees up within timeout seconds (None waits for one)"""
+        if timeout is None:
+            acquired = self._semaphore.acquire()
+        else:
+            acquired = self._semaphore.acquire(timeout=timeout) if timeout else self._semaphore.acquire(False)
+        if not acquired:
+            return False
+        with self._lock:
+            self.in_use += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_use -= 1
+        self._semaphore.release()
+
+
+def client_key(api_key, address, api_keys):
+    """
+    Bucket name for a client: its API key if it is one of api_keys, else its address
+    Keys are hashed so the store never holds them.
+    """
+    if api_key and api_key in api_keys:
+        return 'key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:32]
+    return f'ip:{address}'
+
+
+def request_memory(config):
+    """Peak memory of one image analysis in bytes (the budget in uploads.py)"""
+    side = config.FEATURE_MAX_SIDE or int(config.MAX_DECODE_PIXELS ** 0.5)
+    return (UPLOAD_SPOOL_BYTES + config.MAX_DECODE_PIXELS * 4 + config.MAX_DECODE_PIXELS
+            + STRIP_ROWS * 2 * side * 48)
+
+
+def available_memory():
+    """Memory this process can still use in bytes (container limit aware), or None if unknown"""
+    candidates = []
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    candidates.append(int(line.split()[1]) * 1024)
+                    break
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/memory.max') as f:
+            limit = f.read().strip()
+        if limit != 'max':
+            with open('/sys/fs/cgroup/memory.current') as f:
+                candidates.append(int(limit) - int(f.read().strip()))
+    except (OSError, ValueError):
+        pass
+    if not candidates:
+        try:
+            candidates.append(os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE'))
+        except (AttributeError, ValueError, OSError):
+            return None
+    return max(0, min(candidates))
+
+
+def analysis_slots(config):
+    """
+    Concurrent analyses allowed per process: ADMISSION_MAX_CONCURRENT, or
+    this process's share of what the memory budget fits
+    The budget is measured once, often in a preloaded master, and every
+    one of the WEB_WORKERS processes forked from it gets the same count.
+    """
+    if config.ADMISSION_MAX_CONCURRENT:
+        return config.ADMISSION_MAX_CONCURRENT
+    memory = available_memory()
+    if memory is None:
+        return config.ADMISSION_DEFAULT_CONCURRENT
+    budget = memory * config.ADMISSION_MEMORY_FRACTION / max(1, config.WEB_WORKERS)
+    return max(1, int(budget // request_memory(config)))
+
+
+def create_rate_limiter(config):
+    """Build the rate limiter selected by config.RATE_LIMIT_STORE (None disables it)"""
+    if not config.RATE_LIMIT_STORE or not config.RATE_LIMIT_PER_MINUTE:
+        return None
+    rate = config.RATE_LIMIT_PER_MINUTE / 60.0
+    if config.RATE_LIMIT_STORE == 'sqlite':
+        return SQLiteRateLimiter(config.RATE_LIMIT_DB_PATH, rate, config.RATE_LIMIT_BURST)
+    if config.RATE_LIMIT_STORE == 'memory':
+        return MemoryRateLimiter(rate, config.RATE_LIMIT_BURST)
+    raise ValueError(f'Unknown RATE_LIMIT_STORE: {config.RATE_LIMIT_STORE}')
@@ -0,0 +1,176 @@
+"""
+Precomputed advisory fragments for AI Crop Recommendation System
+
+Everything in an analysis response after soil classification (the ranked
+crops with their varieties, fertilizer, irrigation and tips) depends only
+on the soil rule, the season and which of a few temperature/rainfall
+thresholds the climate inputs cross. AdvisoryTable enumerates those
+climate buckets from the knowledge base's climate adjustments plus the tip
+thresholds below, builds every (soil rule, season, bucket) fragment once
+when the knowledge base loads, and keeps each one already encoded as JSON.
+A request then does a dictionary lookup, and its response body is a short
+encoded head joined to the stored fragment (see AdvisoryTable.fragment_for).
+
+Fragments are shared between responses and must be treated as read-only.
+"""
+
+from collections import namedtuple
+from itertools import product
+
+from rules import OPERATORS
+from serialization import compact, dumps
+
+# Response keys filled from a fragment, in encoding order
+FRAGMENT_KEYS = ('recommended_crops', 'fertilizer', 'irrigation', 'tips')
+
+# Tip thresholds (mm of annual rainfall, °C)
+LOW_RAINFALL = 600
+HIGH_RAINFALL = 1500
+HIGH_TEMPERATURE = 35
+
+TIP_CONDITIONS = (
+    ('rainfall', '<', LOW_RAINFALL),
+    ('rainfall', '>', HIGH_RAINFALL),
+    ('temperature', '>', HIGH_TEMPERATURE)
+)
+
+CLIMATE_FEATURES = ('temperature', 'rainfall')
+
+# One precomputed fragment. body is the UTF-8 JSON of the FRAGMENT_KEYS
+# members without the surrounding braces; compact is the same members in
+# the compact schema (serialization.py)
+Advisory = namedtuple('Advisory', 'recommended_crops fertilizer irrigation tips body compact')
+
+
+def get_fertilizer_recommendations(soil_type, crop_name):
+    """Get fertilizer recommendations based on soil and crop"""
+    return {
+        'nitrogen': '120 kg/ha',
+        'phosphorus': '60 kg/ha',
+        'potassium': '40 kg/ha',
+        'organic': 'Apply 10 tons/ha of farmyard manure',
+        'timing': {
+            'basal': '50% at sowing',
+            'first_top': '25% at 30 days',
+            'second_top': '25% at 60 days'
+        }
+    }
+
+
+def get_irrigation_advisory(crop_name, season, rainfall):
+    """Get irrigation recommendations"""
+    return {
+        'frequency': 'Every 7-10 days',
+        'method': 'Drip irrigation recommended for water efficiency',
+        'water_requirement': '600-800 mm per season',
+        'critical_stages': [
+            'Germination/Establishment',
+            'Vegetative Growth',
+            'Flowering Stage',
+            'Grain Filling/Maturity'
+        ]
+    }
+
+
+def generate_tips(soil_type, season, temperature, rainfall):
+    """Generate expert tips"""
+    tips = [
+        f"Your {soil_type.lower()} is suitable for multiple crops",
+        "Consider crop rotation to maintain soil fertility",
+        "Monitor weather forecasts regularly for better planning"
+    ]
+
+    if rainfall < LOW_RAINFALL:
+        tips.append("Low rainfall detected - consider drought-resistant crops")
+    elif rainfall > HIGH_RAINFALL:
+        tips.append("High rainfall area - ensure proper drainage")
+
+    if temperature > HIGH_TEMPERATURE:
+        tips.append("High temperature - provide shade and adequate irrigation")
+
+    return tips
+
+
+def build_advisory(engine, soil_index, season, temperature, rainfall, catalog=None):
+    """Compute one fragment from scratch (also the fallback for uncovered inputs)"""
+    result = engine.evaluate(0, 0, 0, 0, 0, temperature, rainfall, soil_index=soil_index)
+    crops = engine.crops_for(result)
+    if catalog is not None:
+        # Varieties of each crop grown in the season (catalog.py); a crop
+        # with none in this season gets no varieties entry at all
+        for crop in crops:
+            varieties = catalog.varieties(crop['name'], season)
+            if varieties:
+                crop['varieties'] = varieties
+    soil_type = engine.soil_types[soil_index]
+    fertilizer = get_fertilizer_recommendations(soil_type, crops[0]['name'])
+    irrigation = get_irrigation_advisory(crops[0]['name'], season, rainfall)
+    tips = generate_tips(soil_type, season, temperature, rainfall)
+    members = dict(zip(FRAGMENT_KEYS, (crops, fertilizer, irrigation, tips)))
+    return Advisory(crops, fertilizer, irrigation, tips, dumps(members)[1:-1], compact(members))
+
+
+class AdvisoryTable:
+    """Every advisory fragment of one knowledge base, keyed by (soil rule, season, climate bucket)"""
+
+    def __init__(self, engine, seasons, catalog=None):
+        self.engine = engine
+        self.catalog = catalog
+        conditions = set(TIP_CONDITIONS)
+        for adjustment in engine.climate_adjustments:
+            conditions.update(tuple(condition) for condition in adjustment['conditions'])
+        self.conditions = tuple(sorted(conditions))
+        # Adjustments on image features would make crops depend on more than
+        # the climate; such knowledge bases are served without precomputation
+        self.complete = all(feature in CLIMATE_FEATURES for feature, _, _ in self.conditions)
+
+        self._fragments = {}
+        self._by_crops = {}
+        if self.complete:
+            for temperature, rainfall in self._representatives():
+                bucket = self.bucket(temperature, rainfall)
+                for soil_index, season in product(range(len(engine.soil_types)), seasons):
+                    key = (soil_index, season, bucket)
+                    if key not in self._fragments:
+                        advisory = build_advisory(engine, soil_index, season, temperature, rainfall, catalog)
+                        self._fragments[key] = advisory
+                        self._by_crops[id(advisory.recommended_crops)] = advisory
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def bucket(self, temperature, rainfall):
+        """Which threshold conditions the climate inputs satisfy"""
+        values = {'temperature': temperature, 'rainfall': rainfall}
+        return tuple(OPERATORS[op](values[feature], threshold) for feature, op, threshold in self.conditions)
+
+    def lookup(self, soil_index, season, temperature, rainfall):
+        """The fragment for a classified sample, built on the spot if not precomputed"""
+        advisory = self._fragments.get((soil_index, season, self.bucket(temperature, rainfall)))
+        if advisory is None:
+            advisory = build_advisory(self.engine, soil_index, season, temperature, rainfall, self.catalog)
+        return advisory
+
+    def fragment_for(self, response):
+        """
+        The Advisory a response was assembled from
+        Returns None if the response's fragment values are not this table's
+        own (built on the spot, edited, or from a reloaded knowledge base).
+        """
+        advisory = self._by_crops.get(id(response.get('recommended_crops')))
+        if advisory is None or any(response.get(key) is not value
+                                   for key, value in zip(FRAGMENT_KEYS, advisory)):
+            return None
+        return advisory
+
+    def _representatives(self):
+        """One (temperature, rainfall) pair inside every reachable bucket"""
+        candidates = {}
+        for feature in CLIMATE_FEATURES:
+            thresholds = sorted({threshold for name, _, threshold in self.conditions if name == feature})
+            values = {thresholds[0] - 1.0, thresholds[-1] + 1.0} if thresholds else {0.0}
+            for low, high in zip(thresholds, thresholds[1:]):
+                values.add((low + high) / 2.0)
+            values.update(thresholds)
+            candidates[feature] = sorted(values)
+        return product(candidates['temperature'], candidates['rainfall'])
@@ -1,33 +1,210 @@
-from flask import Flask, request, jsonify, send_from_directory
+"""
+Flask backend for AI Crop Recommendation System
+
+create_app() builds the application from the configuration chosen by
+APP_ENV. Importing this module loads only Flask and the standard library:
+NumPy, Pillow, the knowledge base, the soil model and the district index
+are imported and loaded by the first request that needs them (or by
+warm_up() when WARM_UP is set, as in production), so /api/health answers
+without them. The services below are module globals set by create_app;
+there is one application per process.
+"""
+
+from flask import (Blueprint, Flask, after_this_request, current_app, request, jsonify,
+                   send_from_directory)
 from flask_cors import CORS
-from PIL import Image
-import numpy as np
 import os
+import sys
 from datetime import datetime
-import io
+from config import Config, get_config
+from cache import ResultCache, bytes_digest, image_digest, make_cache_key
+from pipeline import content_etag, pipeline_fingerprint
+from serialization import (COMPACT_KEYS, JSON, compact, compress, dumps, encode, is_compact,
+                           negotiate)
+import hmac
+from uploads import UploadError, open_upload, stream_size
+from jobs import FAILED, SUCCEEDED, JobQueue, QueueFullError, create_job_store
+from history import build_record, create_history, parse_cursor
+from resumable import create_resumable_uploads
+from text import normalize
+from admission import ConcurrencyLimiter, analysis_slots, client_key, create_rate_limiter
+import functools
+import json
+import logging
+import math
+import time
+from observability import (ADMISSION_REJECTED, ERRORS, IMAGE_BYTES, IMAGE_PIXELS, QUALITY_REJECTED,
+                           REQUEST_SECONDS, REQUESTS, configure_logging, registry, timed)
 
-app = Flask(__name__, static_folder='../frontend')
-CORS(app)
+api = Blueprint('api', __name__)
 
-# Create uploads directory if it doesn't exist
-UPLOAD_FOLDER = '../uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+# Set by create_app
+settings = None
+logger = logging.getLogger('cropai')
+result_cache = job_queue = history = resumable_uploads = rate_limiter = analysis_limiter = None
 
-print("\n" + "="*60)
-print("🌾 AI CROP RECOMMENDATION SYSTEM")
-print("="*60)
-print("✅ Backend initialized successfully!")
-print(f"📁 Upload folder: {os.path.abspath(UPLOAD_FOLDER)}")
-print("="*60 + "\n")
+def create_app(config_name=None):
+    """
+    Build the Flask application
+    config_name: development, production or testing (default: APP_ENV),
+                 or a Config subclass
+    """
+    global settings, logger, result_cache, job_queue, history, resumable_uploads, rate_limiter, analysis_limiter
+    
+    # Configuration class chosen by APP_ENV (development, production, testing)
+    if isinstance(config_name, type):
+        settings = config_name
+    else:
+        settings = get_config(config_name or os.environ.get('APP_ENV', 'development'))
+    logger = configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT == 'json')
+    
+    app = Flask(__name__, static_folder='../frontend')
+    app.config.from_object(settings)
+    # Werkzeug rejects bodies above this before parsing; single-image requests
+    # are additionally held to MAX_CONTENT_LENGTH in analyze_soil
+    app.config['MAX_CONTENT_LENGTH'] = max(settings.MAX_CONTENT_LENGTH, settings.BATCH_MAX_CONTENT_LENGTH)
+    CORS(app, resources={r'/api/*': {}})
+    
+    # Cache of analysis responses keyed by image content and climate inputs
+    result_cache = ResultCache(settings.RESULT_CACHE_MAX_BYTES, settings.RESULT_CACHE_TTL.total_seconds())
+    
+    # Asynchronous analysis jobs (worker threads start on first submit)
+    job_queue = JobQueue(create_job_store(settings), run_analysis_job, settings.JOB_WORKERS,
+                         settings.JOB_MAX_PENDING, settings.JOB_MAX_PENDING_BYTES)
+    
+    # Analysis history, recorded off the request path by a writer thread
+    history = create_history(settings)
+    
+    # Chunked uploads that survive dropped connections
+    resumable_uploads = create_resumable_uploads(settings)
+    
+    # Admission control: per-client rate limit and a cap on analyses in progress
+    rate_limiter = create_rate_limiter(settings)
+    analysis_limiter = ConcurrencyLimiter(analysis_slots(settings))
+    
+    app.register_blueprint(api)
+    
+    logger.info('Backend initialized', extra={
+        'environment': settings.__name__,
+        'analysis_slots': analysis_limiter.slots
+    })
+    if settings.WARM_UP:
+        warm_up()
+    return app
+
+def warm_up():
+    """
+    Import the image and model modules and load the knowledge base, soil
+    model and district index now instead of on the first request
+    """
+    from PIL import Image
+    import batch  # noqa: F401 (features, texture)
+    import regions  # noqa: F401
+    from classifier import reload_model_registry
+    from knowledge import reload_knowledge_base
+    from locations import reload_location_index
+    
+    Image.init()
+    kb = reload_knowledge_base()
+    models = reload_model_registry()
+    locations = reload_location_index()
+    logger.info('Warm-up complete', extra={
+        'knowledge_base_version': kb.version,
+        'soil_model': models.active.label if models.active else 'rules',
+        'locations': len(locations)
+    })
+    for name, error in models.errors.items():
+        logger.warning('Soil model %s could not be loaded: %s', name, error)
+
+def endpoint_label():
+    """Metric label of the current view (its name without the blueprint prefix)"""
+    return (request.endpoint or 'unknown').rpartition('.')[2]
+
+def collect_cache_metrics():
+    """Expose result cache counters in the Prometheus text format"""
+    stats = result_cache.stats()
+    lines = []
+    for name in ('hits', 'misses', 'evictions', 'expirations'):
+        lines.append(f'# TYPE cropai_result_cache_{name}_total counter')
+        lines.append(f'cropai_result_cache_{name}_total {stats[name]}')
+    lines.append('# TYPE cropai_result_cache_bytes gauge')
+    lines.append(f"cropai_result_cache_bytes {stats['bytes']}")
+    return lines
+
+registry.add_collector(collect_cache_metrics)
+
+def collect_admission_metrics():
+    """Expose analysis slot usage in the Prometheus text format"""
+    return [
+        '# TYPE cropai_analysis_slots gauge',
+        f'cropai_analysis_slots {analysis_limiter.slots}',
+        '# TYPE cropai_analysis_in_progress gauge',
+        f'cropai_analysis_in_progress {analysis_limiter.in_use}'
+    ]
+
+registry.add_collector(collect_admission_metrics)
+
+def admission_control(cost=None, limit_concurrency=True):
+    """
+    Turn requests away fast when a client is over its rate or all analysis
+    slots are busy (429 / 503 with Retry-After), before the image is decoded
+    cost() -> tokens the request takes (default 1); limit_concurrency=False
+    skips the slot check for views that only queue work (job workers take a
+    slot when they run it).
+    """
+    def decorate(view):
+        @functools.wraps(view)
+        def admitted(*args, **kwargs):
+            if rate_limiter is not None:
+                address = request.access_route[0] if settings.RATE_LIMIT_TRUST_PROXY else request.remote_addr
+                client = client_key(request.headers.get(settings.API_KEY_HEADER), address, settings.API_KEYS)
+                allowed, retry_after = rate_limiter.acquire(client, cost() if cost else 1)
+                if not allowed:
+                    ADMISSION_REJECTED.inc(endpoint_label(), 'rate_limited')
+                    return jsonify({'error': 'Too many requests. Please slow down.'}), 429, {
+                        'Retry-After': str(max(1, math.ceil(retry_after)))
+                    }
+            if not limit_concurrency:
+                return view(*args, **kwargs)
+            if not analysis_limiter.acquire(settings.ADMISSION_WAIT):
+                ADMISSION_REJECTED.inc(endpoint_label(), 'overloaded')
+                logger.warning('All analysis slots busy', extra={'slots': analysis_limiter.slots})
+                return jsonify({'error': 'Server is busy. Please try again shortly.'}), 503, {
+                    'Retry-After': str(settings.ADMISSION_RETRY_AFTER)
+                }
+            try:
+                return view(*args, **kwargs)
+            finally:
+                analysis_limiter.release()
+        return admitted
+    return decorate
+
+def uploaded_image_count():
+    """Images in a batch request, for its rate limit cost"""
+    return max(1, sum(1 for f in request.files.getlist('soil_images') if f.filename))
+
+@api.before_app_request
+def start_request_timer():
+    """Remember when the request started"""
+    request.environ['cropai.started'] = time.perf_counter()
+
+@api.after_app_request
+def record_request_metrics(response):
+    """Count the request and record its latency"""
+    endpoint = endpoint_label()
+    REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    started = request.environ.get('cropai.started')
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
+    return response
 
 # Serve frontend files
-@app.route('/')
+@api.route('/')
 def index():
     """Serve the main frontend page"""
     return send_from_directory('../frontend', 'index.html')
 
-@app.route('/<path:path>')
+@api.route('/<path:path>')
 def serve_static(path):
     """Serve static files (CSS, JS, images)"""
     try:
@@ -36,7 +213,7 @@ def serve_static(path):
         return send_from_directory('../frontend', 'index.html')
 
 # API: Health check
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     """Check if API is running"""
     return jsonify({
@@ -44,259 +221,948 @@ def health_check():
         'message': '✅ API is running perfectly!',
         'version': '1.0.0',
         'timestamp': datetime.now().isoformat(),
+        'cache': result_cache.stats(),
+        'admission': {'analysis_slots': analysis_limiter.slots, 'in_progress': analysis_limiter.in_use},
+        'model': loaded_model(),
         'endpoints': [
             'GET /api/health',
-            'POST /api/analyze'
+            'GET /api/metrics',
+            'POST /api/analyze',
+            'POST /api/analyze/batch',
+            'POST /api/analyze/regions',
+            'GET /api/uploads/config',
+            'POST /api/uploads',
+            'PATCH /api/uploads/<id>',
+            'GET /api/uploads/<id>',
+            'POST /api/jobs',
+            'GET /api/jobs/<job_id>',
+            'GET /api/history',
+            'GET /api/history/<id>',
+            'GET /api/locations?q=<text>',
+            'GET /api/crops/search?q=<text>',
+            'POST /api/plan'
         ]
     })
 
+def loaded_model():
+    """The soil model in use, without importing the classifier (and NumPy) to find out"""
+    classifier = sys.modules.get('classifier')
+    return classifier.get_model_registry().describe() if classifier else {'active': None, 'loaded': False}
+
+# API: Prometheus metrics
+@api.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Request, stage latency, image size and cache metrics for this process"""
+    return registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@api.app_errorhandler(413)
+def request_too_large(e):
+    """Return upload size errors as JSON"""
+    return jsonify({
+        'error': f'Upload too large (maximum {current_app.config["MAX_CONTENT_LENGTH"] // (1024 * 1024)} MB per request)'
+    }), 413
+
+# API: Reload agronomy knowledge base
+@api.route('/api/admin/reload-knowledge', methods=['POST'])
+def reload_knowledge():
+    """Re-read the knowledge base file and rescan the models folder (requires the X-Admin-Token header)"""
+    from classifier import reload_model_registry
+    from knowledge import reload_knowledge_base
+    token = request.headers.get('X-Admin-Token', '')
+    if not settings.ADMIN_TOKEN or not hmac.compare_digest(token, settings.ADMIN_TOKEN):
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    try:
+        kb = reload_knowledge_base()
+        registry = reload_model_registry()
+    except Exception as e:
+        logger.error('Knowledge base reload failed: %s', e)
+        return jsonify({
+            'error': str(e),
+            'message': 'Failed to reload knowledge base. The previous version is still active.'
+        }), 500
+    
+    # Cached responses were built from the previous tables
+    result_cache.clear()
+    model = registry.active.label if registry.active else None
+    logger.info('Knowledge base reloaded', extra={'knowledge_base_version': kb.version, 'soil_model': model})
+    return jsonify({'status': 'success', 'version': kb.version, 'model': model}), 200
+
 # API: Analyze soil image
-@app.route('/api/analyze', methods=['POST'])
+@api.route('/api/analyze', methods=['POST'])
+@admission_control()
 def analyze_soil():
     """
     Main endpoint for soil analysis
     Accepts: multipart/form-data with soil_image file and form fields
     Returns: JSON with soil type, crops, fertilizer, irrigation info
     """
+    from classifier import get_model_registry
+    from features import color_features_from_image, reduce_image
+    from texture import describe_image
     try:
-        print("\n📥 Received analysis request...")
+        # Reject oversized bodies before the multipart data is parsed
+        if request.content_length and request.content_length > settings.MAX_CONTENT_LENGTH:
+            logger.info('Request body too large', extra={'content_length': request.content_length})
+            return jsonify({
+                'error': f'Image too large (maximum {settings.MAX_CONTENT_LENGTH // (1024 * 1024)} MB)'
+            }), 413
         
-        # Validate image upload
-        if 'soil_image' not in request.files:
-            print("❌ No image in request")
+        # Validate image upload (a file part, or a completed resumable upload)
+        file = uploaded_image()
+        if file is None:
+            logger.info('No image in request')
             return jsonify({'error': 'No soil image uploaded'}), 400
         
-        file = request.files['soil_image']
-        
         if file.filename == '':
-            print("❌ Empty filename")
+            logger.info('Empty filename')
             return jsonify({'error': 'No file selected'}), 400
         
-        print(f"📸 Image received: {file.filename}")
-        
         # Get form data
-        location = request.form.get('location', 'Unknown')
-        season = request.form.get('season', 'kharif')
-        temperature = float(request.form.get('temperature', 28))
-        rainfall = float(request.form.get('rainfall', 800))
-        humidity = float(request.form.get('humidity', 65))
+        inputs = parse_farm_inputs(request.form)
         
-        print(f"📍 Location: {location}")
-        print(f"🌡️ Temperature: {temperature}°C")
-        print(f"💧 Rainfall: {rainfall}mm")
+        # Check type, size and dimensions from the header before decoding
+        img, source_size = open_upload(file.stream, file.filename, settings)
+        IMAGE_BYTES.observe(stream_size(file.stream))
+        IMAGE_PIXELS.observe(source_size[0] * source_size[1])
         
-        # Open and process image
-        img = Image.open(file.stream)
-        img_array = np.array(img)
+        digest = image_digest(file.stream)
+        fingerprint = analysis_fingerprint()
         
-        print(f"🖼️ Image size: {img_array.shape}")
+        # Repeated uploads (same bytes and climate) are served from the cache
+        cache_key = make_cache_key(digest, inputs, fingerprint)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            logger.debug('Cache hit', extra={'image': file.filename})
+            response = dict(cached, input_data=dict(inputs))
+            record_history(inputs, response, digest, file)
+            return api_response(response, encoder=encode_analysis)
         
-        # Calculate average color (RGB)
-        avg_color = img_array.mean(axis=(0, 1))
-        r, g, b = avg_color[:3]
+        # Blurry, badly exposed or non-soil photos are turned away from a
+        # small JPEG thumbnail, before the full decode
+        quality = quality_report(stream=file.stream)
+        if quality is not None and not quality.passed:
+            return quality_rejection(quality, file.filename)
         
-        print(f"🎨 Average RGB: R={r:.0f}, G={g:.0f}, B={b:.0f}")
+        # Decode (downscaled), then extract colour features strip by strip
+        with timed('decode'):
+            img = reduce_image(img, settings.FEATURE_MAX_SIDE)
+            img.load()
+        if quality is None:
+            # Other formats are checked once decoded to the analysis size
+            quality = quality_report(img=img)
+            if quality is not None and not quality.passed:
+                return quality_rejection(quality, file.filename)
+        with timed('features'):
+            features = color_features_from_image(img, settings.FEATURE_MAX_SIDE, source_size)
+        if get_model_registry().active is not None:
+            with timed('texture'):
+                features['descriptor'] = describe_image(img)
         
-        # Calculate additional features
-        brightness = (r + g + b) / 3
-        red_dominance = r / (r + g + b) if (r + g + b) > 0 else 0
+        response = build_analysis_response(inputs, features)
+        result_cache.put(cache_key, response, len(encode_analysis(response)))
+        record_history(inputs, response, digest, file)
         
-        # Calculate color variance (texture indicator)
-        r_variance = np.var(img_array[:,:,0])
-        g_variance = np.var(img_array[:,:,1])
-        b_variance = np.var(img_array[:,:,2])
-        total_variance = r_variance + g_variance + b_variance
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Analysis complete', extra={
+                'image': file.filename,
+                'location': inputs['location'],
+                'source_size': features['source_size'],
+                'analysed_size': features['analysed_size'],
+                'soil_type': response['soil_analysis']['soil_type'],
+                'confidence': response['soil_analysis']['confidence']
+            })
         
-        print(f"💡 Brightness: {brightness:.1f}")
-        print(f"📊 Variance: {total_variance:.1f}")
+        return api_response(response, encoder=encode_analysis)
         
-        # Advanced soil classification
-        soil_type, confidence, crops = classify_soil(
-            r, g, b, brightness, total_variance, temperature, rainfall
-        )
+    except UploadError as e:
+        logger.info('Upload rejected: %s', e.message, extra={'status_code': e.status_code})
+        return jsonify({'error': e.message}), e.status_code
+        
+    except Exception as e:
+        ERRORS.inc(endpoint_label(), type(e).__name__)
+        logger.exception('Analysis failed')
+        return jsonify({
+            'error': str(e),
+            'message': 'Failed to analyze image. Please try again.'
+        }), 500
+
+# API: Per-region soil map of one image
+@api.route('/api/analyze/regions', methods=['POST'])
+@admission_control()
+def analyze_soil_regions():
+    """
+    Split a field photo into a grid of tiles and classify each one
+    Accepts: multipart/form-data with soil_image, farm fields and grid ("8" or "12x8")
+    Returns: JSON with the soil map, per-soil area fractions and an overlay PNG
+    """
+    from features import reduce_image
+    from knowledge import get_knowledge_base
+    from regions import parse_grid, segment_image
+    try:
+        if request.content_length and request.content_length > settings.MAX_CONTENT_LENGTH:
+            return jsonify({
+                'error': f'Image too large (maximum {settings.MAX_CONTENT_LENGTH // (1024 * 1024)} MB)'
+            }), 413
+        
+        file = uploaded_image()
+        if file is None or file.filename == '':
+            return jsonify({'error': 'No soil image uploaded'}), 400
         
-        print(f"✅ Classification: {soil_type} ({confidence}% confidence)")
+        try:
+            grid = parse_grid(request.form.get('grid'), settings.REGION_GRID, settings.REGION_MAX_GRID)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        inputs = parse_farm_inputs(request.form)
         
-        # Get fertilizer recommendations
-        fertilizer = get_fertilizer_recommendations(soil_type, crops[0]['name'])
+        img, source_size = open_upload(file.stream, file.filename, settings)
+        IMAGE_BYTES.observe(stream_size(file.stream))
+        IMAGE_PIXELS.observe(source_size[0] * source_size[1])
         
-        # Get irrigation advisory
-        irrigation = get_irrigation_advisory(crops[0]['name'], season, rainfall)
+        fingerprint = analysis_fingerprint()
         
-        # Generate expert tips
-        tips = generate_tips(soil_type, season, temperature, rainfall)
+        with timed('decode'):
+            img = reduce_image(img, settings.FEATURE_MAX_SIDE)
+            img.load()
+        with timed('regions'):
+            regions = segment_image(img, get_knowledge_base().engine, inputs['temperature'], inputs['rainfall'],
+                                    grid, settings.REGION_OVERLAY_SIDE)
         
-        # Prepare response
-        response = {
+        logger.info('Region analysis complete', extra={
+            'image': file.filename,
+            'grid': f"{regions['grid']['rows']}x{regions['grid']['cols']}",
+            'soil_type': regions['dominant_soil']
+        })
+        return api_response(dict({
             'status': 'success',
             'timestamp': datetime.now().isoformat(),
-            'soil_analysis': {
-                'soil_type': soil_type,
-                'confidence': confidence,
-                'rgb_values': {'r': int(r), 'g': int(g), 'b': int(b)},
-                'brightness': round(brightness, 1)
-            },
-            'recommended_crops': crops,
-            'fertilizer': fertilizer,
-            'irrigation': irrigation,
-            'tips': tips,
-            'input_data': {
-                'location': location,
-                'season': season,
-                'temperature': temperature,
-                'rainfall': rainfall,
-                'humidity': humidity
-            }
-        }
-        
-        print("✅ Analysis complete! Sending response...\n")
-        
-        return jsonify(response), 200
+            'source_size': list(source_size),
+            'analysed_size': list(img.size),
+            'pipeline': fingerprint
+        }, **regions, input_data=dict(inputs)))
+        
+    except UploadError as e:
+        logger.info('Upload rejected: %s', e.message, extra={'status_code': e.status_code})
+        return jsonify({'error': e.message}), e.status_code
         
     except Exception as e:
-        print(f"❌ Error: {str(e)}\n")
+        ERRORS.inc(endpoint_label(), type(e).__name__)
+        logger.exception('Region analysis failed')
         return jsonify({
             'error': str(e),
             'message': 'Failed to analyze image. Please try again.'
         }), 500
 
-def classify_soil(r, g, b, brightness, variance, temperature, rainfall):
+# API: Upload preferences for clients
+@api.route('/api/uploads/config', methods=['GET'])
+def upload_config():
+    """How clients should prepare and send images"""
+    return api_response({
+        'max_side': settings.FEATURE_MAX_SIDE,
+        'format': 'image/jpeg',
+        'quality': settings.CLIENT_IMAGE_QUALITY,
+        'max_bytes': settings.MAX_CONTENT_LENGTH,
+        'chunk_size': settings.RESUMABLE_CHUNK_SIZE,
+        'allowed_extensions': sorted(settings.ALLOWED_EXTENSIONS)
+    })
+
+# API: Resumable uploads
+@api.route('/api/uploads', methods=['POST'])
+def create_upload():
+    """
+    Start a resumable upload
+    Accepts: JSON {"filename": ..., "size": bytes}
+    Returns: upload_id and offset (0)
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        state = resumable_uploads.create(payload.get('filename'), payload.get('size'))
+    except UploadError as e:
+        return jsonify({'error': e.message}), e.status_code
+    return api_response(state, 201, headers={'Location': f"/api/uploads/{state['upload_id']}"})
+
+@api.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Offset to resume a resumable upload from"""
+    state = resumable_uploads.status(upload_id)
+    if state is None:
+        return jsonify({'error': 'Upload not found or expired'}), 404
+    return api_response(state, headers={'Upload-Offset': str(state['offset']), 'Cache-Control': 'no-store'})
+
+@api.route('/api/uploads/<upload_id>', methods=['PATCH'])
+def append_upload(upload_id):
+    """
+    Append one chunk to a resumable upload
+    Accepts: raw bytes with an Upload-Offset header (the current offset)
+    Returns: the new offset
+    """
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset header must be an integer'}), 400
+    try:
+        state = resumable_uploads.append(upload_id, offset, request.stream, request.content_length)
+    except UploadError as e:
+        current = resumable_uploads.status(upload_id)
+        body = {'error': e.message}
+        if current is not None:
+            body['offset'] = current['offset']
+        return jsonify(body), e.status_code
+    return api_response(state, headers={'Upload-Offset': str(state['offset'])})
+
+@api.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    """Abandon a resumable upload"""
+    if not resumable_uploads.delete(upload_id):
+        return jsonify({'error': 'Upload not found or expired'}), 404
+    return '', 204
+
+# API: Analyze a batch of soil images
+@api.route('/api/analyze/batch', methods=['POST'])
+@admission_control(cost=uploaded_image_count)
+def analyze_soil_batch():
+    """
+    Batch endpoint for soil analysis
+    Accepts: multipart/form-data with one or more soil_images files, shared
+             farm fields (location, season, ...) and an optional `metadata`
+             JSON list of per-image overrides in the same order as the files
+    Returns: JSON with one result (or error) per image, in upload order
+    """
+    try:
+        files = [f for f in request.files.getlist('soil_images') if f.filename]
+        logger.debug('Batch analysis request', extra={'images': len(files)})
+        
+        if not files:
+            return jsonify({'error': 'No soil images uploaded'}), 400
+        
+        if len(files) > settings.BATCH_MAX_IMAGES:
+            return jsonify({
+                'error': f'Too many images (maximum {settings.BATCH_MAX_IMAGES} per batch)'
+            }), 400
+        
+        try:
+            metadata = parse_metadata(request.form.get('metadata'), len(files))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        results = analyze_images(prepare_images(files, request.form, metadata))
+        summary = summarize_batch(results)
+        logger.info('Batch complete', extra={'succeeded': summary['succeeded'], 'count': summary['count']})
+        
+        return api_response(summary, encoder=encode_batch)
+        
+    except Exception as e:
+        ERRORS.inc(endpoint_label(), type(e).__name__)
+        logger.exception('Batch analysis failed')
+        return jsonify({
+            'error': str(e),
+            'message': 'Failed to analyze batch. Please try again.'
+        }), 500
+
+# API: Submit an asynchronous analysis job
+@api.route('/api/jobs', methods=['POST'])
+@admission_control(cost=uploaded_image_count, limit_concurrency=False)
+def submit_job():
+    """
+    Queue an analysis and return immediately with a job id
+    Accepts: the same form as /api/analyze (soil_image) or
+             /api/analyze/batch (soil_images + metadata)
+    Returns: 202 with the job id and its status URL, or 503 when the queue is full
+    """
+    try:
+        if 'soil_images' in request.files:
+            kind = 'batch'
+            files = [f for f in request.files.getlist('soil_images') if f.filename]
+            try:
+                metadata = parse_metadata(request.form.get('metadata'), len(files))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        else:
+            kind = 'single'
+            file = request.files.get('soil_image')
+            files = [file] if file and file.filename else []
+            metadata = []
+        
+        if not files:
+            return jsonify({'error': 'No soil image uploaded'}), 400
+        
+        if len(files) > settings.BATCH_MAX_IMAGES:
+            return jsonify({
+                'error': f'Too many images (maximum {settings.BATCH_MAX_IMAGES} per batch)'
+            }), 400
+        
+        items = prepare_images(files, request.form, metadata)
+        
+        # A single image that fails validation is rejected right away
+        if kind == 'single' and items[0].get('error'):
+            return jsonify({'error': items[0]['error']}), items[0]['status_code']
+        
+        size = sum(len(item.get('image_bytes', b'')) for item in items)
+        job_id = job_queue.submit({'kind': kind, 'items': items}, size)
+        logger.info('Queued job', extra={'job_id': job_id, 'kind': kind, 'images': len(items)})
+        
+        return jsonify({
+            'status': 'queued',
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}'
+        }), 202, {'Location': f'/api/jobs/{job_id}'}
+        
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(settings.JOB_RETRY_AFTER)}
+        
+    except Exception as e:
+        ERRORS.inc(endpoint_label(), type(e).__name__)
+        logger.exception('Job submission failed')
+        return jsonify({
+            'error': str(e),
+            'message': 'Failed to queue analysis. Please try again.'
+        }), 500
+
+# API: Poll an asynchronous analysis job
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Return a job's status, plus its result or error once finished"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    response = {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'created_at': datetime.fromtimestamp(job['created_at']).isoformat(),
+        'updated_at': datetime.fromtimestamp(job['updated_at']).isoformat()
+    }
+    if job['status'] == SUCCEEDED:
+        response['result'] = job['result']
+    elif job['status'] == FAILED:
+        response['error'] = job['error']
+    return api_response(response)
+
+# API: Query analysis history
+@api.route('/api/history', methods=['GET'])
+def list_history():
     """
-    Classify soil type based on color analysis
-    Returns: (soil_type, confidence, crops)
+    Page through past analyses, newest first
+    Query: soil_type, location, season, since, until (ISO dates or Unix
+           timestamps), limit, cursor (next_cursor from the previous page)
     """
+    if history is None:
+        return jsonify({'error': 'Analysis history is disabled'}), 404
     
-    # Sandy Soil: Light color, low variance
-    if brightness > 140 and r > 150 and variance < 1500:
-        soil_type = 'Sandy Soil'
-        confidence = 88 + np.random.rand() * 7
-        crops = [
-            {'name': 'Groundnut', 'suitability': 90, 'yield': '2.2 tons/ha', 'duration': '100-130 days', 'profit': 'High'},
-            {'name': 'Bajra (Pearl Millet)', 'suitability': 88, 'yield': '1.8 tons/ha', 'duration': '70-90 days', 'profit': 'Medium-High'},
-            {'name': 'Watermelon', 'suitability': 85, 'yield': '25 tons/ha', 'duration': '80-90 days', 'profit': 'High'}
-        ]
+    try:
+        args = request.args
+        limit = min(int(args.get('limit', settings.HISTORY_PAGE_SIZE)), settings.HISTORY_MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError('limit must be at least 1')
+        cursor = parse_cursor(args['cursor']) if args.get('cursor') else None
+        since = parse_timestamp(args.get('since'))
+        until = parse_timestamp(args.get('until'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Black Soil: Very dark
-    elif brightness < 80:
-        soil_type = 'Black Soil (Regur)'
-        confidence = 91 + np.random.rand() * 6
-        crops = [
-            {'name': 'Cotton', 'suitability': 95, 'yield': '3.2 tons/ha', 'duration': '150-180 days', 'profit': 'Very High'},
-            {'name': 'Soybean', 'suitability': 92, 'yield': '2.8 tons/ha', 'duration': '90-110 days', 'profit': 'High'},
-            {'name': 'Jowar (Sorghum)', 'suitability': 89, 'yield': '2.5 tons/ha', 'duration': '110-130 days', 'profit': 'Medium-High'}
-        ]
+    with timed('history_query'):
+        rows, next_cursor = history.store.query(
+            soil_type=args.get('soil_type'), location=args.get('location'), season=args.get('season'),
+            since=since, until=until, cursor=cursor, limit=limit
+        )
+    for row in rows:
+        row['created_at'] = datetime.fromtimestamp(row['created_at']).isoformat()
+    return api_response({'results': rows, 'count': len(rows), 'next_cursor': next_cursor})
+
+# API: One stored analysis
+@api.route('/api/history/<int:analysis_id>', methods=['GET'])
+def get_history(analysis_id):
+    """Return a past analysis with its full response"""
+    record = history.store.get(analysis_id) if history is not None else None
+    if record is None:
+        return jsonify({'error': 'Analysis not found'}), 404
+    record['created_at'] = datetime.fromtimestamp(record['created_at']).isoformat()
+    return api_response(record)
+
+# API: Location typeahead
+@api.route('/api/locations', methods=['GET'])
+def search_locations():
+    """
+    Suggest districts for a typed location (prefix, alias or close spelling)
+    Query: q, limit
+    """
+    from locations import get_location_index
+    query = request.args.get('q', '')
+    try:
+        limit = min(int(request.args.get('limit', settings.LOCATIONS_LIMIT)), settings.LOCATIONS_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
     
-    # Red Laterite: Reddish, high red dominance
-    elif r > 130 and r / g > 1.3 and brightness > 100 and brightness < 150:
-        soil_type = 'Red Laterite Soil'
-        confidence = 89 + np.random.rand() * 7
-        crops = [
-            {'name': 'Groundnut', 'suitability': 91, 'yield': '2.4 tons/ha', 'duration': '100-130 days', 'profit': 'High'},
-            {'name': 'Ragi (Finger Millet)', 'suitability': 89, 'yield': '2.0 tons/ha', 'duration': '100-120 days', 'profit': 'Medium-High'},
-            {'name': 'Cashew', 'suitability': 86, 'yield': '1.2 tons/ha', 'duration': '2-3 years', 'profit': 'Very High'}
-        ]
+    with timed('location_search'):
+        results = get_location_index().search(query, limit)
+    return api_response({'query': query, 'results': results, 'count': len(results)})
+
+# API: Crop and variety typeahead
+@api.route('/api/crops/search', methods=['GET'])
+def search_crops():
+    """
+    Suggest crops and varieties for typed text (prefix, alias or close spelling)
+    Query: q, soil, season, limit
+    """
+    from catalog import SearchError
+    from knowledge import get_knowledge_base
+    query = request.args.get('q', '')
+    soil = request.args.get('soil')
+    season = request.args.get('season')
+    try:
+        limit = min(int(request.args.get('limit', settings.CROP_SEARCH_LIMIT)), settings.CROP_SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
     
-    # Clay Soil: Dark, high variance
-    elif brightness < 120 and variance > 800:
-        soil_type = 'Clay Soil'
-        confidence = 86 + np.random.rand() * 9
-        crops = [
-            {'name': 'Rice', 'suitability': 93, 'yield': '4.5 tons/ha', 'duration': '120-150 days', 'profit': 'High'},
-            {'name': 'Cotton', 'suitability': 90, 'yield': '2.8 tons/ha', 'duration': '150-180 days', 'profit': 'Very High'},
-            {'name': 'Wheat', 'suitability': 87, 'yield': '3.2 tons/ha', 'duration': '110-130 days', 'profit': 'Medium-High'}
-        ]
+    try:
+        with timed('crop_search'):
+            results = get_knowledge_base().catalog.search(query, soil, season, limit)
+    except SearchError as e:
+        return jsonify({'error': str(e)}), 400
+    return api_response({'query': query, 'soil': soil, 'season': season, 'results': results,
+                         'count': len(results)})
+
+# API: What-if crop planning
+@api.route('/api/plan', methods=['POST'])
+@admission_control()
+def plan_crops():
+    """
+    Compare crops on soil types across rainfall, area and price scenarios
+    Accepts: JSON {crops, soils, season, scenarios: {rainfall, area, price}, top}
+             where each scenario value is a number, a list or {start, stop, steps}
+    Returns: ranked ROI, yield and water tables
+    """
+    from knowledge import get_knowledge_base
+    from planner import PlanError, build_plan, summarize
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        top = min(int(payload.get('top', settings.PLAN_TOP)), 1000)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'top must be an integer'}), 400
+    try:
+        with timed('plan'):
+            plan = build_plan(get_knowledge_base(), payload.get('crops'), payload.get('soils'),
+                              payload.get('season'), payload.get('scenarios'), settings.PLAN_MAX_SCENARIOS)
+            result = summarize(plan, top)
+    except (PlanError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return api_response(dict(result, status='success'))
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 date/time or Unix timestamp query value (None if absent)"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def parse_metadata(value, count):
+    """
+    Parse the `metadata` form field of a batch of `count` images
+    Returns: list of per-image override dicts (empty if absent)
+    Raises: ValueError if it is not valid JSON or not a list of at most one object per image
+    """
+    try:
+        metadata = json.loads(value or '[]')
+    except ValueError:
+        raise ValueError('metadata must be valid JSON') from None
+    if (not isinstance(metadata, list) or len(metadata) > count
+            or not all(isinstance(entry, dict) for entry in metadata)):
+        raise ValueError('metadata must be a list with at most one object per image')
+    return metadata
+
+def run_analysis_job(payload):
+    """
+    Job handler: analyze the queued images and return the response body
+    A job waits for an analysis slot, so jobs and synchronous analyses
+    together never run more than the slots allow.
+    """
+    analysis_limiter.acquire(None)
+    try:
+        results = analyze_images(payload['items'])
+    finally:
+        analysis_limiter.release()
+    if payload['kind'] == 'batch':
+        return summarize_batch(results)
     
-    # Loamy Soil: Medium brown, balanced
-    elif brightness > 100 and brightness < 150 and variance > 500 and variance < 2000:
-        soil_type = 'Loamy Soil'
-        confidence = 90 + np.random.rand() * 8
-        crops = [
-            {'name': 'Rice', 'suitability': 95, 'yield': '4.8 tons/ha', 'duration': '120-150 days', 'profit': 'High'},
-            {'name': 'Wheat', 'suitability': 93, 'yield': '3.5 tons/ha', 'duration': '110-130 days', 'profit': 'High'},
-            {'name': 'Sugarcane', 'suitability': 91, 'yield': '75 tons/ha', 'duration': '12-18 months', 'profit': 'Very High'}
-        ]
+    result = results[0]
+    if result['status'] != 'success':
+        raise ValueError(result['error'])
+    del result['index'], result['filename']
+    return result
+
+def prepare_images(files, form, metadata):
+    """
+    Validate uploaded images and resolve each one's farm inputs
+    Shared form fields apply to every image; metadata[i] overrides them for image i.
+    Returns: one item per file with its bytes and inputs, or an error and status code
+    """
+    items = []
+    for index, file in enumerate(files):
+        item = {'index': index, 'filename': file.filename}
+        try:
+            fields = form.to_dict()
+            if index < len(metadata):
+                fields.update(metadata[index])
+            item['inputs'] = parse_farm_inputs(fields)
+            open_upload(file.stream, file.filename, settings)
+            # Only JPEGs can be checked without a full decode here; the
+            # others are checked by analyze_images once decoded
+            quality = quality_report(stream=file.stream)
+            if quality is not None and not quality.passed:
+                record_quality_rejection(quality, file.filename)
+                raise UploadError(quality.problems[0]['message'], 422)
+            file.stream.seek(0)
+            item['image_bytes'] = file.read()
+            IMAGE_BYTES.observe(len(item['image_bytes']))
+        except UploadError as e:
+            logger.info('Image %d (%s) rejected: %s', index, file.filename, e.message)
+            item.update({'error': e.message, 'status_code': e.status_code})
+        except Exception as e:
+            logger.info('Image %d (%s) failed: %s', index, file.filename, e)
+            item.update({'error': str(e), 'status_code': 400})
+        items.append(item)
+    return items
+
+def analyze_images(items):
+    """
+    Analyze prepared images, answering repeats from the cache and decoding
+    the rest in parallel worker processes
+    Returns: one result (or error) per item, in order
+    """
+    from batch import extract_features_batch
+    from classifier import get_model_registry
+    results = [{'index': item['index'], 'filename': item['filename']} for item in items]
+    fingerprint = analysis_fingerprint()
+    pending = []
+    for result, item in zip(results, items):
+        if item.get('error'):
+            result.update({'status': 'error', 'error': item['error']})
+            continue
+        key = make_cache_key(bytes_digest(item['image_bytes']), item['inputs'], fingerprint)
+        cached = result_cache.get(key)
+        if cached is not None:
+            result.update(cached, input_data=dict(item['inputs']))
+            record_history(item['inputs'], cached, key[0], item)
+        else:
+            pending.append((result, item, key))
     
-    # Silty Soil: Light gray-brown
-    elif brightness > 120 and variance < 1000:
-        soil_type = 'Silty Soil'
-        confidence = 84 + np.random.rand() * 9
-        crops = [
-            {'name': 'Vegetables (Mixed)', 'suitability': 92, 'yield': '18 tons/ha', 'duration': '60-90 days', 'profit': 'High'},
-            {'name': 'Maize', 'suitability': 89, 'yield': '3.8 tons/ha', 'duration': '90-120 days', 'profit': 'Medium-High'},
-            {'name': 'Pulses', 'suitability': 86, 'yield': '1.5 tons/ha', 'duration': '90-120 days', 'profit': 'Medium'}
-        ]
+    # Decode and features run together in the worker processes
+    with timed('batch_extract'):
+        extracted = extract_features_batch(
+            [item['image_bytes'] for _, item, _ in pending], settings.FEATURE_MAX_SIDE, settings.BATCH_WORKERS,
+            descriptor=get_model_registry().active is not None,
+            thumbnail_side=settings.QUALITY_CHECK_SIDE if settings.QUALITY_CHECK else None
+        )
     
-    # Default: Loamy
-    else:
-        soil_type = 'Loamy Soil'
-        confidence = 85 + np.random.rand() * 8
-        crops = [
-            {'name': 'Rice', 'suitability': 95, 'yield': '4.8 tons/ha', 'duration': '120-150 days', 'profit': 'High'},
-            {'name': 'Wheat', 'suitability': 91, 'yield': '3.5 tons/ha', 'duration': '110-130 days', 'profit': 'High'},
-            {'name': 'Maize', 'suitability': 89, 'yield': '4.2 tons/ha', 'duration': '90-120 days', 'profit': 'Medium-High'}
-        ]
+    for (result, item, key), (features, error) in zip(pending, extracted):
+        try:
+            if error is not None:
+                raise error
+            # Non-JPEGs get the quality check on their decoded thumbnail
+            thumbnail = features.pop('quality_thumbnail', None)
+            if thumbnail is not None:
+                quality = quality_thumbnail_report(thumbnail)
+                if not quality.passed:
+                    record_quality_rejection(quality, item['filename'])
+                    result.update({'status': 'error', 'error': quality.problems[0]['message']})
+                    continue
+            response = build_analysis_response(item['inputs'], features)
+            result_cache.put(key, response, len(encode_analysis(response)))
+            result.update(response)
+            record_history(item['inputs'], response, key[0], item)
+            source_size = features['source_size']
+            IMAGE_PIXELS.observe(source_size[0] * source_size[1])
+        except Exception as e:
+            logger.info('Image %d (%s) failed: %s', item['index'], item['filename'], e)
+            result.update({'status': 'error', 'error': str(e)})
+    return results
+
+def uploaded_image():
+    """
+    The image of an analysis request: the soil_image file part, or the
+    completed resumable upload named by the upload_id field (deleted once
+    the analysis succeeds)
+    Returns: FileStorage or None; raises UploadError for a missing or incomplete upload
+    """
+    upload_id = request.form.get('upload_id')
+    if not upload_id:
+        return request.files.get('soil_image')
+    file = resumable_uploads.open(upload_id)
     
-    # Adjust scores based on climate
-    for crop in crops:
-        if crop['name'] == 'Rice' and temperature >= 25 and rainfall >= 800:
-            crop['suitability'] = min(98, crop['suitability'] + 3)
-        elif crop['name'] == 'Wheat' and temperature <= 25 and rainfall < 800:
-            crop['suitability'] = min(98, crop['suitability'] + 3)
-        elif crop['name'] == 'Cotton' and temperature >= 25:
-            crop['suitability'] = min(98, crop['suitability'] + 2)
+    @after_this_request
+    def close_upload(response):
+        file.close()
+        # Kept after an error, so the client can retry without uploading again
+        if response.status_code < 400:
+            resumable_uploads.delete(upload_id)
+        return response
     
-    return soil_type, round(confidence, 1), sorted(crops, key=lambda x: x['suitability'], reverse=True)
+    return file
 
-def get_fertilizer_recommendations(soil_type, crop_name):
-    """Get fertilizer recommendations based on soil and crop"""
-    return {
-        'nitrogen': '120 kg/ha',
-        'phosphorus': '60 kg/ha',
-        'potassium': '40 kg/ha',
-        'organic': 'Apply 10 tons/ha of farmyard manure',
-        'timing': {
-            'basal': '50% at sowing',
-            'first_top': '25% at 30 days',
-            'second_top': '25% at 60 days'
-        }
-    }
+def quality_report(stream=None, img=None):
+    """
+    Image quality pre-check (quality.py) on a draft thumbnail of a JPEG
+    upload stream, or on an image already decoded to the analysis size
+    Returns: QualityReport, or None when the check is off or the stream is
+    not a JPEG (so the check has to wait for the decode)
+    """
+    if not settings.QUALITY_CHECK:
+        return None
+    from quality import assess, draft_thumbnail, image_thumbnail
+    with timed('quality'):
+        if stream is not None:
+            thumbnail = draft_thumbnail(stream, settings.QUALITY_CHECK_SIDE)
+        else:
+            thumbnail = image_thumbnail(img, settings.QUALITY_CHECK_SIDE)
+        return assess(thumbnail, settings) if thumbnail is not None else None
+
+def quality_thumbnail_report(thumbnail):
+    """Image quality pre-check on a thumbnail made by a batch worker (batch.py)"""
+    from quality import assess
+    with timed('quality'):
+        return assess(thumbnail, settings)
+
+def record_quality_rejection(report, filename):
+    """Count and log a photo that failed the quality pre-check"""
+    for problem in report.problems:
+        QUALITY_REJECTED.inc(problem['code'])
+    logger.info('Photo failed the quality check', extra={
+        'image': filename, 'problems': [problem['code'] for problem in report.problems], **report.metrics
+    })
 
-def get_irrigation_advisory(crop_name, season, rainfall):
-    """Get irrigation recommendations"""
+def quality_rejection(report, filename):
+    """422 response telling the user what is wrong with the photo and how to retake it"""
+    record_quality_rejection(report, filename)
+    return jsonify({
+        'error': report.problems[0]['message'],
+        'quality': {'passed': False, 'problems': report.problems, 'metrics': report.metrics}
+    }), 422
+
+def record_history(inputs, response, digest, upload):
+    """
+    Queue an analysis for the history database (never blocks)
+    upload is the uploaded file or a prepared batch item, used only when
+    HISTORY_SAVE_IMAGES keeps a copy of the image.
+    """
+    if history is None:
+        return
+    image_bytes = extension = None
+    if settings.HISTORY_SAVE_IMAGES:
+        if isinstance(upload, dict):
+            image_bytes, filename = upload['image_bytes'], upload['filename']
+        else:
+            image_bytes, filename = upload.stream.read(), upload.filename
+            upload.stream.seek(0)
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else None
+    history.record(build_record(inputs, dict(response, input_data=dict(inputs)), digest, image_bytes, extension))
+
+def summarize_batch(results):
+    """Wrap per-image results in the batch response envelope"""
+    succeeded = sum(1 for result in results if result['status'] == 'success')
     return {
-        'frequency': 'Every 7-10 days',
-        'method': 'Drip irrigation recommended for water efficiency',
-        'water_requirement': '600-800 mm per season',
-        'critical_stages': [
-            'Germination/Establishment',
-            'Vegetative Growth',
-            'Flowering Stage',
-            'Grain Filling/Maturity'
-        ]
+        'status': 'success',
+        'timestamp': datetime.now().isoformat(),
+        'count': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results
     }
 
-def generate_tips(soil_type, season, temperature, rainfall):
-    """Generate expert tips"""
-    tips = [
-        f"Your {soil_type.lower()} is suitable for multiple crops",
-        "Consider crop rotation to maintain soil fertility",
-        "Monitor weather forecasts regularly for better planning"
-    ]
+# Climate inputs used when neither the request nor the location index has them
+CLIMATE_DEFAULTS = {'temperature': 28.0, 'rainfall': 800.0, 'humidity': 65.0}
+
+def parse_farm_inputs(fields):
+    """
+    Read farm details from form fields
+    Climate values left out are filled in from the district's seasonal
+    normals when the location is known, otherwise from fixed defaults.
+    """
+    location = fields.get('location', 'Unknown')
+    # One spelling for the cache key, the advisory lookup and the catalog ("Kharif " -> "kharif")
+    season = normalize(fields.get('season', 'kharif'))
+    inputs = {'location': location, 'season': season}
+    missing = [name for name in CLIMATE_DEFAULTS if str(fields.get(name, '')).strip() == '']
+    for name in CLIMATE_DEFAULTS:
+        if name not in missing:
+            inputs[name] = float(fields[name])
+    if not missing:
+        inputs['climate_source'] = 'user'
+        return inputs
     
-    if rainfall < 600:
-        tips.append("Low rainfall detected - consider drought-resistant crops")
-    elif rainfall > 1500:
-        tips.append("High rainfall area - ensure proper drainage")
+    from locations import get_location_index
+    index = get_location_index()
+    district = index.resolve(location)
+    normals = index.climate(district, season) if district is not None else None
+    for name in missing:
+        inputs[name] = normals[name] if normals else CLIMATE_DEFAULTS[name]
+    if normals:
+        inputs['climate_source'] = 'normals'
+        inputs['climate_region'] = index.describe(district)['climate_region']
+    else:
+        inputs['climate_source'] = 'default'
+    return inputs
+
+def build_analysis_response(inputs, features):
+    """
+    Classify extracted image features and assemble the analysis response
+    Crops, fertilizer, irrigation and tips are shared precomputed fragments
+    (advisory.py); the response must not be modified in place.
+    """
+    from knowledge import get_knowledge_base
+    r, g, b = features['r'], features['g'], features['b']
+    brightness = features['brightness']
+    season = inputs['season']
+    temperature = inputs['temperature']
+    rainfall = inputs['rainfall']
+    kb = get_knowledge_base()
+    
+    # Advanced soil classification
+    with timed('classify'):
+        soil_index, confidence, classifier = classify_soil(
+            r, g, b, brightness, features['variance'], temperature, rainfall, features.get('descriptor'),
+            engine=kb.engine
+        )
+    
+    # Crops, fertilizer, irrigation and tips for this soil, season and climate
+    with timed('advisory'):
+        advisory = kb.advisory.lookup(soil_index, season, temperature, rainfall)
     
-    if temperature > 35:
-        tips.append("High temperature - provide shade and adequate irrigation")
+    return {
+        'status': 'success',
+        'timestamp': datetime.now().isoformat(),
+        'soil_analysis': {
+            'soil_type': kb.engine.soil_types[soil_index],
+            'confidence': confidence,
+            'classifier': classifier,
+            'rgb_values': {'r': int(r), 'g': int(g), 'b': int(b)},
+            'brightness': round(brightness, 1)
+        },
+        'recommended_crops': advisory.recommended_crops,
+        'fertilizer': advisory.fertilizer,
+        'irrigation': advisory.irrigation,
+        'tips': advisory.tips,
+        'pipeline': analysis_fingerprint(),
+        'input_data': dict(inputs)
+    }
+
+def analysis_fingerprint():
+    """
+    Pipeline fingerprint of analyses made now (pipeline.py)
+    Offline scoring (score.py) builds responses without create_app and
+    analyses at the Config defaults.
+    """
+    from classifier import get_model_registry
+    from knowledge import get_knowledge_base
+    max_side = (settings or Config).FEATURE_MAX_SIDE
+    return pipeline_fingerprint(get_knowledge_base(), get_model_registry().active, max_side)
+
+def classify_soil(r, g, b, brightness, variance, temperature, rainfall, descriptor=None, engine=None):
+    """
+    Classify soil type with the active trained model, or the colour rules
+    when no model is installed or it predicts a soil the rules do not know
+    Returns: (soil rule index, confidence, classifier)
+    """
+    from classifier import get_model_registry
+    from knowledge import get_knowledge_base
+    engine = engine or get_knowledge_base().engine
+    model = get_model_registry().active
+    if model is not None and descriptor is not None:
+        soil_types, confidences = model.predict(descriptor)
+        if soil_types[0] in engine.soil_index:
+            return engine.soil_index[soil_types[0]], float(confidences[0]), model.label
     
-    return tips
+    soil_index, confidence = engine.match(r, g, b, brightness, variance, temperature, rainfall)
+    return int(soil_index[0]), float(confidence[0]), 'rules'
+
+def analysis_object(response, compact_schema):
+    """A response shaped for encoding; the compact schema reuses the precomputed fragment"""
+    from advisory import FRAGMENT_KEYS
+    from knowledge import get_knowledge_base
+    if not compact_schema:
+        return response
+    advisory = get_knowledge_base().advisory.fragment_for(response)
+    if advisory is None:
+        return compact(response)
+    shaped = compact({key: value for key, value in response.items() if key not in FRAGMENT_KEYS})
+    shaped.update(advisory.compact)
+    return shaped
+
+def encode_analysis(response, media_type=JSON):
+    """Encode an analysis response, joining JSON to its pre-encoded advisory fragment"""
+    from advisory import FRAGMENT_KEYS
+    from knowledge import get_knowledge_base
+    if media_type == JSON:
+        advisory = get_knowledge_base().advisory.fragment_for(response)
+        if advisory is not None:
+            head = {key: value for key, value in response.items() if key not in FRAGMENT_KEYS}
+            return dumps(head)[:-1] + b',' + advisory.body + b'}'
+    return encode(analysis_object(response, is_compact(media_type)), media_type)
+
+def encode_batch(summary, media_type=JSON):
+    """Encode a batch envelope, reusing each result's advisory fragment"""
+    head = {key: value for key, value in summary.items() if key != 'results'}
+    if media_type == JSON:
+        results = b','.join(encode_analysis(result) for result in summary['results'])
+        return dumps(head)[:-1] + b',"results":[' + results + b']}'
+    compact_schema = is_compact(media_type)
+    shaped = compact(head) if compact_schema else head
+    shaped[COMPACT_KEYS['results'] if compact_schema else 'results'] = [
+        analysis_object(result, compact_schema) for result in summary['results']
+    ]
+    return encode(shaped, media_type)
+
+def not_modified(etag):
+    """A 304 response if the request's If-None-Match already names etag, else None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
+
+def api_response(data, status=200, encoder=None, headers=None):
+    """
+    Serialize a response in the negotiated format, compressing large bodies
+    encoder(data, media_type) -> bytes; defaults to the generic encoder
+    (with the compact schema applied when negotiated).
+    Successful GETs are tagged with a weak ETag (a hash of the body) and
+    answered with 304 when the client already has it. Other methods get no
+    conditional handling, as a matching If-None-Match on them calls for
+    412 rather than 304 (RFC 9110).
+    """
+    media_type = negotiate(request.accept_mimetypes)
+    with timed('serialize'):
+        if encoder is not None:
+            body = encoder(data, media_type)
+        else:
+            body = encode(compact(data) if is_compact(media_type) else data, media_type)
+        etag = None
+        if status == 200 and request.method in ('GET', 'HEAD'):
+            etag = content_etag(media_type, body)
+            unchanged = not_modified(etag)
+            if unchanged is not None:
+                return unchanged
+        body, encoding = compress(body, request.accept_encodings, settings.COMPRESS_MIN_BYTES,
+                                  settings.COMPRESS_GZIP_LEVEL, settings.COMPRESS_BROTLI_QUALITY)
+    response = current_app.response_class(body, status=status, mimetype=media_type, headers=headers)
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
 
 if __name__ == '__main__':
+    app = create_app()
+    
     print("\n✅ Starting Flask server...")
     print("📡 Server will run on: http://localhost:5000")
     print("🌐 Open your browser and visit: http://localhost:5000")
-    print("💡 Press Ctrl+C to stop the server\n")
+    print("💡 Press Ctrl+C to stop the server")
+    print("🏭 For production use serve.py (multi-worker server)\n")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=settings.DEBUG, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Parallel image decoding for batch soil analysis
+
+Decoding and feature extraction are CPU bound, so batches are fanned out
+to a bounded process pool (one process per core by default). Each image
+is an independent task, which means a corrupt upload only fails its own
+slot in the batch. JPEGs pass the quality check before they are queued;
+other formats can only be checked once decoded, so their workers also
+return the quality thumbnail for the caller to assess.
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+
+from features import color_features_from_image, reduce_image
+from quality import image_thumbnail
+from texture import describe_image
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def extract_features_from_bytes(image_bytes, max_side, descriptor=False, thumbnail_side=None):
+    """
+    Worker task: decode one image and return its colour features (plus the
+    texture descriptor, and for non-JPEGs a quality_thumbnail of at most
+    thumbnail_side pixels when that is given)
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    source_size = img.size
+    checked = img.format == 'JPEG'
+    img = reduce_image(img, max_side)
+    features = color_features_from_image(img, max_side, source_size)
+    if descriptor:
+        features['descriptor'] = describe_image(img)
+    if thumbnail_side and not checked:
+        features['quality_thumbnail'] = image_thumbnail(img, thumbnail_side)
+    return features
+
+
+def get_pool(max_workers=None):
+    """Return the shared process pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the shared process pool (a new one is created on next use)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def extract_features_batch(images, max_side, max_workers=None, descriptor=False, thumbnail_side=None):
+    """
+    Extract colour features for a list of encoded images
+    max_workers=0 runs everything in the calling process; descriptor=True
+    also computes each image's texture descriptor vector; thumbnail_side
+    adds quality thumbnails of non-JPEGs (see extract_features_from_bytes).
+    Returns: list of (features, error) tuples in input order
+    """
+    if max_workers == 0:
+        return [_run_inline(image_bytes, max_side, descriptor, thumbnail_side) for image_bytes in images]
+
+    try:
+        pool = get_pool(max_workers)
+        futures = [pool.submit(extract_features_from_bytes, image_bytes, max_side, descriptor, thumbnail_side)
+                   for image_bytes in images]
+    except BrokenProcessPool as e:
+        # A worker died earlier (e.g. killed by the OS); replace the pool
+        shutdown_pool()
+        return [(None, e) for _ in images]
+
+    results = []
+    for future in futures:
+        try:
+            results.append((future.result(), None))
+        except BrokenProcessPool as e:
+            shutdown_pool()
+            results.append((None, e))
+        except Exception as e:
+            results.append((None, e))
+    return results
+
+
+def _run_inline(image_bytes, max_side, descriptor, thumbnail_side):
+    """Extract features in-process, capturing any error"""
+    try:
+        return extract_features_from_bytes(image_bytes, max_side, descriptor, thumbnail_side), None
+    except Exception as e:
+        return None, e
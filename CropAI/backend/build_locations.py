@@ -0,0 +1,153 @@
+"""
+Build the location index used by locations.py
+
+    python build_locations.py                     # data/*.csv -> data/locations/
+
+Reads two tables from the data folder:
+
+    districts.csv          district, state, IMD subdivision, ';'-separated aliases
+    climate_normals.csv    per subdivision: temperature (°C), humidity (%) and
+                           rainfall (mm) normals for kharif, rabi and summer
+
+and writes fixed-width NumPy arrays (memory-mapped by the server) plus a
+small JSON header. Every district name, alias and trailing word group
+("Garo Hills", "Kannada") becomes a sorted search key for prefix lookup;
+the character trigrams of every key are indexed for misspelt queries.
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+from config import Config
+from locations import CLIMATE_FIELDS, INDEX_FILE, KEY_LENGTH, KIND_ALIAS, KIND_NAME, KIND_WORDS, trigrams
+from text import normalize
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def read_normals(path, seasons):
+    """Read climate_normals.csv; returns (codes, names, climate array)"""
+    codes, names, rows = [], [], []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            codes.append(row['subdivision'])
+            names.append(row['name'])
+            rows.append([[float(row[f'{season}_{field}']) for field in CLIMATE_FIELDS] for season in seasons])
+    return codes, names, np.array(rows, dtype=np.float32)
+
+
+def read_districts(path, subdivisions):
+    """Read districts.csv; returns a list of (name, state, subdivision, aliases)"""
+    districts = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            if row['subdivision'] not in subdivisions:
+                raise SystemExit(f"❌ {path}:{line}: unknown subdivision {row['subdivision']!r}")
+            aliases = [alias.strip() for alias in row['aliases'].split(';') if alias.strip()]
+            districts.append((row['district'].strip(), row['state'].strip(), row['subdivision'], aliases))
+    return districts
+
+
+def search_keys(districts):
+    """
+    Every (key, district, kind) to index, sorted by key
+    Names and aliases are indexed whole; names of several words are also
+    indexed from each later word so "khasi" finds "East Khasi Hills".
+    """
+    entries = set()
+    for index, (name, _, _, aliases) in enumerate(districts):
+        entries.add((normalize(name), index, KIND_NAME))
+        for alias in aliases:
+            entries.add((normalize(alias), index, KIND_ALIAS))
+        words = normalize(name).split()
+        for start in range(1, len(words)):
+            entries.add((' '.join(words[start:]), index, KIND_WORDS))
+
+    keys = sorted(entries)
+    too_long = [key for key, _, _ in keys if len(key) > KEY_LENGTH]
+    if too_long:
+        raise SystemExit(f'❌ Keys longer than {KEY_LENGTH} characters: {too_long}')
+    return keys
+
+
+def trigram_postings(keys):
+    """
+    Inverted index from trigram code to key positions
+    Returns: (codes, offsets, postings); the keys containing codes[i] are
+    postings[offsets[i]:offsets[i + 1]]
+    """
+    pairs = sorted({(code, position) for position, (key, _, _) in enumerate(keys) for code in trigrams(key)})
+    codes, first = np.unique(np.array([code for code, _ in pairs], dtype=np.uint32), return_index=True)
+    offsets = np.append(first, len(pairs)).astype(np.int32)
+    postings = np.array([position for _, position in pairs], dtype=np.uint16)
+    return codes, offsets, postings
+
+
+def save_array(folder, name, array):
+    temporary = os.path.join(folder, f'.{name}.tmp')
+    with open(temporary, 'wb') as f:
+        np.save(f, array)
+    os.replace(temporary, os.path.join(folder, name))
+
+
+def build(data_folder, output):
+    """Build the index into `output` and return its header"""
+    seasons = list(Config.SEASONS)
+    codes, names, climate = read_normals(os.path.join(data_folder, 'climate_normals.csv'), seasons)
+    districts = read_districts(os.path.join(data_folder, 'districts.csv'), set(codes))
+    states = sorted({state for _, state, _, _ in districts})
+
+    table = np.zeros(len(districts), dtype=[('name', f'S{KEY_LENGTH}'), ('state', 'u1'), ('subdivision', 'u1')])
+    for index, (name, state, subdivision, _) in enumerate(districts):
+        table[index] = (name.encode('utf-8'), states.index(state), codes.index(subdivision))
+
+    keys = search_keys(districts)
+    key_table = np.zeros(len(keys), dtype=[('key', f'S{KEY_LENGTH}'), ('district', 'u2'),
+                                           ('kind', 'u1'), ('grams', 'u1')])
+    for position, (key, district, kind) in enumerate(keys):
+        key_table[position] = (key.encode('ascii'), district, kind, len(trigrams(key)))
+    gram_codes, gram_offsets, gram_postings = trigram_postings(keys)
+
+    os.makedirs(output, exist_ok=True)
+    for name, array in (('districts.npy', table), ('climate.npy', climate), ('keys.npy', key_table),
+                        ('trigrams.npy', gram_codes), ('trigram_offsets.npy', gram_offsets),
+                        ('trigram_postings.npy', gram_postings)):
+        save_array(output, name, array)
+
+    header = {
+        'version': time.strftime('%Y%m%d%H%M%S'),
+        'seasons': seasons,
+        'climate_fields': list(CLIMATE_FIELDS),
+        'states': states,
+        'subdivisions': [{'code': code, 'name': name} for code, name in zip(codes, names)],
+        'districts': len(districts),
+        'keys': len(keys)
+    }
+    # Written last so a reader never sees the header of a half-built index
+    temporary = os.path.join(output, f'.{INDEX_FILE}.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2)
+    os.replace(temporary, os.path.join(output, INDEX_FILE))
+    return header
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=DATA_FOLDER, help='folder with districts.csv and climate_normals.csv')
+    parser.add_argument('--output', default=Config.LOCATIONS_INDEX_PATH, help='index folder to write')
+    args = parser.parse_args()
+
+    header = build(args.data, args.output)
+    size = sum(os.path.getsize(os.path.join(args.output, name)) for name in os.listdir(args.output))
+    print(f"✅ Indexed {header['districts']} districts ({header['keys']} search keys, "
+          f"{len(header['subdivisions'])} climate subdivisions) in {size / 1024:.0f} KB")
+    print(f'   {os.path.abspath(args.output)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Content-addressed result cache for AI Crop Recommendation System
+
+Analysis results are keyed by a hash of the uploaded image bytes plus the
+normalized climate inputs, so re-uploads and client retries are answered
+without decoding the image again. Entries are evicted least-recently-used
+first once the memory budget is exceeded, and expire after a fixed TTL.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def image_digest(stream, chunk_size=HASH_CHUNK_SIZE):
+    """Hash an uploaded file stream and rewind it for decoding"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def bytes_digest(data):
+    """Hash an image already held in memory"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_cache_key(digest, inputs, fingerprint=None):
+    """Combine an image digest with the normalized climate inputs and pipeline fingerprint"""
+    return (
+        digest,
+        str(inputs['season']).strip().lower(),
+        round(float(inputs['temperature']), 1),
+        round(float(inputs['rainfall']), 1),
+        round(float(inputs['humidity']), 1),
+        fingerprint
+    )
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a TTL and a memory budget in bytes"""
+
+    def __init__(self, max_bytes, ttl_seconds, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, size, value = entry
+            if expires_at <= self._clock():
+                self._remove(key, size)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size=None):
+        """
+        Store a JSON-serializable value, evicting old entries as needed
+        size is its encoded length in bytes, if the caller already knows it.
+        """
+        if self.max_bytes <= 0:
+            return
+        if size is None:
+            size = len(json.dumps(value, separators=(',', ':')))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+            self._entries[key] = (self._clock() + self.ttl_seconds, size, value)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                old_key, (_, old_size, _) = next(iter(self._entries.items()))
+                self._remove(old_key, old_size)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and current memory usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def _remove(self, key, size):
+        del self._entries[key]
+        self._bytes -= size
@@ -0,0 +1,277 @@
+"""
+Crop and variety search for AI Crop Recommendation System
+
+An in-memory inverted index over the knowledge base's crop catalog: every
+crop and variety, the soil types whose rules recommend the crop and the
+seasons it is grown in. It is built once per knowledge base version
+(KnowledgeBase.catalog), so /api/crops/search and the variety suggestions
+in analysis responses only do dictionary and bisect lookups.
+
+Every word of a name or alias, and of a variety's crop, is a search term;
+names of more than one word are also indexed run together, so "dhm1"
+finds "DHM-117". Soil types and seasons are terms too, pointing at the
+sets of entries they apply to. A query matches the entries that have a
+term starting with each of its words. A word that starts no term
+matches terms sharing enough trigrams with it instead ("grondnut").
+
+Results rank exact names first, then by the weakest field any query word
+matched (name, alias, crop, then soil type or season), crops before
+varieties, and shorter names first. Misspelt matches come last.
+"""
+
+import bisect
+import heapq
+from collections import Counter, namedtuple
+
+from text import normalize
+
+CatalogEntry = namedtuple('CatalogEntry', 'kind name crop aliases soils seasons')
+
+# Where a query word matched an entry; lower fields rank first
+FIELD_NAME = 0
+FIELD_ALIAS = 1
+FIELD_CROP = 2
+FIELD_CONTEXT = 3  # soil type or season
+
+# Trigram similarity (Dice coefficient) a misspelt word needs to match a term
+FUZZY_MIN_SIMILARITY = 0.5
+FUZZY_MIN_LENGTH = 3
+
+# Words this short start so many terms that their matches are precomputed
+SHORT_WORD = 2
+
+# Sorts after every character of a normalized term
+TERM_END = '\x7f'
+
+
+class SearchError(ValueError):
+    """A search filter names an unknown soil type or season"""
+
+
+def base_name(name):
+    """Crop name without its gloss ("Bajra (Pearl Millet)" -> "Bajra")"""
+    return name.split(' (', 1)[0]
+
+
+def terms(text):
+    """Search terms of a name: its words, plus all of them run together"""
+    words = normalize(text).split()
+    found = set(words)
+    if len(words) > 1:
+        found.add(''.join(words))
+    return found
+
+
+def trigrams(term):
+    """Distinct trigrams of a term, padded with spaces"""
+    padded = f' {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _prefixed(sorted_terms, word):
+    """The slice of sorted terms starting with `word`"""
+    low = bisect.bisect_left(sorted_terms, word)
+    high = bisect.bisect_left(sorted_terms, word + TERM_END, low)
+    return sorted_terms[low:high]
+
+
+class CropCatalog:
+    """Searchable crops and varieties of one knowledge base"""
+
+    def __init__(self, catalog, soil_rules, seasons):
+        self.seasons = tuple(seasons)
+
+        # Soil types whose rules recommend each crop
+        crop_soils = {}
+        for rule in soil_rules:
+            for crop in rule['crops']:
+                soils = crop_soils.setdefault(base_name(crop['name']), [])
+                if rule['soil_type'] not in soils:
+                    soils.append(rule['soil_type'])
+        self.soils = tuple(dict.fromkeys(rule['soil_type'] for rule in soil_rules))
+
+        entries = []
+        self._varieties = {}  # crop -> [(variety, seasons)] in catalog order
+        for crop in list(catalog) + [name for name in crop_soils if name not in catalog]:
+            spec = catalog.get(crop, {})
+            soils = tuple(crop_soils.get(crop, ()))
+            crop_seasons = self._seasons(spec.get('seasons', self.seasons), crop)
+            entries.append(CatalogEntry('crop', crop, crop, tuple(spec.get('aliases', ())), soils, crop_seasons))
+            for variety in spec.get('varieties', ()):
+                if isinstance(variety, str):
+                    variety = {'name': variety}
+                entry = CatalogEntry('variety', variety['name'], crop, tuple(variety.get('aliases', ())), soils,
+                                     self._seasons(variety.get('seasons', crop_seasons), variety['name']))
+                entries.append(entry)
+                self._varieties.setdefault(crop, []).append((entry.name, entry.seasons))
+
+        # An entry's position is its rank among equally good matches: crops
+        # before varieties, then shorter names, then alphabetical
+        entries.sort(key=lambda entry: (entry.kind != 'crop', len(normalize(entry.name)), normalize(entry.name)))
+        self.entries = tuple(entries)
+        self._exact = {}
+        for index, entry in enumerate(entries):
+            self._exact.setdefault(normalize(entry.name), set()).add(index)
+
+        # Name, alias and crop terms -> entries having the term in each of those fields
+        postings = {}
+        for index, entry in enumerate(entries):
+            fields = [(FIELD_NAME, entry.name)] + [(FIELD_ALIAS, alias) for alias in entry.aliases]
+            if entry.kind == 'variety':
+                fields.append((FIELD_CROP, entry.crop))
+            for field, text in fields:
+                for term in terms(text):
+                    postings.setdefault(term, ([], [], []))[field].append(index)
+        self._postings = {term: tuple(frozenset(members) for members in fields)
+                          for term, fields in postings.items()}
+        self._terms = sorted(postings)
+
+        # Soil type and season terms -> entries they apply to
+        self._by_soil = {soil: frozenset(i for i, entry in enumerate(entries) if soil in entry.soils)
+                         for soil in self.soils}
+        self._by_season = {season: frozenset(i for i, entry in enumerate(entries) if season in entry.seasons)
+                           for season in self.seasons}
+        context = {}
+        for value, members in list(self._by_soil.items()) + list(self._by_season.items()):
+            for term in terms(value):
+                context[term] = context.get(term, frozenset()) | members
+        self._context = context
+        self._context_terms = sorted(context)
+
+        # Trigrams of name, alias and crop terms, for misspelt words
+        self._term_grams = [len(trigrams(term)) for term in self._terms]
+        gram_terms = {}
+        for position, term in enumerate(self._terms):
+            for gram in trigrams(term):
+                gram_terms.setdefault(gram, []).append(position)
+        self._gram_terms = gram_terms
+
+        # The first letters typed match the most terms; look those up once
+        self._short_words = {}
+        prefixes = {term[:length] for term in self._terms + self._context_terms for length in range(1, SHORT_WORD + 1)}
+        for prefix in prefixes:
+            self._short_words[prefix] = self._match_word(prefix)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def varieties(self, crop, season=None):
+        """Names of a crop's varieties (grown in `season`, if given); rule names like "Jowar (Sorghum)" work"""
+        return [name for name, seasons in self._varieties.get(base_name(crop), ())
+                if season is None or season in seasons]
+
+    def search(self, query, soil=None, season=None, limit=10):
+        """
+        Crops and varieties matching a typed prefix or a close spelling,
+        optionally only those suited to a soil type and/or season
+        With an empty query, every entry passing the filters is listed.
+        Returns: list of entry dicts (see describe)
+        Raises: SearchError for an unknown soil type or season
+        """
+        allowed = self._allowed(soil, season)
+        words = normalize(query).split()
+        if limit < 1 or not (words or allowed is not None):
+            return []
+        if not words:
+            return [self.describe(index) for index in heapq.nsmallest(limit, allowed)]
+
+        ranked = self._ranked(words, allowed, limit)
+        if len(words) > 1:
+            # "dhm 1" should also find "DHM121"
+            best = {}
+            for rank in ranked + self._ranked([''.join(words)], allowed, limit):
+                if rank[-1] not in best or rank < best[rank[-1]]:
+                    best[rank[-1]] = rank
+            ranked = sorted(best.values())[:limit]
+        return [self.describe(index, words if field == FIELD_ALIAS else None) for _, _, field, index in ranked]
+
+    def describe(self, index, words=None):
+        """Public fields of one entry; `words` of an alias match add the alias as 'match'"""
+        entry = self.entries[index]
+        result = {
+            'name': entry.name,
+            'type': entry.kind,
+            'crop': entry.crop,
+            'soils': list(entry.soils),
+            'seasons': list(entry.seasons)
+        }
+        for alias in entry.aliases if words else ():
+            alias_terms = terms(alias)
+            if all(any(term.startswith(word) for term in alias_terms) for word in words):
+                result['match'] = alias
+                break
+        return result
+
+    def _allowed(self, soil, season):
+        """Entries passing the soil type and season filters (None without filters)"""
+        allowed = None
+        if soil:
+            if soil not in self._by_soil:
+                raise SearchError(f"soil must be one of: {', '.join(self.soils)}")
+            allowed = self._by_soil[soil]
+        if season:
+            if season not in self._by_season:
+                raise SearchError(f"season must be one of: {', '.join(self.seasons)}")
+            allowed = self._by_season[season] if allowed is None else allowed & self._by_season[season]
+        return allowed
+
+    def _ranked(self, words, allowed, limit):
+        """
+        The best `limit` entries matching every word
+        Returns: sorted list of (misspelt, not the exact name, weakest field matched, entry)
+        """
+        levels, misspelt = None, False
+        for word in words:
+            word_levels, word_misspelt = self._match_word(word)
+            misspelt |= word_misspelt
+            levels = word_levels if levels is None else [a & b for a, b in zip(levels, word_levels)]
+        if allowed is not None:
+            levels = [level & allowed for level in levels]
+
+        # levels[field] holds the entries every word matched in that field or a better one
+        exact = self._exact.get(' '.join(words), set()) & levels[FIELD_NAME]
+        ranked = [(misspelt, False, FIELD_NAME, index) for index in sorted(exact)[:limit]]
+        previous = exact
+        for field, level in enumerate(levels):
+            if len(ranked) >= limit:
+                break
+            ranked += [(misspelt, True, field, index) for index in heapq.nsmallest(limit - len(ranked), level - previous)]
+            previous = level
+        return ranked
+
+    def _match_word(self, word):
+        """
+        Entries with a term starting with `word`, or resembling it
+        Returns: ([entries matched by name, ... or alias, ... or crop, ... or soil type or season], misspelt)
+        """
+        if word in self._short_words:
+            return self._short_words[word]
+        matched = _prefixed(self._terms, word)
+        context = frozenset().union(*(self._context[term] for term in _prefixed(self._context_terms, word)))
+        misspelt = not matched and not context
+        if misspelt:
+            matched = self._similar(word)
+        levels, level = [], frozenset()
+        for field in (FIELD_NAME, FIELD_ALIAS, FIELD_CROP):
+            level = level.union(*(self._postings[term][field] for term in matched))
+            levels.append(level)
+        levels.append(level | context)
+        return levels, misspelt
+
+    def _similar(self, word):
+        """Terms sharing enough trigrams with a misspelt word"""
+        if len(word) < FUZZY_MIN_LENGTH:
+            return []
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._gram_terms.get(gram, ()))
+        return [self._terms[position] for position, count in shared.items()
+                if 2.0 * count / (len(grams) + self._term_grams[position]) >= FUZZY_MIN_SIMILARITY]
+
+    def _seasons(self, seasons, name):
+        """Validate the seasons of a catalog entry"""
+        unknown = [season for season in seasons if season not in self.seasons]
+        if unknown:
+            raise ValueError(f"Unknown seasons for {name} in the crop catalog: {', '.join(unknown)}")
+        return tuple(seasons)
@@ -0,0 +1,113 @@
+"""
+Trained soil classifiers for AI Crop Recommendation System
+
+A model is a folder under Config.MODELS_FOLDER holding a multinomial
+logistic regression over the texture descriptor (texture.py):
+
+    models/<name>/model.json    classes, feature names, version, metrics
+    models/<name>/weights.npy   float32 (features, classes)
+    models/<name>/bias.npy      float32 (classes,)
+
+Feature standardization is folded into the weights at training time
+(train_model.py), so inference is one matrix product and a softmax.
+Weights are memory-mapped: under a preloading server every worker shares
+the same pages. When no model is installed, or a prediction names a soil
+the rules do not know, classification falls back to the rule engine.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+from config import Config
+from texture import FEATURE_NAMES
+
+MODEL_FILE = 'model.json'
+
+
+class SoilModel:
+    """Logistic regression soil classifier with memory-mapped weights"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MODEL_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.name = meta['name']
+        self.version = meta['version']
+        self.classes = list(meta['classes'])
+        self.metrics = meta.get('metrics', {})
+        if tuple(meta['feature_names']) != FEATURE_NAMES:
+            raise ValueError(f'Model {self.name} was trained on a different feature layout')
+
+        self.weights = np.load(os.path.join(path, 'weights.npy'), mmap_mode='r')
+        self.bias = np.load(os.path.join(path, 'bias.npy'), mmap_mode='r')
+        if self.weights.shape != (len(FEATURE_NAMES), len(self.classes)) or self.bias.shape != (len(self.classes),):
+            raise ValueError(f'Model {self.name} weights do not match its classes')
+
+    @property
+    def label(self):
+        return f'{self.name}@{self.version}'
+
+    def predict_proba(self, vectors):
+        """Class probabilities for a (samples, features) batch of descriptors"""
+        logits = np.atleast_2d(np.asarray(vectors, dtype=np.float32)) @ self.weights + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        np.exp(logits, out=logits)
+        logits /= logits.sum(axis=1, keepdims=True)
+        return logits
+
+    def predict(self, vectors):
+        """
+        Classify a batch of descriptors
+        Returns: (class names, confidence percentages rounded to 1 decimal)
+        """
+        proba = self.predict_proba(vectors)
+        best = proba.argmax(axis=1)
+        confidence = [round(float(p) * 100, 1) for p in proba[np.arange(len(best)), best]]
+        return [self.classes[i] for i in best], confidence
+
+
+class ModelRegistry:
+    """Models found in the models folder, with one of them active"""
+
+    def __init__(self, folder, active):
+        self.folder = folder
+        self.models = {}
+        self.errors = {}
+        if os.path.isdir(folder):
+            for entry in sorted(os.listdir(folder)):
+                path = os.path.join(folder, entry)
+                if not os.path.isfile(os.path.join(path, MODEL_FILE)):
+                    continue
+                try:
+                    self.models[entry] = SoilModel(path)
+                except Exception as e:
+                    self.errors[entry] = str(e)
+        self.active = self.models.get(active)
+
+    def describe(self):
+        """Summary for the health endpoint"""
+        return {
+            'active': self.active.label if self.active else None,
+            'available': sorted(model.label for model in self.models.values()),
+            'errors': self.errors
+        }
+
+
+_current = None
+_reload_lock = threading.Lock()
+
+
+def reload_model_registry(folder=None, active=None):
+    """Scan the models folder and make the result the active registry"""
+    global _current
+    with _reload_lock:
+        _current = ModelRegistry(folder or Config.MODELS_FOLDER, active or Config.SOIL_MODEL)
+        return _current
+
+
+def get_model_registry():
+    """Return the active registry, scanning the models folder on first use"""
+    return _current or reload_model_registry()
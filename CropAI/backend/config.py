@@ -16,6 +16,60 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp'}
+    MAX_IMAGE_PIXELS = 50 * 1000 * 1000   # Largest accepted image (from the header)
+    MIN_IMAGE_SIDE = 16                   # Smallest width and height accepted (texture tiles need a few pixels)
+    MAX_DECODE_PIXELS = 16 * 1000 * 1000  # Largest pixel buffer ever decoded (see uploads.py)
+    
+    # Client-side preparation, advertised by /api/uploads/config: browsers
+    # shrink photos to FEATURE_MAX_SIDE and re-encode them as JPEG at this
+    # quality before uploading
+    CLIENT_IMAGE_QUALITY = 0.9
+    
+    # Resumable chunked uploads (see resumable.py)
+    RESUMABLE_CHUNK_SIZE = 256 * 1024          # Chunk size clients are asked to use
+    RESUMABLE_UPLOAD_TTL = timedelta(hours=24)  # Idle uploads are deleted after this
+    RESUMABLE_MAX_UPLOADS = 100                # Uploads in progress before new ones get 503
+    
+    # Server processes on this host; the dev server and waitress run one
+    WEB_WORKERS = 1
+    
+    # Feature extraction settings
+    # Longest image side analysed; larger photos are downscaled while decoding.
+    # Colour variance is measured at the analysed scale, so fine texture is
+    # smoothed as this shrinks. Set to None for exact full-resolution
+    # statistics (slower, more memory).
+    FEATURE_MAX_SIDE = 1024
+    
+    # Image quality pre-check (see quality.py): photos that are blurry, badly
+    # exposed or not soil get 422 with feedback instead of an analysis
+    QUALITY_CHECK = True
+    QUALITY_CHECK_SIDE = 256          # Thumbnail the checks run on
+    QUALITY_MIN_SHARPNESS = 20.0      # Laplacian variance of the grey thumbnail
+    QUALITY_MAX_CLIPPED = 0.2         # Fraction of pixels crushed to black or blown out
+    QUALITY_MIN_BRIGHTNESS = 25       # Mean luma (0-255)
+    QUALITY_MAX_BRIGHTNESS = 230
+    QUALITY_MIN_SOIL_COLOUR = 0.5     # Fraction of pixels with a plausible soil colour
+    
+    # Region mode (/api/analyze/regions): the analysed image is split into a
+    # grid of tiles, each classified on its own
+    REGION_GRID = (8, 8)        # Default rows and columns
+    REGION_MAX_GRID = 32        # Largest rows or columns a request may ask for
+    REGION_OVERLAY_SIDE = 512   # Longest side of the soil map overlay PNG
+    
+    # Batch analysis settings
+    BATCH_MAX_IMAGES = 50
+    BATCH_MAX_CONTENT_LENGTH = 200 * 1024 * 1024  # Whole batch request body
+    BATCH_WORKERS = None  # Decode processes per server process; None = one per CPU core, 0 = in-process
+    
+    # Result cache (keyed by image hash + season/temperature/rainfall/humidity)
+    RESULT_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Memory budget; 0 disables caching
+    RESULT_CACHE_TTL = timedelta(hours=6)
+    
+    # Response encoding (see serialization.py): bodies of at least this many
+    # bytes are compressed when the client accepts brotli or gzip
+    COMPRESS_MIN_BYTES = 1024
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 5
     
     # API settings
     API_VERSION = '1.0.0'
@@ -24,8 +78,62 @@ class Config:
     # CORS settings
     CORS_ORIGINS = ['http://localhost:3000', 'http://localhost:5000', 'http://127.0.0.1:5000']
     
+    # Admission control (see admission.py): a token bucket per client...
+    RATE_LIMIT_STORE = 'memory'   # 'memory' (per process), 'sqlite' (shared by all workers) or None (off)
+    RATE_LIMIT_DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'ratelimit.db')
+    RATE_LIMIT_PER_MINUTE = 30    # Analysed images per client per minute, sustained
+    RATE_LIMIT_BURST = 10         # Images a client can send at once after a quiet spell
+    API_KEY_HEADER = 'X-API-Key'  # Clients sending one of API_KEYS are limited per key instead of per address
+    # Known API keys (comma separated in the environment); unknown keys count as no key
+    API_KEYS = frozenset(key.strip() for key in os.environ.get('API_KEYS', '').split(',') if key.strip())
+    RATE_LIMIT_TRUST_PROXY = False  # Use X-Forwarded-For for the address (only behind a trusted proxy)
+    # ...and a cap on analyses running at once in each process
+    ADMISSION_MAX_CONCURRENT = None      # None = as many as ADMISSION_MEMORY_FRACTION of free memory fits
+    ADMISSION_MEMORY_FRACTION = 0.5
+    ADMISSION_DEFAULT_CONCURRENT = 4     # When free memory cannot be determined
+    ADMISSION_WAIT = 0.0                 # Seconds a request may wait for a slot before 503
+    ADMISSION_RETRY_AFTER = 2            # Seconds clients should wait after a 503
+    
+    # Asynchronous jobs
+    JOB_STORE = 'memory'  # 'memory' (single process) or 'sqlite' (shared by all workers)
+    JOB_DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'jobs.db')
+    JOB_WORKERS = 2        # Jobs processed concurrently per server process
+    JOB_MAX_PENDING = 32   # Queued jobs before submissions are refused with 503
+    JOB_MAX_PENDING_BYTES = 256 * 1024 * 1024  # Image bytes held by unfinished jobs before 503
+    JOB_RETRY_AFTER = 5    # Seconds clients should wait after a 503
+    JOB_TTL = timedelta(hours=1)  # How long finished jobs can be fetched
+    
+    # Analysis history (SQLite, written in batches by a background thread)
+    HISTORY_ENABLED = True
+    HISTORY_DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'history.db')
+    HISTORY_BATCH_SIZE = 200        # Records per insert transaction
+    HISTORY_FLUSH_INTERVAL = 1.0    # Seconds the writer waits for more records
+    HISTORY_MAX_PENDING = 1000      # Queued records before new ones are dropped
+    HISTORY_PAGE_SIZE = 50          # Default (and HISTORY_MAX_PAGE_SIZE maximum) rows per page
+    HISTORY_MAX_PAGE_SIZE = 500
+    HISTORY_RETENTION = timedelta(days=365)
+    HISTORY_SAVE_IMAGES = False     # Keep uploads (by content hash) under UPLOAD_FOLDER/history
+    HISTORY_IMAGE_RETENTION = timedelta(days=30)
+    HISTORY_COMPACT_INTERVAL = timedelta(hours=1)
+    
+    # Agronomy knowledge base (soil rules, crop tables); loaded once, on first use
+    KNOWLEDGE_BASE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'knowledge_base.json')
+    
+    # Token for admin endpoints such as knowledge base reload (disabled if unset)
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    
+    # Logging ('text' or 'json' lines on stderr)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    
+    # Startup: NumPy, Pillow, the knowledge base, soil model and location index
+    # load on first use, or in create_app when WARM_UP is set
+    WARM_UP = os.environ.get('WARM_UP', '0') == '1'
+    STARTUP_IMPORT_BUDGET_MS = 250  # benchmarks/startup.py fails when importing the app takes longer
+    
     # Model settings
     MODELS_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'models')
+    SOIL_MODEL = os.environ.get('SOIL_MODEL', 'soil_classifier')  # Falls back to the rules if not installed
     
     # Soil classification settings
     SOIL_TYPES = [
@@ -48,34 +156,20 @@ class Config:
         'Vegetables', 'Pulses', 'Barley', 'Cashew'
     ]
     
-    # Indian locations database (major cities/districts)
-    INDIAN_LOCATIONS = [
-        # Tamil Nadu
-        'Chennai, Tamil Nadu', 'Coimbatore, Tamil Nadu', 'Madurai, Tamil Nadu',
-        'Tiruchirappalli, Tamil Nadu', 'Salem, Tamil Nadu', 'Tiruppur, Tamil Nadu',
-        
-        # Karnataka
-        'Bangalore, Karnataka', 'Mysore, Karnataka', 'Hubli, Karnataka',
-        
-        # Maharashtra
-        'Mumbai, Maharashtra', 'Pune, Maharashtra', 'Nagpur, Maharashtra',
-        
-        # Andhra Pradesh & Telangana
-        'Hyderabad, Telangana', 'Vijayawada, Andhra Pradesh', 'Visakhapatnam, Andhra Pradesh',
-        
-        # Kerala
-        'Thiruvananthapuram, Kerala', 'Kochi, Kerala', 'Kozhikode, Kerala',
-        
-        # North India
-        'Delhi, Delhi', 'Jaipur, Rajasthan', 'Lucknow, Uttar Pradesh',
-        'Chandigarh, Chandigarh', 'Amritsar, Punjab',
-        
-        # East India
-        'Kolkata, West Bengal', 'Patna, Bihar', 'Bhubaneswar, Odisha',
-        
-        # West India
-        'Ahmedabad, Gujarat', 'Surat, Gujarat', 'Indore, Madhya Pradesh'
-    ]
+    # Crop and variety search (/api/crops/search) over the knowledge base crop catalog
+    CROP_SEARCH_LIMIT = 10       # Default (and CROP_SEARCH_MAX_LIMIT maximum) results
+    CROP_SEARCH_MAX_LIMIT = 50
+    CROP_SEARCH_BUDGET_MS = 1.0  # p95 per query with thousands of varieties (benchmarks/search.py)
+    
+    # What-if planner (/api/plan): crops x soils x scenario grid
+    PLAN_MAX_SCENARIOS = 100000   # Largest scenario grid (rainfall x area x price values)
+    PLAN_TOP = 20                 # Default rows per ranked table
+    
+    # District location index with seasonal climate normals (build_locations.py);
+    # fills in climate inputs the client leaves out and serves /api/locations
+    LOCATIONS_INDEX_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'locations')
+    LOCATIONS_LIMIT = 10       # Default (and LOCATIONS_MAX_LIMIT maximum) suggestions
+    LOCATIONS_MAX_LIMIT = 50
     
     # Season options
     SEASONS = ['kharif', 'rabi', 'summer']
@@ -93,11 +187,22 @@ class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     TESTING = False
+    # gunicorn.conf.py starts this many worker processes
+    WEB_WORKERS = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+    # Each worker gets its share of the cores for batch decoding, so the
+    # workers' pools together start one process per core, not one per core each
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', max(1, (os.cpu_count() or 1) // WEB_WORKERS)))
+    JOB_STORE = 'sqlite'  # Job status must be visible from every worker process
+    # One bucket per client across all worker processes ('' turns it off, e.g. for loadtest.py)
+    RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'sqlite') or None
+    WARM_UP = os.environ.get('WARM_UP', '1') == '1'  # Load once in the gunicorn master (preload_app)
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DEBUG = True
+    RATE_LIMIT_STORE = None  # Tests of the rate limit turn it on themselves
 
 # Configuration dictionary
 config = {
@@ -0,0 +1,174 @@
+"""
+Image feature extraction for AI Crop Recommendation System
+
+Images are downscaled while they are decoded (JPEG DCT scaling via
+``draft()`` plus integer box reduction via ``reduce()``) and colour
+statistics are accumulated over row strips in a single pass, so memory
+use stays bounded no matter how large the uploaded photo is.
+"""
+
+import numpy as np
+from PIL import Image
+
+from config import Config
+
+# Number of rows converted to an array at a time
+STRIP_ROWS = 128
+
+# Modes Image.reduce() cannot filter; they are converted to RGB first, as
+# image_strips would convert them anyway
+UNREDUCIBLE_MODES = ('1', 'P')
+
+
+def open_image(source, max_side=Config.FEATURE_MAX_SIDE):
+    """Open an image, reducing it at decode time to about max_side pixels"""
+    return reduce_image(Image.open(source), max_side)
+
+
+def draft_image(img, max_side=Config.FEATURE_MAX_SIDE):
+    """
+    Configure decode-time downscaling for a freshly opened image
+    Only JPEG supports this (libjpeg decodes at 1/2, 1/4 or 1/8 scale);
+    nothing is decoded yet, and img.size becomes the size that will be.
+    """
+    if max_side and img.format == 'JPEG':
+        width, height = img.size
+        scale = max(width, height) / max_side
+        if scale > 1:
+            img.draft('RGB', (max(1, int(width / scale)), max(1, int(height / scale))))
+    return img
+
+
+def reduce_image(img, max_side=Config.FEATURE_MAX_SIDE):
+    """Downscale a freshly opened image so its longest side is about max_side"""
+    if not max_side:
+        return img
+
+    img = draft_image(img, max_side)
+    factor = max(img.size) // max_side
+    if factor > 1:
+        if img.mode in UNREDUCIBLE_MODES or img.mode.startswith('I;16'):
+            img = img.convert('RGB')
+        img = img.reduce(factor)
+    return img
+
+
+def image_strips(img, rows=STRIP_ROWS):
+    """Yield an image as RGB uint8 arrays of at most `rows` rows each"""
+    width, height = img.size
+    for top in range(0, height, rows):
+        strip = img.crop((0, top, width, min(top + rows, height)))
+        if strip.mode != 'RGB':
+            strip = strip.convert('RGB')
+        yield np.asarray(strip)
+
+
+def array_strips(img_array, rows=STRIP_ROWS):
+    """Yield the RGB channels of an image array in blocks of rows"""
+    if img_array.ndim == 2:
+        img_array = img_array[:, :, np.newaxis]
+    for top in range(0, img_array.shape[0], rows):
+        strip = img_array[top:top + rows, :, :3]
+        if strip.shape[2] == 1:
+            strip = np.repeat(strip, 3, axis=2)
+        yield strip
+
+
+def channel_histograms(rgb):
+    """Per-channel 256-bin histograms of an RGB uint8 array, shape (3, 256)"""
+    return np.stack([np.bincount(rgb[..., c].ravel(), minlength=256) for c in range(3)])
+
+
+def accumulate_color_stats(strips):
+    """
+    Accumulate per-channel pixel count, sum and sum of squares in one pass
+    8-bit strips are reduced to channel histograms (exact and much faster
+    than summing pixels); other integer images are summed exactly in int64.
+    Returns: (count, sums, sums_of_squares)
+    """
+    count = 0
+    histograms = None
+    sums = None
+    sums_sq = None
+
+    for strip in strips:
+        if strip.dtype == np.uint8:
+            hist = channel_histograms(strip)
+            histograms = hist if histograms is None else histograms + hist
+            count += strip.shape[0] * strip.shape[1]
+            continue
+        acc_dtype = np.int64 if np.issubdtype(strip.dtype, np.integer) else np.float64
+        pixels = strip.reshape(-1, 3).astype(acc_dtype, copy=False)
+        if sums is None:
+            sums = np.zeros(3, dtype=acc_dtype)
+            sums_sq = np.zeros(3, dtype=acc_dtype)
+        count += pixels.shape[0]
+        sums += pixels.sum(axis=0)
+        sums_sq += np.einsum('ij,ij->j', pixels, pixels)
+
+    if not count:
+        raise ValueError('Image contains no pixels')
+    if histograms is not None:
+        levels = np.arange(256, dtype=np.int64)
+        hist_sums = histograms @ levels
+        hist_sums_sq = histograms @ (levels * levels)
+        if sums is None:
+            return count, hist_sums, hist_sums_sq
+        sums = sums + hist_sums
+        sums_sq = sums_sq + hist_sums_sq
+    return count, sums, sums_sq
+
+
+def color_features_from_stats(count, sums, sums_sq):
+    """Build the colour feature dict from accumulated channel statistics"""
+    mean = sums / count
+    channel_variance = np.maximum(sums_sq / count - mean ** 2, 0.0)
+    r, g, b = mean
+
+    # Brightness
+    brightness = (r + g + b) / 3
+
+    # Color variance (texture indicator)
+    total_variance = channel_variance.sum()
+
+    # Color ratios
+    total = r + g + b
+    red_dominance = r / total if total > 0 else 0
+    green_dominance = g / total if total > 0 else 0
+    blue_dominance = b / total if total > 0 else 0
+
+    return {
+        'r': float(r),
+        'g': float(g),
+        'b': float(b),
+        'brightness': float(brightness),
+        'variance': float(total_variance),
+        'red_dominance': float(red_dominance),
+        'green_dominance': float(green_dominance),
+        'blue_dominance': float(blue_dominance)
+    }
+
+
+def color_features_from_array(img_array):
+    """Calculate colour features from an already decoded image array"""
+    return color_features_from_stats(*accumulate_color_stats(array_strips(img_array)))
+
+
+def color_features_from_image(img, max_side=Config.FEATURE_MAX_SIDE, source_size=None):
+    """
+    Calculate colour features from an opened (not yet decoded) PIL image
+    source_size is the original size if the image has already been drafted.
+    Returns: feature dict, plus the source and analysed image sizes
+    """
+    source_size = source_size or img.size
+    img = reduce_image(img, max_side)
+
+    features = color_features_from_stats(*accumulate_color_stats(image_strips(img)))
+    features['source_size'] = list(source_size)
+    features['analysed_size'] = list(img.size)
+    return features
+
+
+def extract_color_features(source, max_side=Config.FEATURE_MAX_SIDE):
+    """Decode an image (path or file object) and calculate its colour features"""
+    return color_features_from_image(Image.open(source), max_side)
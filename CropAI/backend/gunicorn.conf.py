@@ -0,0 +1,63 @@
+"""
+Gunicorn settings for AI Crop Recommendation System
+
+Concurrency model
+-----------------
+* The master process imports the app once (preload_app) and forks
+  `workers` processes; NumPy, Pillow and the knowledge base are shared
+  copy-on-write between them.
+* Image decoding and classification are CPU bound and hold the GIL, so
+  throughput scales with processes: use one worker per core.
+* Each worker runs a few threads (gthread) so slow uploads on mobile
+  links do not block a whole process while the body is received.
+* /api/analyze/batch additionally fans out to a per-worker process pool
+  of ProductionConfig.BATCH_WORKERS processes, by default the worker's
+  share of the cores (1 with one worker per core).
+
+Graceful restart
+----------------
+* kill -HUP <master>   start new workers and retire old ones after they
+                       finish in-flight requests (graceful_timeout); the
+                       knowledge base is re-read if its file changed
+* kill -USR2 <master>  start a new master with new code, then
+                       kill -QUIT the old master once it is serving
+* kill -TERM <master>  graceful shutdown
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import ProductionConfig  # noqa: E402
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = ProductionConfig.WEB_WORKERS  # WEB_CONCURRENCY, default one per core
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+preload_app = True
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    """Pick up knowledge base edits made since the master preloaded it"""
+    from knowledge import reload_if_changed
+    reload_if_changed()
+
+
+def worker_exit(server, worker):
+    """Stop the worker's batch decode pool and write out queued history"""
+    from batch import shutdown_pool
+    shutdown_pool()
+    from app import history
+    if history is not None:
+        history.flush()
@@ -0,0 +1,259 @@
+"""
+Asynchronous analysis jobs for AI Crop Recommendation System
+
+Clients submit work, get a job id back immediately and poll for the
+result, so slow analyses never run into mobile HTTP timeouts. Jobs wait in
+a bounded in-process queue (submit fails fast when it holds too many jobs
+or image bytes) and a fixed number of worker threads process them. Job
+state lives in a pluggable store: MemoryJobStore for a single process,
+SQLiteJobStore when several server processes must see the same jobs.
+
+Queued payloads only exist in the memory of the process that accepted
+them, so jobs left queued or running by a process that has exited are
+marked failed when the SQLite store is next opened.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """The job queue is at capacity; the client should retry later"""
+
+
+class MemoryJobStore:
+    """Job state in a dict; only visible to the current process"""
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id):
+        """Record a new queued job (and drop finished jobs past the TTL)"""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            self._jobs[job_id] = {
+                'job_id': job_id, 'status': QUEUED, 'created_at': now, 'updated_at': now,
+                'result': None, 'error': None
+            }
+
+    def recover(self):
+        """Nothing to do: jobs in memory end with the process that ran them"""
+        return 0
+
+    def update(self, job_id, status, result=None, error=None):
+        """Set a job's status and its result or error"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status=status, result=result, error=error, updated_at=time.time())
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if it is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _expire(self, now):
+        """Drop finished jobs older than the TTL"""
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['status'] in (SUCCEEDED, FAILED) and job['updated_at'] < now - self.ttl_seconds]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class SQLiteJobStore:
+    """Job state in a SQLite database shared by all server processes"""
+
+    def __init__(self, path, ttl_seconds):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' job_id TEXT PRIMARY KEY, status TEXT NOT NULL,'
+                ' created_at REAL NOT NULL, updated_at REAL NOT NULL,'
+                ' result TEXT, error TEXT, pid INTEGER)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at)')
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(jobs)')]
+            if 'pid' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN pid INTEGER')
+        self.recover()
+
+    def create(self, job_id):
+        """Record a new queued job (and drop finished jobs past the TTL)"""
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?',
+                (SUCCEEDED, FAILED, now - self.ttl_seconds)
+            )
+            conn.execute(
+                'INSERT INTO jobs (job_id, status, created_at, updated_at, pid) VALUES (?, ?, ?, ?, ?)',
+                (job_id, QUEUED, now, now, os.getpid())
+            )
+
+    def recover(self):
+        """
+        Fail queued and running jobs whose process has exited; their
+        payloads were lost with it
+        Returns: number of jobs failed
+        """
+        with self._connection() as conn:
+            rows = conn.execute('SELECT job_id, pid FROM jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)).fetchall()
+            stale = [(FAILED, 'Server restarted before the job finished', time.time(), job_id, QUEUED, RUNNING)
+                     for job_id, pid in rows if not process_alive(pid)]
+            conn.executemany(
+                'UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ? AND status IN (?, ?)',
+                stale
+            )
+        return len(stale)
+
+    def update(self, job_id, status, result=None, error=None):
+        """Set a job's status and its result or error"""
+        with self._connection() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE job_id = ?',
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if it is unknown"""
+        row = self._connection().execute(
+            'SELECT job_id, status, created_at, updated_at, result, error FROM jobs WHERE job_id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row[0], 'status': row[1], 'created_at': row[2], 'updated_at': row[3],
+            'result': json.loads(row[4]) if row[4] is not None else None, 'error': row[5]
+        }
+
+    def _connection(self):
+        """One connection per thread (and per process after a fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class JobQueue:
+    """Bounded queue of jobs processed by a fixed pool of worker threads"""
+
+    def __init__(self, store, handler, workers, max_pending, max_pending_bytes=None):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_pending_bytes = max_pending_bytes
+        self.pending_bytes = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def submit(self, payload, size=0):
+        """
+        Queue a payload of `size` bytes for the handler
+        Returns: job id
+        Raises: QueueFullError when max_pending jobs are already waiting, or
+                the payload would take the jobs not yet finished over
+                max_pending_bytes
+        """
+        self._ensure_started()
+        with self._lock:
+            if self.max_pending_bytes is not None and self.pending_bytes + size > self.max_pending_bytes:
+                raise QueueFullError('Job queue is full, please retry later')
+            self.pending_bytes += size
+        job_id = uuid.uuid4().hex
+        try:
+            self.store.create(job_id)
+            self._queue.put_nowait((job_id, payload, size))
+        except queue.Full:
+            self._release(size)
+            self.store.update(job_id, FAILED, error='Job queue is full')
+            raise QueueFullError('Job queue is full, please retry later')
+        except Exception:
+            self._release(size)
+            raise
+        return job_id
+
+    def get(self, job_id):
+        """Return the stored state of a job, or None if it is unknown"""
+        return self.store.get(job_id)
+
+    def pending(self):
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        """Start worker threads on first use (and again in a forked child)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.store.recover()
+            for i in range(self.workers):
+                threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True).start()
+
+    def _work(self):
+        """Worker thread loop: run queued jobs one at a time"""
+        while True:
+            job_id, payload, size = self._queue.get()
+            try:
+                self.store.update(job_id, RUNNING)
+                result = self.handler(payload)
+                self.store.update(job_id, SUCCEEDED, result=result)
+            except Exception as e:
+                self.store.update(job_id, FAILED, error=str(e))
+            finally:
+                del payload
+                self._release(size)
+                self._queue.task_done()
+
+    def _release(self, size):
+        """Stop counting a payload's bytes against max_pending_bytes"""
+        with self._lock:
+            self.pending_bytes -= size
+
+
+def process_alive(pid):
+    """Whether a process with this id is running on this host"""
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def create_job_store(config):
+    """Build the job store selected by config.JOB_STORE"""
+    ttl_seconds = config.JOB_TTL.total_seconds()
+    if config.JOB_STORE == 'sqlite':
+        return SQLiteJobStore(config.JOB_DB_PATH, ttl_seconds)
+    if config.JOB_STORE == 'memory':
+        return MemoryJobStore(ttl_seconds)
+    raise ValueError(f'Unknown JOB_STORE: {config.JOB_STORE}')
@@ -0,0 +1,158 @@
+"""
+Agronomy knowledge base for AI Crop Recommendation System
+
+All static agronomy data (soil rules, crop tables, NPK, water, yield and
+cost figures, crop varieties) lives in a versioned JSON file. It is read
+once at startup and compiled into immutable, indexed structures, so
+request handlers only do dictionary lookups. reload_knowledge_base() swaps in a new version
+atomically, which lets updated tables ship without a redeploy.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+from itertools import product
+from types import MappingProxyType
+
+from advisory import AdvisoryTable
+from catalog import CropCatalog
+from config import Config
+from rules import RuleEngine
+
+CropProfile = namedtuple('CropProfile', [
+    'name', 'nitrogen', 'phosphorus', 'potassium', 'water_mm',
+    'base_yield', 'cost_per_ha', 'revenue_per_ha', 'irrigation_method'
+])
+
+SoilProfile = namedtuple('SoilProfile', ['name', 'water_multiplier', 'irrigation_frequency'])
+
+# Everything known about growing one crop on one soil in one season
+Recommendation = namedtuple('Recommendation', ['soil', 'crop', 'season', 'water_mm'])
+
+
+def _crop_profile(name, entry):
+    """Build a CropProfile from a crop entry merged over the defaults"""
+    npk = entry['npk']
+    return CropProfile(
+        name, npk['N'], npk['P'], npk['K'], entry['water_mm'],
+        entry['base_yield_t_ha'], entry['cost_per_ha'], entry['revenue_per_ha'],
+        entry['irrigation_method']
+    )
+
+
+def _soil_profile(name, entry):
+    """Build a SoilProfile from a soil entry merged over the defaults"""
+    return SoilProfile(name, entry['water_multiplier'], entry['irrigation_frequency'])
+
+
+class KnowledgeBase:
+    """Immutable, indexed view of one version of the agronomy tables"""
+
+    def __init__(self, data, source=None, mtime=None):
+        self.version = data['version']
+        # Content hash of the tables, part of the pipeline fingerprint (pipeline.py)
+        self.digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+        self.source = source
+        self.mtime = mtime
+        self.seasons = tuple(data['seasons'])
+        self.engine = RuleEngine(data['soil_rules'], data['climate_adjustments'], data['max_suitability'])
+        # Crops and varieties with their soils and seasons, searchable (catalog.py)
+        self.catalog = CropCatalog(data.get('crop_catalog', {}), data['soil_rules'], self.seasons)
+        self.advisory = AdvisoryTable(self.engine, self.seasons, self.catalog)
+
+        crop_defaults = data['crop_defaults']
+        soil_defaults = data['soil_defaults']
+        self._crop_defaults = crop_defaults
+        self._soil_defaults = soil_defaults
+
+        crop_names = list(data['crops'])
+        crop_names += [crop['name'] for crop in self.engine.crops if crop['name'] not in crop_names]
+        self._crops = MappingProxyType({
+            name: _crop_profile(name, {**crop_defaults, **data['crops'].get(name, {})})
+            for name in crop_names
+        })
+
+        soil_names = list(data['soils'])
+        soil_names += [name for name in dict.fromkeys(self.engine.soil_types) if name not in soil_names]
+        self._soils = MappingProxyType({
+            name: _soil_profile(name, {**soil_defaults, **data['soils'].get(name, {})})
+            for name in soil_names
+        })
+
+        self._index = MappingProxyType({
+            (soil, crop, season): self._recommendation(self._soils[soil], self._crops[crop], season)
+            for soil, crop, season in product(self._soils, self._crops, self.seasons)
+        })
+
+    def crop(self, name):
+        """Look up a crop, falling back to the default profile"""
+        profile = self._crops.get(name)
+        if profile is None:
+            profile = _crop_profile(name, self._crop_defaults)
+        return profile
+
+    def soil(self, name):
+        """Look up a soil type, falling back to the default profile"""
+        profile = self._soils.get(name)
+        if profile is None:
+            profile = _soil_profile(name, self._soil_defaults)
+        return profile
+
+    def lookup(self, soil, crop, season):
+        """O(1) lookup of the precomputed (soil, crop, season) recommendation"""
+        recommendation = self._index.get((soil, crop, season))
+        if recommendation is None:
+            recommendation = self._recommendation(self.soil(soil), self.crop(crop), season)
+        return recommendation
+
+    @property
+    def crop_names(self):
+        """Names of all crops with a profile"""
+        return tuple(self._crops)
+
+    @property
+    def soil_names(self):
+        """Names of all soil types with a profile"""
+        return tuple(self._soils)
+
+    @staticmethod
+    def _recommendation(soil, crop, season):
+        """Combine soil and crop profiles into one (soil, crop, season) entry"""
+        return Recommendation(soil, crop, season, crop.water_mm * soil.water_multiplier)
+
+
+_current = None
+_reload_lock = threading.Lock()
+
+
+def load_knowledge_base(path=None):
+    """Read and compile a knowledge base file without activating it"""
+    path = path or Config.KNOWLEDGE_BASE_PATH
+    with open(path, encoding='utf-8') as f:
+        return KnowledgeBase(json.load(f), source=path, mtime=os.fstat(f.fileno()).st_mtime)
+
+
+def reload_knowledge_base(path=None):
+    """
+    Load a knowledge base file and make it the active version
+    Requests already running keep the version they started with.
+    """
+    global _current
+    with _reload_lock:
+        _current = load_knowledge_base(path)
+        return _current
+
+
+def get_knowledge_base():
+    """Return the active knowledge base, loading it on first use"""
+    return _current or reload_knowledge_base()
+
+
+def reload_if_changed():
+    """Reload the active knowledge base only if its file has been modified"""
+    current = get_knowledge_base()
+    if current.source and os.path.getmtime(current.source) != current.mtime:
+        return reload_knowledge_base(current.source)
+    return current
@@ -0,0 +1,142 @@
+"""
+Simple load test for the analysis endpoint
+
+    python loadtest.py --url http://localhost:5000 --concurrency 8 --requests 400
+    python loadtest.py --workers 1,2,4,8        # start gunicorn with each worker count
+
+Posts a synthetic soil photo to /api/analyze from several client threads
+and reports throughput and latency percentiles. Each request uses a
+different temperature so the result cache does not short-circuit the work.
+
+With --workers, the server is started here (gunicorn.conf.py, production
+settings, rate limit off) once per worker count and the runs are reported
+together with their speedup over the first, to show how throughput scales
+with processes. The load generator runs on the same host, so leave it
+spare cores.
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from PIL import Image
+
+
+def make_image(width, height, seed=0):
+    """
+    Encode a brown soil-like JPEG
+    Its texture is in 16-pixel clods; per-pixel noise would average out in
+    the quality check's thumbnail and be rejected as blurry.
+    """
+    rng = np.random.default_rng(seed)
+    base = np.array([120, 90, 60], dtype=np.int16)
+    clods = rng.integers(-40, 40, size=(height // 16 + 1, width // 16 + 1, 3), dtype=np.int16)
+    pixels = base + clods.repeat(16, 0).repeat(16, 1)[:height, :width]
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def run(url, image_bytes, total, concurrency):
+    """Fire `total` requests from `concurrency` threads; return a summary dict"""
+    session = requests.Session()
+
+    def one(i):
+        start = time.perf_counter()
+        response = session.post(
+            f'{url}/api/analyze',
+            files={'soil_image': ('soil.jpg', image_bytes, 'image/jpeg')},
+            data={'season': 'kharif', 'temperature': 20 + (i % 1000) / 100, 'rainfall': 800}
+        )
+        return time.perf_counter() - start, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array([latency for latency, _ in results]) * 1000
+    errors = {}
+    for _, status in results:
+        if status != 200:
+            errors[status] = errors.get(status, 0) + 1
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'errors': errors,
+        'seconds': round(elapsed, 2),
+        'requests_per_sec': round(total / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 1),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 1),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 1)
+    }
+
+
+def start_server(workers, port):
+    """Start gunicorn with `workers` processes and wait until it answers"""
+    env = dict(os.environ, APP_ENV='production', WEB_CONCURRENCY=str(workers), BIND=f'127.0.0.1:{port}',
+               RATE_LIMIT_STORE='')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/api/health', timeout=1).raise_for_status()
+            return server
+        except requests.RequestException:
+            if server.poll() is not None:
+                break
+            time.sleep(0.5)
+    server.kill()
+    raise RuntimeError(f'gunicorn with {workers} workers did not start')
+
+
+def sweep(worker_counts, image_bytes, total, concurrency, port):
+    """Run the load test against a fresh server per worker count"""
+    runs = []
+    for workers in worker_counts:
+        server = start_server(workers, port)
+        try:
+            # Warm every worker before measuring
+            run(f'http://127.0.0.1:{port}', image_bytes, workers * 4, concurrency)
+            summary = run(f'http://127.0.0.1:{port}', image_bytes, total, concurrency)
+        finally:
+            server.terminate()
+            server.wait()
+        summary['workers'] = workers
+        summary['speedup'] = round(summary['requests_per_sec'] / runs[0]['requests_per_sec'], 2) if runs else 1.0
+        runs.append(summary)
+    return {'cpu_count': os.cpu_count(), 'runs': runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--workers', help='comma-separated gunicorn worker counts to start and compare')
+    parser.add_argument('--port', type=int, default=5099, help='port for the servers started by --workers')
+    args = parser.parse_args()
+
+    image_bytes = make_image(args.width, args.height)
+    if args.workers:
+        counts = [int(count) for count in args.workers.split(',')]
+        print(json.dumps(sweep(counts, image_bytes, args.requests, args.concurrency, args.port), indent=2))
+    else:
+        print(json.dumps(run(args.url, image_bytes, args.requests, args.concurrency), indent=2))
+
+
+if __name__ == '__main__':
+    main()
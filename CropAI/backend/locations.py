@@ -0,0 +1,220 @@
+"""
+District location index for AI Crop Recommendation System
+
+A read-only index of Indian districts, built by build_locations.py into
+Config.LOCATIONS_INDEX_PATH:
+
+    index.json                  seasons, states, climate subdivisions, version
+    districts.npy               name, state, IMD subdivision per district
+    climate.npy                 float32 (subdivisions, seasons, fields) normals
+    keys.npy                    sorted search keys (names, aliases, word groups)
+    trigrams*.npy               trigram -> key postings for misspelt queries
+
+The arrays are memory-mapped, so every worker shares the same pages and
+loading costs nothing until a query touches them. Prefix lookup is a
+binary search over the sorted keys; when nothing matches the prefix the
+query's trigrams are scored against the keys instead. A typeahead query
+takes tens of microseconds.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+from config import Config
+from text import normalize
+
+INDEX_FILE = 'index.json'
+
+# Fixed width of a search key in bytes; build_locations.py rejects longer keys
+KEY_LENGTH = 32
+
+# Normals stored per subdivision and season, in this order
+CLIMATE_FIELDS = ('temperature', 'humidity', 'rainfall')
+
+# How a search key was derived; lower kinds rank first
+KIND_NAME = 0
+KIND_ALIAS = 1
+KIND_WORDS = 2
+
+# Trigram similarity (Dice coefficient) a misspelt query needs to match a key
+FUZZY_MIN_SIMILARITY = 0.4
+
+# Stricter similarity for resolving a free-text location to one district
+RESOLVE_MIN_SIMILARITY = 0.6
+
+
+def trigrams(key):
+    """Sorted distinct trigram codes of a normalized key, padded with spaces"""
+    padded = f' {key} '.encode('ascii')
+    return sorted({(padded[i] << 16) | (padded[i + 1] << 8) | padded[i + 2] for i in range(len(padded) - 2)})
+
+
+class LocationIndex:
+    """Memory-mapped district index with prefix and fuzzy search"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE), encoding='utf-8') as f:
+            header = json.load(f)
+        self.version = header['version']
+        self.seasons = list(header['seasons'])
+        self.states = list(header['states'])
+        self.subdivisions = header['subdivisions']
+        if tuple(header['climate_fields']) != CLIMATE_FIELDS:
+            raise ValueError(f'Location index {path} has a different climate layout')
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode='r').view(np.ndarray)
+
+        self.districts = load('districts.npy')
+        self.climate_normals = load('climate.npy')
+        keys = load('keys.npy')
+        self._keys = keys['key']
+        self._key_district = keys['district']
+        self._key_kind = keys['kind']
+        self._key_grams = keys['grams']
+        self._trigrams = load('trigrams.npy')
+        self._trigram_offsets = load('trigram_offsets.npy')
+        self._trigram_postings = load('trigram_postings.npy')
+        self._state_keys = [normalize(state) for state in self.states]
+        if len(self.districts) != header['districts'] or len(keys) != header['keys']:
+            raise ValueError(f'Location index {path} is incomplete; rebuild it with build_locations.py')
+
+    def __len__(self):
+        return len(self.districts)
+
+    def search(self, query, limit=10):
+        """
+        Districts matching a typed prefix, or resembling a misspelt name
+        Exact names come first, then names before aliases, then shorter keys.
+        Returns: list of district dicts (see describe)
+        """
+        key = normalize(query)[:KEY_LENGTH]
+        if not key or limit < 1:
+            return []
+        positions = self._prefix(key)
+        if not len(positions):
+            positions, _ = self._fuzzy(key, FUZZY_MIN_SIMILARITY)
+        return [self.describe(district, self._keys[position].decode('ascii'))
+                for district, position in self._distinct(positions, limit)]
+
+    def resolve(self, location):
+        """
+        District for a free-text location such as "Hubli" or "Aurangabad, Bihar"
+        Text after the first comma narrows the match to a state.
+        Returns: district index, or None if nothing matches closely enough
+        """
+        name, _, state = str(location or '').partition(',')
+        key = normalize(name)[:KEY_LENGTH]
+        if not key:
+            return None
+        state_key = normalize(state)
+        states = {i for i, candidate in enumerate(self._state_keys) if state_key and candidate.startswith(state_key)}
+
+        encoded = key.encode('ascii')
+        low = np.searchsorted(self._keys, encoded, 'left')
+        high = np.searchsorted(self._keys, encoded, 'right')
+        positions = np.arange(low, high)
+        if len(positions):
+            positions = positions[np.argsort(self._key_kind[positions], kind='stable')]
+        else:
+            positions, _ = self._fuzzy(key, RESOLVE_MIN_SIMILARITY)
+
+        districts = [district for district, _ in self._distinct(positions, len(positions))]
+        in_state = [district for district in districts if self.districts[district]['state'] in states]
+        candidates = in_state or districts
+        return candidates[0] if candidates else None
+
+    def describe(self, district, match=None):
+        """Public fields of one district"""
+        row = self.districts[district]
+        name = row['name'].decode('utf-8')
+        state = self.states[row['state']]
+        result = {
+            'name': name,
+            'state': state,
+            'label': f'{name}, {state}',
+            'climate_region': self.subdivisions[row['subdivision']]['name']
+        }
+        if match is not None and match != normalize(name):
+            result['match'] = match
+        return result
+
+    def climate(self, district, season):
+        """
+        Climate normals for a district in a season
+        Temperature and humidity are seasonal means; rainfall is the annual
+        total, as the analysis form asks for. None for an unknown season.
+        """
+        if season not in self.seasons:
+            return None
+        normals = self.climate_normals[self.districts[district]['subdivision']]
+        temperature, humidity, _ = normals[self.seasons.index(season)]
+        return {
+            'temperature': round(float(temperature), 1),
+            'rainfall': round(float(normals[:, 2].sum()), 1),
+            'humidity': round(float(humidity), 1)
+        }
+
+    def _prefix(self, key):
+        """Positions of keys starting with `key`, best first"""
+        encoded = key.encode('ascii')
+        low = np.searchsorted(self._keys, encoded, 'left')
+        high = np.searchsorted(self._keys, encoded + b'\xff', 'left')
+        if high == low:
+            return np.empty(0, dtype=np.intp)
+        lengths = np.char.str_len(self._keys[low:high])
+        order = np.lexsort((lengths, self._key_kind[low:high], lengths != len(encoded)))
+        return low + order
+
+    def _fuzzy(self, key, min_similarity):
+        """
+        Positions of keys sharing enough trigrams with `key`, most similar first
+        Returns: (positions, similarities)
+        """
+        grams = np.array(trigrams(key), dtype=np.uint32)
+        slots = np.searchsorted(self._trigrams, grams)
+        found = slots < len(self._trigrams)
+        found[found] = self._trigrams[slots[found]] == grams[found]
+        slots = slots[found]
+        if not len(slots):
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        starts, ends = self._trigram_offsets[slots], self._trigram_offsets[slots + 1]
+        hits = np.concatenate([self._trigram_postings[start:end] for start, end in zip(starts, ends)])
+        positions, shared = np.unique(hits, return_counts=True)
+        similarity = 2.0 * shared / (len(grams) + self._key_grams[positions])
+        keep = similarity >= min_similarity
+        positions, similarity = positions[keep], similarity[keep]
+        order = np.lexsort((self._key_kind[positions], -similarity))
+        return positions[order].astype(np.intp), similarity[order]
+
+    def _distinct(self, positions, limit):
+        """First key position per district, in order, up to `limit` districts"""
+        seen = {}
+        for position in positions:
+            district = int(self._key_district[position])
+            if district not in seen:
+                seen[district] = int(position)
+                if len(seen) == limit:
+                    break
+        return seen.items()
+
+
+_current = None
+_reload_lock = threading.Lock()
+
+
+def reload_location_index(path=None):
+    """Open the location index and make it the active one"""
+    global _current
+    with _reload_lock:
+        _current = LocationIndex(path or Config.LOCATIONS_INDEX_PATH)
+        return _current
+
+
+def get_location_index():
+    """Return the active location index, opening it on first use"""
+    return _current or reload_location_index()
@@ -0,0 +1,196 @@
+"""
+Logging and metrics for AI Crop Recommendation System
+
+Logging: configure_logging() installs a formatter that writes either
+plain text or one JSON object per line. Fields passed with `extra=` are
+kept as structured key/value pairs. Call sites use lazy %-formatting, so
+a disabled level costs only a level check.
+
+Metrics: a small, dependency-free subset of the Prometheus data model
+(counters and histograms with labels) rendered in the text exposition
+format for /api/metrics. Metrics are per process; with several server
+workers, scrape each one or aggregate behind a push gateway.
+"""
+
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Format records as text with key=value extras, or as JSON lines"""
+
+    def __init__(self, as_json=False):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record):
+        fields = {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+        if self.as_json:
+            entry = {
+                'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+                'level': record.levelname,
+                'logger': record.name,
+                'message': record.getMessage()
+            }
+            entry.update(fields)
+            if record.exc_info:
+                entry['exception'] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str)
+
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} {record.getMessage()}"
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level='INFO', as_json=False):
+    """Send application logs to stderr with the structured formatter"""
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(as_json))
+    logger = logging.getLogger('cropai')
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+
+def _format_labels(names, values, extra=()):
+    """Render a Prometheus label set such as {stage="decode",le="0.5"}"""
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        """Add amount to the series identified by the label values"""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {value}')
+        return lines
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets"""
+
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        """Record one observation"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labelvalues, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, [('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {series[-1]}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Collection of metrics plus callbacks for values computed at scrape time"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Register a callable returning extra exposition lines"""
+        self._collectors.append(collector)
+
+    def render(self):
+        """Render every metric in the Prometheus text format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    'cropai_requests_total', 'HTTP requests handled', ['endpoint', 'method', 'status'])
+REQUEST_SECONDS = registry.histogram(
+    'cropai_request_seconds', 'HTTP request latency in seconds', ['endpoint'])
+ERRORS = registry.counter(
+    'cropai_errors_total', 'Requests that failed with an exception', ['endpoint', 'type'])
+STAGE_SECONDS = registry.histogram(
+    'cropai_stage_seconds', 'Time spent in each analysis stage in seconds', ['stage'])
+ADMISSION_REJECTED = registry.counter(
+    'cropai_admission_rejected_total', 'Requests turned away by admission control', ['endpoint', 'reason'])
+QUALITY_REJECTED = registry.counter(
+    'cropai_quality_rejected_total', 'Photos turned away by the quality pre-check, per problem', ['problem'])
+IMAGE_BYTES = registry.histogram(
+    'cropai_image_bytes', 'Size of uploaded images in bytes',
+    buckets=(64 * 1024, 256 * 1024, 1024 ** 2, 2 * 1024 ** 2, 4 * 1024 ** 2, 8 * 1024 ** 2, 16 * 1024 ** 2))
+IMAGE_PIXELS = registry.histogram(
+    'cropai_image_pixels', 'Source resolution of uploaded images in pixels',
+    buckets=(300e3, 1e6, 3e6, 8e6, 12e6, 24e6, 48e6))
+
+
+@contextmanager
+def timed(stage):
+    """Time a block and record it under cropai_stage_seconds{stage=...}"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage)
@@ -0,0 +1,55 @@
+"""
+Analysis pipeline fingerprint for AI Crop Recommendation System
+
+Every analysis response carries `pipeline`, a hash of everything besides
+the image and farm inputs that decides its result:
+
+    PIPELINE_VERSION    bumped whenever feature or classification code
+                        changes results
+    knowledge base      KnowledgeBase.digest (soil rules, crop tables)
+    feature settings    FEATURE_MAX_SIDE of the active settings, plus the
+                        texture descriptor layout when a soil model is
+                        active
+    soil model          name@version of the active model, or none
+
+Classification is deterministic (confidence comes from the features, see
+rules.py), so two analyses of the same image and inputs under the same
+fingerprint are identical apart from their timestamp. The fingerprint is
+part of the result cache key.
+"""
+
+import hashlib
+import json
+from functools import lru_cache
+
+PIPELINE_VERSION = 3
+
+
+def pipeline_fingerprint(kb, model, max_side):
+    """
+    16 hex digit fingerprint of a knowledge base, soil model (None for the
+    rules alone) and the FEATURE_MAX_SIDE images are analysed at
+    """
+    return _fingerprint(kb.digest, model.label if model is not None else None, max_side)
+
+
+@lru_cache(maxsize=32)
+def _fingerprint(kb_digest, model_label, max_side):
+    parts = {'version': PIPELINE_VERSION, 'knowledge_base': kb_digest, 'max_side': max_side,
+             'model': model_label}
+    if model_label is not None:
+        from texture import FEATURE_NAMES, TEXTURE_SIDE
+        parts['descriptor'] = {'side': TEXTURE_SIDE, 'features': list(FEATURE_NAMES)}
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def content_etag(*parts):
+    """
+    Entity tag over bytes and JSON-serializable parts, used as a weak ETag
+    (same content, whatever its timestamp or Content-Encoding)
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else json.dumps(part, sort_keys=True).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:32]
@@ -0,0 +1,241 @@
+"""
+What-if crop planning for AI Crop Recommendation System
+
+Evaluates every crop x soil type against a grid of scenarios (rainfall,
+area and price) as NumPy array operations, using the same knowledge base
+tables and formulas as utils.calculate_roi, utils.estimate_yield and
+utils.calculate_irrigation_requirement:
+
+    yield_t_ha       base_yield x 0.8 below 500 mm rain, x 0.9 above 1500 mm
+    investment       cost_per_ha x area
+    revenue          revenue_per_ha x area x price (price 1.0 = table prices)
+    roi_percentage   (revenue - investment) / investment x 100
+    water_mm         crop water need x soil water multiplier (season lookup)
+
+Arrays keep the natural shape of what they depend on (ROI does not depend
+on soil, water does not depend on rainfall) and are only broadcast to
+(crops, soils, scenarios) when summarised, so a 10,000-scenario sweep over
+every crop and soil takes a few milliseconds. Values are rounded only when
+a table row is emitted, in the same way as the scalar functions, so a
+single scenario reproduces their results exactly.
+"""
+
+import numpy as np
+
+# Rainfall (mm) outside which yields drop, and by how much (see utils.estimate_yield)
+LOW_YIELD_RAINFALL = 500
+HIGH_YIELD_RAINFALL = 1500
+LOW_RAINFALL_YIELD_FACTOR = 0.8
+HIGH_RAINFALL_YIELD_FACTOR = 0.9
+
+# Scenario dimensions and their values when a request leaves one out
+SCENARIO_DEFAULTS = {'rainfall': 800.0, 'area': 1.0, 'price': 1.0}
+
+# Cubic metres of water per millimetre over one hectare
+M3_PER_MM_HA = 10.0
+
+
+class PlanError(ValueError):
+    """A planning request is invalid"""
+
+
+def yield_factor(rainfall):
+    """Yield multiplier for annual rainfall (array)"""
+    rainfall = np.asarray(rainfall, dtype=np.float64)
+    return np.where(rainfall < LOW_YIELD_RAINFALL, LOW_RAINFALL_YIELD_FACTOR,
+                    np.where(rainfall > HIGH_YIELD_RAINFALL, HIGH_RAINFALL_YIELD_FACTOR, 1.0))
+
+
+def scenario_values(spec, name, max_values):
+    """
+    Values of one scenario dimension: a number, a list of numbers, or a
+    range {"start", "stop", "steps"} (inclusive, evenly spaced, at most
+    max_values steps)
+    """
+    if isinstance(spec, dict):
+        try:
+            start, stop, steps = float(spec['start']), float(spec['stop']), int(spec.get('steps', 10))
+        except (KeyError, TypeError, ValueError):
+            raise PlanError(f'{name} range needs numeric start, stop and steps')
+        # Checked before linspace allocates them
+        if not 1 <= steps <= max_values:
+            raise PlanError(f'{name} steps must be between 1 and {max_values}')
+        values = np.linspace(start, stop, steps)
+    else:
+        try:
+            values = np.atleast_1d(np.asarray(spec, dtype=np.float64))
+        except (TypeError, ValueError):
+            raise PlanError(f'{name} must be a number, a list of numbers or a range')
+    if values.ndim != 1 or not len(values) or not np.isfinite(values).all():
+        raise PlanError(f'{name} must contain at least one finite number')
+    if name in ('area', 'price') and (values <= 0).any():
+        raise PlanError(f'{name} must be positive')
+    return values
+
+
+def scenario_grid(scenarios, max_scenarios):
+    """
+    Every combination of the scenario dimensions
+    Returns: dict of equal-length 1-D arrays (rainfall, area, price)
+    """
+    unknown = set(scenarios) - set(SCENARIO_DEFAULTS)
+    if unknown:
+        raise PlanError(f"Unknown scenario dimensions: {', '.join(sorted(unknown))}")
+    axes = [scenario_values(scenarios.get(name, default), name, max_scenarios)
+            for name, default in SCENARIO_DEFAULTS.items()]
+    count = int(np.prod([len(axis) for axis in axes]))
+    if count > max_scenarios:
+        raise PlanError(f'{count} scenarios requested; the maximum is {max_scenarios}')
+    grids = np.meshgrid(*axes, indexing='ij')
+    return {name: grid.ravel() for name, grid in zip(SCENARIO_DEFAULTS, grids)}
+
+
+class Plan:
+    """
+    Outcomes of every crop x soil x scenario, stored broadcastable to
+    (crops, soils, scenarios)
+    """
+
+    def __init__(self, kb, crops, soils, season, scenarios):
+        self.crops = list(crops)
+        self.soils = list(soils)
+        self.season = season
+        self.scenarios = scenarios
+        profiles = [kb.crop(name) for name in self.crops]
+
+        def column(field):
+            return np.array([getattr(profile, field) for profile in profiles], dtype=np.float64)[:, None, None]
+
+        rainfall = scenarios['rainfall'][None, None, :]
+        area = scenarios['area'][None, None, :]
+        price = scenarios['price'][None, None, :]
+
+        cost_per_ha, revenue_per_ha = column('cost_per_ha'), column('revenue_per_ha')
+        self.yield_t_ha = column('base_yield') * yield_factor(rainfall)           # (crops, 1, scenarios)
+        self.total_yield_t = self.yield_t_ha * area
+        self.investment = cost_per_ha * area
+        self.revenue = revenue_per_ha * area * price
+        self.net_profit = self.revenue - self.investment
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.roi_percentage = np.where(self.investment > 0, (self.net_profit / self.investment) * 100, 0.0)
+        self.water_mm = np.array([[kb.lookup(soil, crop, season).water_mm for soil in self.soils]
+                                  for crop in self.crops], dtype=np.float64)[:, :, None]  # (crops, soils, 1)
+        self.water_m3 = self.water_mm * area * M3_PER_MM_HA
+
+    @property
+    def shape(self):
+        return len(self.crops), len(self.soils), len(self.scenarios['area'])
+
+    def full(self, name):
+        """One outcome broadcast to (crops, soils, scenarios) (a read-only view)"""
+        return np.broadcast_to(getattr(self, name), self.shape)
+
+    def best_crop_share(self, outcome='net_profit'):
+        """Fraction of scenarios in which each crop has the highest outcome on each soil: (crops, soils)"""
+        crops, soils, scenarios = self.shape
+        values = getattr(self, outcome)
+        best = values.argmax(axis=0)                               # (soils or 1, scenarios)
+        flat = best + np.arange(best.shape[0])[:, None] * crops
+        counts = np.bincount(flat.ravel(), minlength=best.shape[0] * crops).reshape(best.shape[0], crops)
+        return np.broadcast_to(counts.T / scenarios, (crops, soils))
+
+    def scenario(self, crop, soil, index):
+        """Outcomes of one crop, soil and scenario, rounded like the scalar functions"""
+        c, k = self.crops.index(crop), self.soils.index(soil)
+
+        def value(name):
+            return float(self.full(name)[c, k, index])
+
+        investment, revenue = value('investment'), value('revenue')
+        return {
+            'crop': crop,
+            'soil_type': soil,
+            'rainfall': float(self.scenarios['rainfall'][index]),
+            'area': float(self.scenarios['area'][index]),
+            'price': float(self.scenarios['price'][index]),
+            'total_investment': investment,
+            'expected_revenue': revenue,
+            'net_profit': revenue - investment,
+            'roi_percentage': round(value('roi_percentage'), 2),
+            'yield_t_ha': round(value('yield_t_ha'), 1),
+            'water_mm': round(value('water_mm'), 2),
+            'water_m3': round(value('water_m3'), 1)
+        }
+
+
+def _stats(plan, name, decimals):
+    """min / mean / max of one outcome over the scenario axis, each (crops, soils)"""
+    values = getattr(plan, name)
+    shape = plan.shape[:2]
+    return (np.broadcast_to(values.min(axis=2), shape), np.broadcast_to(values.mean(axis=2), shape),
+            np.broadcast_to(values.max(axis=2), shape), decimals)
+
+
+def _table(plan, order, columns, top):
+    """Rows for the first `top` (crop, soil) pairs in `order` (flat indices)"""
+    rows = []
+    for flat in order[:top]:
+        c, k = np.unravel_index(flat, plan.shape[:2])
+        row = {'crop': plan.crops[c], 'soil_type': plan.soils[k]}
+        for name, (low, mean, high, decimals) in columns.items():
+            row[name] = {'min': round(float(low[c, k]), decimals),
+                         'mean': round(float(mean[c, k]), decimals),
+                         'max': round(float(high[c, k]), decimals)}
+        rows.append(row)
+    return rows
+
+
+def summarize(plan, top=20):
+    """
+    Ranked ROI, yield and water tables over all scenarios
+    Each row is one crop on one soil with min / mean / max across scenarios.
+    """
+    pairs = plan.shape[0] * plan.shape[1]
+    top = max(1, min(top, pairs))
+
+    roi = _stats(plan, 'roi_percentage', 2)
+    profit = _stats(plan, 'net_profit', 2)
+    yields = _stats(plan, 'yield_t_ha', 1)
+    total_yield = _stats(plan, 'total_yield_t', 2)
+    water = _stats(plan, 'water_mm', 2)
+    water_m3 = _stats(plan, 'water_m3', 1)
+    share = plan.best_crop_share()
+
+    # Ties keep crop, then soil order (stable sorts)
+    roi_order = np.argsort(-roi[1].ravel(), kind='stable')
+    yield_order = np.argsort(-yields[1].ravel(), kind='stable')
+    water_order = np.argsort(water[1].ravel(), kind='stable')
+
+    roi_rows = _table(plan, roi_order, {'roi_percentage': roi, 'net_profit': profit}, top)
+    for row in roi_rows:
+        c, k = plan.crops.index(row['crop']), plan.soils.index(row['soil_type'])
+        row['best_profit_share'] = round(float(share[c, k]), 4)
+
+    return {
+        'season': plan.season,
+        'crops': len(plan.crops),
+        'soils': len(plan.soils),
+        'scenarios': plan.shape[2],
+        'roi': roi_rows,
+        'yield': _table(plan, yield_order, {'yield_t_ha': yields, 'total_yield_t': total_yield}, top),
+        'water': _table(plan, water_order, {'water_mm': water, 'water_m3': water_m3}, top)
+    }
+
+
+def build_plan(kb, crops=None, soils=None, season=None, scenarios=None, max_scenarios=100000):
+    """
+    Validate a planning request against the knowledge base and evaluate it
+    Raises: PlanError
+    """
+    crops = [crops] if isinstance(crops, str) else list(crops or kb.crop_names)
+    soils = [soils] if isinstance(soils, str) else list(soils or kb.soil_names)
+    unknown = [name for name in crops if name not in kb.crop_names]
+    unknown += [name for name in soils if name not in kb.soil_names]
+    if unknown:
+        raise PlanError(f"Unknown crops or soil types: {', '.join(unknown)}")
+    season = season or kb.seasons[0]
+    if season not in kb.seasons:
+        raise PlanError(f"season must be one of: {', '.join(kb.seasons)}")
+    if not isinstance(scenarios or {}, dict):
+        raise PlanError('scenarios must be an object of rainfall, area and price values')
+    return Plan(kb, crops, soils, season, scenario_grid(scenarios or {}, max_scenarios))
@@ -0,0 +1,123 @@
+"""
+Image quality pre-check for AI Crop Recommendation System
+
+Blurry, dark, overexposed or non-soil photos would still get a confident
+looking soil type, so they are turned away before the full decode with
+feedback the farmer can act on. The check works on a thumbnail of at
+most QUALITY_CHECK_SIDE pixels. A JPEG is decoded straight to it at 1/8
+scale (draft mode), which skips most of the decode work but still has to
+read the whole file. Other formats cannot be decoded at a reduced size,
+so they are checked on the analysis-size image after it is decoded.
+
+    sharpness       variance of the Laplacian of the grey thumbnail;
+                    low means out of focus, shaken, or featureless
+    dark_clipped    fraction of pixels crushed to black (every channel <= 10)
+    bright_clipped  fraction of pixels blown out (some channel >= 250)
+    brightness      mean luma (0-255)
+    soil_colour     fraction of pixels with a plausible soil colour: grey,
+                    very dark, or a red/orange/yellow-brown hue that is
+                    not oversaturated (vegetation, sky and water are not);
+                    sampled from every other row and column
+
+Thresholds live in Config.QUALITY_*.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+from features import draft_image
+
+# Channel values at or beyond which a pixel counts as clipped
+DARK_CLIP = 10
+BRIGHT_CLIP = 250
+
+# Soil colours: hue (degrees) from red through yellow-brown, or nearly grey, or very dark
+SOIL_HUE_MAX = 65
+SOIL_HUE_WRAP = 330
+SOIL_MAX_SATURATION = 0.85
+GREY_SATURATION = 0.15
+DARK_VALUE = 40
+
+# Problems in the order they are reported, with what to do about them
+FEEDBACK = {
+    'blurry': 'The photo is blurry. Hold the phone steady, tap the soil to focus and take it again.',
+    'too_dark': 'The photo is too dark. Take it in daylight, or in the shade without a dark cast.',
+    'overexposed': 'The photo is overexposed. Avoid direct sun glare or flash on the soil and take it again.',
+    'not_soil': ('The photo does not look like bare soil. Fill the frame with the soil surface, '
+                 'without plants, sky or water.')
+}
+
+QualityReport = namedtuple('QualityReport', 'passed metrics problems')
+
+
+def draft_thumbnail(stream, side):
+    """
+    A JPEG upload decoded at reduced scale to at most `side` pixels, as an
+    RGB array, leaving the stream rewound; None for other formats
+    """
+    img = Image.open(stream)
+    try:
+        if img.format != 'JPEG':
+            return None
+        img = draft_image(img, side)
+        img = img.convert('RGB')
+        img.thumbnail((side, side))
+        return np.asarray(img)
+    finally:
+        stream.seek(0)
+
+
+def image_thumbnail(img, side):
+    """An already decoded PIL image reduced to at most `side` pixels, as an RGB array"""
+    thumb = img.convert('RGB') if img.mode != 'RGB' else img.copy()
+    thumb.thumbnail((side, side))
+    return np.asarray(thumb)
+
+
+def measure(rgb):
+    """Quality metrics of an RGB uint8 thumbnail (see the module docstring)"""
+    r, g, b = (rgb[..., channel].astype(np.float32) for channel in range(3))
+    luma = 0.299 * r + 0.587 * g + 0.114 * b
+    laplacian = (luma[1:-1, :-2] + luma[1:-1, 2:] + luma[:-2, 1:-1] + luma[2:, 1:-1]
+                 - 4 * luma[1:-1, 1:-1])
+    brightest = np.maximum(np.maximum(r, g), b)
+
+    # Colour plausibility does not need every pixel
+    r, g, b, high = r[::2, ::2], g[::2, ::2], b[::2, ::2], brightest[::2, ::2]
+    chroma = high - np.minimum(np.minimum(r, g), b)
+    saturation = np.divide(chroma, high, out=np.zeros_like(high), where=high > 0)
+    safe = np.where(chroma > 0, chroma, 1)
+    hue = np.where(high == r, ((g - b) / safe) % 6,
+                   np.where(high == g, (b - r) / safe + 2, (r - g) / safe + 4)) * 60
+    soil = ((saturation < GREY_SATURATION) | (high < DARK_VALUE) |
+            (((hue <= SOIL_HUE_MAX) | (hue >= SOIL_HUE_WRAP)) & (saturation <= SOIL_MAX_SATURATION)))
+
+    return {
+        'sharpness': round(float(laplacian.var()) if laplacian.size else 0.0, 1),
+        'dark_clipped': round(float((brightest <= DARK_CLIP).mean()), 3),
+        'bright_clipped': round(float((brightest >= BRIGHT_CLIP).mean()), 3),
+        'brightness': round(float(luma.mean()), 1),
+        'soil_colour': round(float(soil.mean()), 3)
+    }
+
+
+def assess(rgb, config):
+    """
+    Measure a thumbnail and compare it with the configured thresholds
+    Returns: QualityReport(passed, metrics, problems as [{'code', 'message'}])
+    """
+    metrics = measure(rgb)
+    found = set()
+    if metrics['dark_clipped'] > config.QUALITY_MAX_CLIPPED or metrics['brightness'] < config.QUALITY_MIN_BRIGHTNESS:
+        found.add('too_dark')
+    if metrics['bright_clipped'] > config.QUALITY_MAX_CLIPPED or metrics['brightness'] > config.QUALITY_MAX_BRIGHTNESS:
+        found.add('overexposed')
+    if metrics['soil_colour'] < config.QUALITY_MIN_SOIL_COLOUR:
+        found.add('not_soil')
+    # Sharpness means little for a photo of the wrong thing or without detail in the clipped parts
+    if not found and metrics['sharpness'] < config.QUALITY_MIN_SHARPNESS:
+        found.add('blurry')
+    problems = [{'code': code, 'message': message} for code, message in FEEDBACK.items() if code in found]
+    return QualityReport(not problems, metrics, problems)
@@ -0,0 +1,243 @@
+"""
+Resumable chunked uploads for AI Crop Recommendation System
+
+On a flaky mobile link a single multipart POST of a large photo starts
+over on every dropped connection. Clients can instead send the image in
+chunks (the frontend uses Config.RESUMABLE_CHUNK_SIZE):
+
+    POST   /api/uploads           {"filename", "size"} -> upload_id, offset 0
+    PATCH  /api/uploads/<id>      raw bytes, Upload-Offset header -> new offset
+    GET    /api/uploads/<id>      current offset, after a dropped connection
+    DELETE /api/uploads/<id>      give up
+
+and then analyse it by sending upload_id instead of soil_image. A chunk
+must start at the current offset (409 otherwise, with the offset to
+resume from). Bytes of an interrupted chunk that did arrive are kept.
+
+Each upload is a <id>.part file plus a <id>.json header under
+UPLOAD_FOLDER/resumable, so every worker process sees the same uploads.
+A chunk is first received into a temporary file; only appending it takes
+an exclusive lock (flock) on the part file, so a slow client never holds
+up other requests and two processes cannot both append at one offset.
+Uploads are deleted once analysed, or when untouched for
+RESUMABLE_UPLOAD_TTL.
+"""
+
+import json
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within this process
+    fcntl = None
+
+from werkzeug.datastructures import FileStorage
+
+from uploads import UploadError
+from utils import allowed_file
+
+_UPLOAD_ID = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+COPY_BUFFER = 64 * 1024
+
+
+class ResumableUploads:
+    """Chunked uploads stored as partial files in one folder"""
+
+    def __init__(self, folder, max_bytes, allowed_extensions, ttl_seconds, max_uploads):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.allowed_extensions = allowed_extensions
+        self.ttl_seconds = ttl_seconds
+        self.max_uploads = max_uploads
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def create(self, filename, size):
+        """
+        Start an upload of `size` bytes
+        Returns: status dict (see status)
+        Raises: UploadError
+        """
+        if not filename or not allowed_file(filename, self.allowed_extensions):
+            allowed = ', '.join(sorted(self.allowed_extensions))
+            raise UploadError(f'Unsupported file type. Allowed types: {allowed}', 415)
+        if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+            raise UploadError('size must be a positive number of bytes')
+        if size > self.max_bytes:
+            raise UploadError(f'Image too large (maximum {self.max_bytes // (1024 * 1024)} MB)', 413)
+
+        self.sweep()
+        if self.max_uploads and len(self._headers()) >= self.max_uploads:
+            raise UploadError('Too many uploads in progress. Please try again later.', 503)
+
+        upload_id = secrets.token_urlsafe(16)
+        os.makedirs(self.folder, exist_ok=True)
+        open(self._path(upload_id, 'part'), 'xb').close()
+        header = {'filename': os.path.basename(filename), 'size': size, 'created_at': time.time()}
+        temporary = self._path(upload_id, 'json.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(header, f)
+        os.replace(temporary, self._path(upload_id, 'json'))
+        return self.status(upload_id)
+
+    def status(self, upload_id):
+        """
+        Progress of an upload
+        Returns: dict with upload_id, filename, size, offset and complete,
+        or None for an unknown or expired upload
+        """
+        header = self._header(upload_id)
+        if header is None:
+            return None
+        try:
+            offset = os.path.getsize(self._path(upload_id, 'part'))
+        except OSError:
+            return None
+        return {
+            'upload_id': upload_id,
+            'filename': header['filename'],
+            'size': header['size'],
+            'offset': offset,
+            'complete': offset == header['size']
+        }
+
+    def append(self, upload_id, offset, stream, length):
+        """
+        Write one chunk of `length` bytes read from `stream` at `offset`
+        Returns: status dict after the chunk
+        Raises: UploadError (404 unknown, 409 wrong offset, 413 past the end)
+        """
+        state = self._require(upload_id)
+        if offset != state['offset']:
+            raise UploadError(f"Upload is at offset {state['offset']}, not {offset}", 409)
+        if length is None or offset + length > state['size']:
+            raise UploadError(f"Chunk does not fit the {state['size']} byte upload", 413)
+
+        with tempfile.TemporaryFile(dir=self.folder) as chunk:
+            # Keep whatever arrives, so an interrupted chunk resumes where it broke off
+            interrupted = None
+            try:
+                remaining = length
+                while remaining:
+                    data = stream.read(min(COPY_BUFFER, remaining))
+                    if not data:
+                        break
+                    chunk.write(data)
+                    remaining -= len(data)
+            except Exception as e:
+                interrupted = e
+            chunk.seek(0)
+
+            # Another request may have appended while this chunk arrived
+            with self._locked_part(upload_id) as part:
+                current = os.fstat(part.fileno()).st_size
+                if current != offset:
+                    raise UploadError(f'Upload is at offset {current}, not {offset}', 409)
+                shutil.copyfileobj(chunk, part, COPY_BUFFER)
+            if interrupted is not None:
+                raise interrupted
+        return self.status(upload_id)
+
+    def open(self, upload_id):
+        """
+        A completed upload as a FileStorage (the caller closes it)
+        Raises: UploadError (404 unknown, 409 incomplete)
+        """
+        state = self._require(upload_id)
+        if not state['complete']:
+            raise UploadError(f"Upload is incomplete ({state['offset']} of {state['size']} bytes)", 409)
+        stream = open(self._path(upload_id, 'part'), 'rb')
+        return FileStorage(stream=stream, filename=state['filename'])
+
+    def delete(self, upload_id):
+        """Remove an upload; returns False if it did not exist"""
+        if self._header(upload_id) is None:
+            return False
+        self._remove(upload_id)
+        return True
+
+    def sweep(self, force=False):
+        """Delete uploads idle for longer than the TTL (at most once a minute unless forced)"""
+        now = time.time()
+        if not force and now - self._last_sweep < 60:
+            return 0
+        self._last_sweep = now
+        removed = 0
+        for upload_id in self._headers():
+            try:
+                touched = max(os.path.getmtime(self._path(upload_id, 'part')),
+                              os.path.getmtime(self._path(upload_id, 'json')))
+            except OSError:
+                touched = 0
+            if now - touched > self.ttl_seconds:
+                self._remove(upload_id)
+                removed += 1
+        return removed
+
+    @contextmanager
+    def _locked_part(self, upload_id):
+        """The part file open for appending, locked against every other writer"""
+        try:
+            fd = os.open(self._path(upload_id, 'part'), os.O_WRONLY | os.O_APPEND)
+        except FileNotFoundError:
+            raise UploadError('Upload not found or expired', 404) from None
+        with os.fdopen(fd, 'ab') as part:
+            if fcntl is None:
+                with self._lock:
+                    yield part
+            else:
+                # Released when the file is closed
+                fcntl.flock(part.fileno(), fcntl.LOCK_EX)
+                yield part
+
+    def _require(self, upload_id):
+        state = self.status(upload_id)
+        if state is None:
+            raise UploadError('Upload not found or expired', 404)
+        return state
+
+    def _header(self, upload_id):
+        if not upload_id or not _UPLOAD_ID.match(upload_id):
+            return None
+        try:
+            with open(self._path(upload_id, 'json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _headers(self):
+        """IDs of every upload in the folder (created by the first upload)"""
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return []
+        return [name[:-5] for name in names if name.endswith('.json')]
+
+    def _path(self, upload_id, suffix):
+        return os.path.join(self.folder, f'{upload_id}.{suffix}')
+
+    def _remove(self, upload_id):
+        for suffix in ('json', 'part'):
+            try:
+                os.remove(self._path(upload_id, suffix))
+            except FileNotFoundError:
+                pass
+
+
+def create_resumable_uploads(config):
+    """Build the upload store from config (see Config.RESUMABLE_*)"""
+    return ResumableUploads(
+        os.path.join(config.UPLOAD_FOLDER, 'resumable'),
+        config.MAX_CONTENT_LENGTH,
+        config.ALLOWED_EXTENSIONS,
+        config.RESUMABLE_UPLOAD_TTL.total_seconds(),
+        config.RESUMABLE_MAX_UPLOADS
+    )
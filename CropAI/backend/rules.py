@@ -0,0 +1,212 @@
+"""
+Vectorized soil classification rules for AI Crop Recommendation System
+
+The soil rules and crop tables are plain data (see the knowledge base).
+Rules are checked in order and the first one whose conditions all hold
+wins; each condition is a (feature, operator, threshold) triple, where
+the features are r, g, b, brightness, variance, red_green_ratio (r / g),
+temperature and rainfall. Climate adjustments add a bonus to one crop's
+suitability (first match per crop, capped at max_suitability).
+
+A rule's confidence is [base, spread]: base + spread x margin, where the
+margin says how far the sample is from the nearest decision boundary -
+the closest threshold of its own rule, or of an earlier rule it just
+missed - as a fraction of that threshold, reaching 1 at MARGIN_SATURATION.
+Confidence is therefore a function of the features alone: identical
+inputs always give identical responses.
+
+RuleEngine compiles the ruleset into NumPy arrays once and evaluates a
+whole batch of samples in a single vectorized call; single samples go
+through the same code path, so classify() and evaluate() always agree.
+"""
+
+import operator
+from collections import namedtuple
+
+import numpy as np
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le
+}
+
+# Arrays produced by RuleEngine.evaluate (one row per sample):
+#   soil_index  - index into RuleEngine.soil_types
+#   confidence  - confidence percentage, rounded to 1 decimal
+#   crop_index  - (n, crops) indices into RuleEngine.crops, best crop first
+#   suitability - (n, crops) climate-adjusted suitability, same order
+Classification = namedtuple('Classification', 'soil_index confidence crop_index suitability')
+
+
+# Distance past a threshold, as a fraction of it, that earns a rule's full confidence
+MARGIN_SATURATION = 0.25
+
+
+def round_half_even_like_python(values, digits=1):
+    """Vectorized equivalent of Python's round(value, digits) for floats"""
+    rounded = np.round(values, digits)
+    scaled = values * 10 ** digits
+    # np.round can differ from round() only on values that look like ties
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-9
+    for index in np.flatnonzero(ties):
+        rounded.flat[index] = round(float(values.flat[index]), digits)
+    return rounded
+
+
+class RuleEngine:
+    """Evaluates a soil ruleset and crop tables over arrays of samples"""
+
+    def __init__(self, soil_rules, climate_adjustments, max_suitability):
+        self.soil_rules = soil_rules
+        self.climate_adjustments = climate_adjustments
+        self.max_suitability = max_suitability
+        self.soil_types = [rule['soil_type'] for rule in soil_rules]
+        # First rule for each soil type, used when a model picks the soil
+        self.soil_index = {}
+        for index, soil_type in enumerate(self.soil_types):
+            self.soil_index.setdefault(soil_type, index)
+
+        # Compile the crop tables into one flat list plus per-rule index rows
+        self.crops = []
+        rows = []
+        for rule in soil_rules:
+            rows.append([len(self.crops) + i for i in range(len(rule['crops']))])
+            self.crops.extend(rule['crops'])
+        if len({len(row) for row in rows}) != 1:
+            raise ValueError('Every soil rule must list the same number of crops')
+
+        self._rule_crops = np.array(rows, dtype=np.intp)
+        self._base_suitability = np.array([crop['suitability'] for crop in self.crops], dtype=np.float64)
+        self._conf_base = np.array([rule['confidence'][0] for rule in soil_rules], dtype=np.float64)
+        self._conf_spread = np.array([rule['confidence'][1] for rule in soil_rules], dtype=np.float64)
+
+        crop_names = [crop['name'] for crop in self.crops]
+        self._adjustment_crops = [
+            np.array([name == adjustment['crop'] for name in crop_names])
+            for adjustment in climate_adjustments
+        ]
+
+    def evaluate(self, r, g, b, brightness, variance, temperature, rainfall, soil_index=None):
+        """
+        Classify a batch of samples given as equal-length arrays (or scalars)
+        soil_index, if given, skips the soil rules and only ranks crops.
+        Returns: Classification of NumPy arrays
+        """
+        features = self._features(r, g, b, brightness, variance, temperature, rainfall)
+        soil_index, confidence = self._match(features, soil_index)
+        crop_index, suitability = self._rank_crops(features, soil_index)
+        return Classification(soil_index, confidence, crop_index, suitability)
+
+    def match(self, r, g, b, brightness, variance, temperature, rainfall, soil_index=None):
+        """
+        Soil rule and confidence only, without ranking crops
+        For callers that look the crop ranking up elsewhere (advisory.py).
+        Returns: (soil_index, confidence) arrays
+        """
+        return self._match(self._features(r, g, b, brightness, variance, temperature, rainfall), soil_index)
+
+    def _features(self, r, g, b, brightness, variance, temperature, rainfall):
+        """Broadcast inputs to arrays and derive red_green_ratio"""
+        r, g, b, brightness, variance, temperature, rainfall = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(v, dtype=np.float64))
+              for v in (r, g, b, brightness, variance, temperature, rainfall))
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            red_green_ratio = r / g
+        return {
+            'r': r, 'g': g, 'b': b, 'brightness': brightness, 'variance': variance,
+            'red_green_ratio': red_green_ratio,
+            'temperature': temperature, 'rainfall': rainfall
+        }
+
+    def _match(self, features, soil_index):
+        """First matching soil rule (unless given) and its confidence"""
+        r = features['r']
+        if soil_index is not None:
+            soil_index = np.broadcast_to(np.asarray(soil_index, dtype=np.intp), r.shape)
+        else:
+            # First matching rule wins
+            soil_index = np.full(r.shape, len(self.soil_rules) - 1, dtype=np.intp)
+            unmatched = np.ones(r.shape, dtype=bool)
+            for index, rule in enumerate(self.soil_rules):
+                matched = unmatched & self._conditions(rule['conditions'], features)
+                soil_index[matched] = index
+                unmatched &= ~matched
+
+        margin = np.clip(self._boundary_margin(features, soil_index) / MARGIN_SATURATION, 0.0, 1.0)
+        confidence = round_half_even_like_python(
+            self._conf_base[soil_index] + margin * self._conf_spread[soil_index]
+        )
+        return soil_index, confidence
+
+    def _boundary_margin(self, features, soil_index):
+        """
+        Relative distance of each sample to the nearest threshold that would
+        change its soil rule: one of its rule's own conditions, or the
+        closest-to-holding condition of an earlier rule (inf if none)
+        """
+        margin = np.full(soil_index.shape, np.inf)
+        for index, rule in enumerate(self.soil_rules):
+            satisfied = self._rule_margin(rule['conditions'], features)
+            own = soil_index == index
+            earlier = soil_index > index
+            margin[own] = np.minimum(margin[own], satisfied[own])
+            margin[earlier] = np.minimum(margin[earlier], -satisfied[earlier])
+        return margin
+
+    def _rule_margin(self, conditions, features):
+        """Smallest relative margin of a rule's conditions (positive when all hold)"""
+        margin = np.full(features['r'].shape, np.inf)
+        for feature, op, threshold in conditions:
+            sign = 1.0 if op in ('>', '>=') else -1.0
+            with np.errstate(invalid='ignore'):
+                distance = sign * (features[feature] - threshold) / max(abs(threshold), 1.0)
+            margin = np.minimum(margin, np.nan_to_num(distance, nan=0.0))
+        return margin
+
+    def _rank_crops(self, features, soil_index):
+        """Climate-adjusted suitability of each sample's crops, best first"""
+        # Climate adjustments to each sample's crop slots
+        crop_index = self._rule_crops[soil_index]
+        suitability = self._base_suitability[crop_index]
+        adjusted = np.zeros(crop_index.shape, dtype=bool)
+        for adjustment, is_crop in zip(self.climate_adjustments, self._adjustment_crops):
+            applies = (is_crop[crop_index] & ~adjusted &
+                       self._conditions(adjustment['conditions'], features)[:, np.newaxis])
+            suitability = np.where(
+                applies, np.minimum(self.max_suitability, suitability + adjustment['bonus']), suitability
+            )
+            adjusted |= applies
+
+        # Rank crops by suitability, keeping table order for ties
+        order = np.argsort(-suitability, axis=1, kind='stable')
+        return np.take_along_axis(crop_index, order, axis=1), np.take_along_axis(suitability, order, axis=1)
+
+    def crops_for(self, result, sample=0):
+        """Build the ranked crop dicts for one sample of a Classification"""
+        crops = []
+        for crop_index, suitability in zip(result.crop_index[sample], result.suitability[sample]):
+            crop = dict(self.crops[crop_index])
+            crop['suitability'] = int(suitability)
+            crops.append(crop)
+        return crops
+
+    def classify(self, r, g, b, brightness, variance, temperature, rainfall, soil_type=None):
+        """
+        Classify a single sample
+        soil_type, if given (e.g. by a trained model), replaces the soil rules.
+        Returns: (soil_type, confidence, crops)
+        """
+        soil_index = self.soil_index[soil_type] if soil_type is not None else None
+        result = self.evaluate(r, g, b, brightness, variance, temperature, rainfall, soil_index)
+        return (self.soil_types[result.soil_index[0]], float(result.confidence[0]),
+                self.crops_for(result))
+
+    def _conditions(self, conditions, features):
+        """AND together a rule's threshold conditions"""
+        mask = np.ones(features['r'].shape, dtype=bool)
+        for feature, op, threshold in conditions:
+            mask &= OPERATORS[op](features[feature], threshold)
+        return mask
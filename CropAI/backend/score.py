@@ -0,0 +1,425 @@
+"""
+Score an archive of soil photos offline with the /api/analyze pipeline
+
+    python score.py /path/to/photos -o scores.jsonl
+    python score.py photos.tar.gz -o scores.csv --season rabi --location "Pune, Maharashtra"
+    python score.py photos.zip -o scores/ --format columnar --inputs farms.csv
+    tar cf - photos | python score.py - -o scores.jsonl
+
+The source is a folder (searched recursively), a tar archive (any
+compression), a zip file, or "-" for a tar or zip stream on stdin. Images
+are read one at a time and decoded by a pool of worker processes. At most
+--in-flight images are held in memory at once, so archives of any size
+stream through in constant memory.
+
+Results are written as they complete. JSONL holds the full response per
+image. CSV and columnar output hold one summary row per image. Columnar
+output is a folder of part files: Parquet when pyarrow is installed,
+otherwise NumPy .npz with one array per column. Re-running the same
+command after an interruption skips images already scored in the output,
+without reading them again; images that failed are retried, and their
+new row is appended after the error row.
+
+Farm details come from the command-line defaults, overridden per image by
+an --inputs CSV with a "name" column (the path inside the source) and any
+of location, season, temperature, rainfall, humidity. Climate values left
+out are filled in from the location's normals, as in the API.
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from collections import deque
+
+import numpy as np
+
+import app as backend
+from batch import extract_features_from_bytes, get_pool, shutdown_pool
+from classifier import get_model_registry
+from config import Config
+from utils import allowed_file
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:  # columnar output falls back to .npz parts
+    pyarrow = parquet = None
+
+FORMATS = ('jsonl', 'csv', 'columnar')
+
+# Summary columns of CSV and columnar output
+COLUMNS = (
+    'name', 'status', 'error', 'soil_type', 'confidence', 'classifier', 'r', 'g', 'b', 'brightness',
+    'top_crop', 'top_crop_suitability', 'crops', 'location', 'season', 'temperature', 'rainfall',
+    'humidity', 'climate_source'
+)
+NUMERIC_COLUMNS = {'confidence', 'r', 'g', 'b', 'brightness', 'top_crop_suitability',
+                   'temperature', 'rainfall', 'humidity'}
+
+# Rows written between flushes of JSONL and CSV output
+FLUSH_EVERY = 100
+
+FIELDS = ('location', 'season', 'temperature', 'rainfall', 'humidity')
+
+
+# --- Sources -----------------------------------------------------------------
+
+def iter_source(source, skip=frozenset()):
+    """
+    Yield (name, image bytes) for every image in a folder, archive or stdin stream
+    Images named in skip are passed over without being read.
+    """
+    if source == '-':
+        yield from _iter_stream(sys.stdin.buffer, skip)
+    elif os.path.isdir(source):
+        yield from _iter_folder(source, skip)
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            yield from _iter_zip(archive, skip)
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source, mode='r|*') as archive:
+            yield from _iter_tar(archive, skip)
+    elif os.path.isfile(source):
+        name = os.path.basename(source)
+        if name not in skip:
+            with open(source, 'rb') as f:
+                yield name, f.read()
+    else:
+        raise SystemExit(f'❌ {source} is not a folder, archive or image')
+
+
+def _is_image(name):
+    return allowed_file(name, Config.ALLOWED_EXTENSIONS)
+
+
+def _iter_folder(folder, skip):
+    for directory, subdirectories, filenames in os.walk(folder):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, folder).replace(os.sep, '/')
+            if _is_image(filename) and name not in skip:
+                with open(path, 'rb') as f:
+                    yield name, f.read()
+
+
+def _iter_zip(archive, skip):
+    for info in archive.infolist():
+        if not info.is_dir() and _is_image(info.filename) and info.filename not in skip:
+            yield info.filename, archive.read(info)
+
+
+def _iter_tar(archive, skip):
+    # Stream mode: members are read in archive order without seeking
+    for member in archive:
+        if member.isfile() and _is_image(member.name) and member.name not in skip:
+            yield member.name, archive.extractfile(member).read()
+
+
+def _iter_stream(stream, skip):
+    """A tar stream is read as it arrives; a zip needs its directory, so it is spooled first"""
+    if stream.peek(4)[:4] == b'PK\x03\x04':
+        with tempfile.TemporaryFile() as spool:
+            shutil.copyfileobj(stream, spool)
+            spool.seek(0)
+            with zipfile.ZipFile(spool) as archive:
+                yield from _iter_zip(archive, skip)
+    else:
+        with tarfile.open(fileobj=stream, mode='r|*') as archive:
+            yield from _iter_tar(archive, skip)
+
+
+# --- Scoring -----------------------------------------------------------------
+
+def score_stream(images, inputs_for, workers, in_flight, descriptor):
+    """
+    Score (name, image bytes) pairs, decoding in parallel
+    At most `in_flight` images are submitted and not yet collected.
+    Yields: (name, response, error) in input order
+    """
+    if workers == 0:
+        for name, image_bytes in images:
+            try:
+                features = extract_features_from_bytes(image_bytes, Config.FEATURE_MAX_SIDE, descriptor)
+            except Exception as e:
+                yield name, None, e
+                continue
+            yield _analyse(name, features, inputs_for)
+        return
+
+    pool = get_pool(workers)
+    pending = deque()
+    try:
+        for name, image_bytes in images:
+            if len(pending) >= in_flight:
+                yield _collect(*pending.popleft(), inputs_for)
+            pending.append((name, pool.submit(extract_features_from_bytes, image_bytes,
+                                              Config.FEATURE_MAX_SIDE, descriptor)))
+        while pending:
+            yield _collect(*pending.popleft(), inputs_for)
+    finally:
+        shutdown_pool()
+
+
+def _collect(name, future, inputs_for):
+    try:
+        features = future.result()
+    except Exception as e:
+        return name, None, e
+    return _analyse(name, features, inputs_for)
+
+
+def _analyse(name, features, inputs_for):
+    try:
+        return name, backend.build_analysis_response(inputs_for(name), features), None
+    except Exception as e:
+        return name, None, e
+
+
+def read_inputs(path):
+    """Per-image farm details from a CSV with a "name" column"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row['name']: {k: v for k, v in row.items() if k in FIELDS and v not in (None, '')}
+                for row in csv.DictReader(f)}
+
+
+def summary_row(name, response, error):
+    """Flatten one result into the CSV / columnar columns"""
+    row = dict.fromkeys(COLUMNS)
+    row['name'] = name
+    if error is not None:
+        row.update(status='error', error=str(error) or type(error).__name__)
+        return row
+    soil = response['soil_analysis']
+    crops = response['recommended_crops']
+    inputs = response['input_data']
+    row.update(
+        status='success', soil_type=soil['soil_type'], confidence=soil['confidence'],
+        classifier=soil['classifier'], brightness=soil['brightness'], **soil['rgb_values'],
+        top_crop=crops[0]['name'] if crops else None,
+        top_crop_suitability=crops[0].get('suitability') if crops else None,
+        crops=';'.join(crop['name'] for crop in crops),
+        **{field: inputs.get(field) for field in FIELDS + ('climate_source',)}
+    )
+    return row
+
+
+# --- Output ------------------------------------------------------------------
+
+def _trim_partial_line(path):
+    """Drop an incomplete last line left by an interrupted run"""
+    with open(path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end != len(data):
+            f.truncate(end)
+
+
+def _scored(rows):
+    """Names of the rows that succeeded; failed images are scored again on resume"""
+    return {row['name'] for row in rows if row.get('status') != 'error'}
+
+
+class JsonlWriter:
+    """One JSON object per line: the full analysis response plus "name" """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            _trim_partial_line(path)
+            with open(path, encoding='utf-8') as f:
+                self.done = _scored(json.loads(line) for line in f if line.strip())
+        self.file = open(path, 'a', encoding='utf-8')
+        self.unflushed = 0
+
+    def write(self, name, response, error):
+        if error is not None:
+            record = {'name': name, 'status': 'error', 'error': str(error) or type(error).__name__}
+        else:
+            record = dict(response, name=name)
+        self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._count()
+
+    def _count(self):
+        self.unflushed += 1
+        if self.unflushed >= FLUSH_EVERY:
+            self.file.flush()
+            self.unflushed = 0
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter(JsonlWriter):
+    """One summary row per image"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            _trim_partial_line(path)
+            with open(path, newline='', encoding='utf-8') as f:
+                self.done = _scored(csv.DictReader(f))
+        self.file = open(path, 'a', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, COLUMNS)
+        if not exists:
+            self.writer.writeheader()
+        self.unflushed = 0
+
+    def write(self, name, response, error):
+        self.writer.writerow(summary_row(name, response, error))
+        self._count()
+
+
+class ColumnarWriter:
+    """
+    A folder of part files, each holding up to part_size rows by column
+    A part is written (atomically) only when full or on close, so an
+    interrupted run loses at most the rows of the part being filled.
+    """
+
+    def __init__(self, folder, part_size):
+        self.folder = folder
+        self.part_size = part_size
+        self.extension = '.parquet' if parquet is not None else '.npz'
+        os.makedirs(folder, exist_ok=True)
+        self.done = set()
+        self.parts = 0
+        for filename in sorted(os.listdir(folder)):
+            path = os.path.join(folder, filename)
+            if filename.startswith('.'):
+                os.remove(path)  # temporary file of an interrupted write
+            elif filename.startswith('part-'):
+                self.done.update(self._read_scored(path))
+                self.parts = max(self.parts, int(filename[5:10]) + 1)
+        self.rows = []
+
+    def write(self, name, response, error):
+        self.rows.append(summary_row(name, response, error))
+        if len(self.rows) >= self.part_size:
+            self._write_part()
+
+    def close(self):
+        if self.rows:
+            self._write_part()
+
+    def _write_part(self):
+        filename = f'part-{self.parts:05d}{self.extension}'
+        temporary = os.path.join(self.folder, f'.{filename}.tmp')
+        columns = {column: [row[column] for row in self.rows] for column in COLUMNS}
+        if parquet is not None:
+            parquet.write_table(pyarrow.Table.from_pydict(columns), temporary)
+        else:
+            arrays = {}
+            for column, values in columns.items():
+                if column in NUMERIC_COLUMNS:
+                    arrays[column] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+                else:
+                    arrays[column] = np.array(['' if v is None else str(v) for v in values])
+            with open(temporary, 'wb') as f:
+                np.savez(f, **arrays)
+        os.replace(temporary, os.path.join(self.folder, filename))
+        self.parts += 1
+        self.rows = []
+
+    @staticmethod
+    def _read_scored(path):
+        if path.endswith('.parquet'):
+            if parquet is None:
+                raise SystemExit(f'❌ {path} needs pyarrow to resume')
+            return _scored(parquet.read_table(path, columns=['name', 'status']).to_pylist())
+        with np.load(path) as part:
+            return _scored({'name': name, 'status': status}
+                           for name, status in zip(part['name'].tolist(), part['status'].tolist()))
+
+
+def open_writer(output, output_format, part_size):
+    if output_format == 'jsonl':
+        return JsonlWriter(output)
+    if output_format == 'csv':
+        return CsvWriter(output)
+    return ColumnarWriter(output, part_size)
+
+
+def guess_format(output):
+    if output.endswith('.csv'):
+        return 'csv'
+    if output.endswith(('.jsonl', '.json')):
+        return 'jsonl'
+    return 'columnar'
+
+
+# --- Command line ------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='folder, tar or zip archive, image, or "-" for stdin')
+    parser.add_argument('-o', '--output', required=True, help='output file (jsonl, csv) or folder (columnar)')
+    parser.add_argument('--format', choices=FORMATS, help='default: from the output extension')
+    parser.add_argument('--inputs', help='CSV of per-image farm details with a "name" column')
+    parser.add_argument('--location', default='Unknown')
+    parser.add_argument('--season', default='kharif', choices=Config.SEASONS)
+    parser.add_argument('--temperature', help='°C (default: location normals)')
+    parser.add_argument('--rainfall', help='annual mm (default: location normals)')
+    parser.add_argument('--humidity', help='%% (default: location normals)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='decode processes (0 = decode in this process)')
+    parser.add_argument('--in-flight', type=int, default=None,
+                        help='images held in memory at once (default: 4 per worker)')
+    parser.add_argument('--part-size', type=int, default=10000, help='rows per columnar part file')
+    parser.add_argument('--progress', type=float, default=5.0, help='seconds between progress lines')
+    args = parser.parse_args()
+
+    defaults = {field: getattr(args, field) for field in FIELDS if getattr(args, field) is not None}
+    per_image = read_inputs(args.inputs) if args.inputs else {}
+    inputs_cache = {}
+
+    def inputs_for(name):
+        fields = dict(defaults, **per_image.get(name, {}))
+        key = tuple(sorted(fields.items()))
+        if key not in inputs_cache:
+            inputs_cache[key] = backend.parse_farm_inputs(fields)
+        return inputs_cache[key]
+
+    writer = open_writer(args.output, args.format or guess_format(args.output), args.part_size)
+    if writer.done:
+        print(f'↩️  Resuming: {len(writer.done)} images already in {args.output}', file=sys.stderr)
+    images = iter_source(args.source, writer.done)
+    descriptor = get_model_registry().active is not None
+    in_flight = args.in_flight or max(1, args.workers) * 4
+
+    scored = failed = 0
+    started = last_report = time.perf_counter()
+    try:
+        for name, response, error in score_stream(images, inputs_for, args.workers, in_flight, descriptor):
+            writer.write(name, response, error)
+            if error is None:
+                scored += 1
+            else:
+                failed += 1
+            now = time.perf_counter()
+            if now - last_report >= args.progress:
+                print(f'   {scored + failed} images, {failed} failed, '
+                      f'{(scored + failed) / (now - started):.1f} images/sec', file=sys.stderr)
+                last_report = now
+    except KeyboardInterrupt:
+        print('\n⏸️  Interrupted; run the same command again to resume', file=sys.stderr)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    rate = (scored + failed) / elapsed if elapsed > 0 else 0.0
+    print(f'✅ Scored {scored} images ({failed} failed) in {elapsed:.1f}s, {rate:.1f} images/sec', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Response serialization for AI Crop Recommendation System
+
+Analysis responses are mostly repeated strings, and on 2G/3G links payload
+size dominates latency. Clients pick a representation with the Accept
+header:
+
+    application/json                          full response (default)
+    application/vnd.cropai.compact+json       compact schema
+    application/msgpack                       full response as MessagePack
+    application/vnd.cropai.compact+msgpack    compact schema as MessagePack
+
+The compact schema drops the echoed input_data and shortens keys as listed
+in COMPACT_KEYS; frontend/js/api.js expands them back. Bodies of at least
+Config.COMPRESS_MIN_BYTES are compressed with brotli or gzip when the
+client accepts it.
+
+orjson, msgpack and brotli are optional: without orjson the standard
+json module encodes, without msgpack MessagePack is not offered, and
+without brotli only gzip is used.
+"""
+
+import gzip
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = 'application/json'
+COMPACT_JSON = 'application/vnd.cropai.compact+json'
+MSGPACK = 'application/msgpack'
+COMPACT_MSGPACK = 'application/vnd.cropai.compact+msgpack'
+
+# Offered in this order of preference when the client has no preference
+MEDIA_TYPES = (JSON, COMPACT_JSON) + ((MSGPACK, COMPACT_MSGPACK) if msgpack is not None else ())
+
+# Also accepted for MessagePack
+MSGPACK_ALIASES = {'application/x-msgpack': MSGPACK}
+
+# Compact schema: long key -> short key (keep in sync with frontend/js/api.js)
+COMPACT_KEYS = {
+    'status': 'st',
+    'timestamp': 'ts',
+    'soil_analysis': 'sa',
+    'soil_type': 't',
+    'confidence': 'c',
+    'classifier': 'm',
+    'rgb_values': 'rgb',
+    'brightness': 'br',
+    'recommended_crops': 'rc',
+    'name': 'n',
+    'suitability': 's',
+    'yield': 'y',
+    'duration': 'd',
+    'profit': 'p',
+    'varieties': 'v',
+    'fertilizer': 'f',
+    'nitrogen': 'N',
+    'phosphorus': 'P',
+    'potassium': 'K',
+    'organic': 'o',
+    'timing': 'tm',
+    'basal': 'b0',
+    'first_top': 'b1',
+    'second_top': 'b2',
+    'irrigation': 'ir',
+    'frequency': 'fq',
+    'method': 'me',
+    'water_requirement': 'w',
+    'critical_stages': 'cs',
+    'tips': 'tp',
+    'results': 'rs',
+    'index': 'i',
+    'filename': 'fn',
+    'error': 'e',
+    'count': 'nc',
+    'succeeded': 'ok',
+    'failed': 'ko'
+}
+
+# Short key -> long key, as frontend/js/api.js expands them. A short key
+# must not be any key of the full payload, or expanding would rename it
+COMPACT_NAMES = {short: key for key, short in COMPACT_KEYS.items()}
+
+# Keys the compact schema leaves out (the client already knows them)
+COMPACT_DROPPED = frozenset({'input_data'})
+
+
+def dumps(obj):
+    """Encode to compact JSON bytes, with orjson when available"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass  # e.g. non-string keys; the standard encoder handles more
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _msgpack_default(value):
+    # NumPy scalars and arrays
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+def encode(obj, media_type):
+    """Encode an already shaped object (see compact) as media_type"""
+    if media_type in (MSGPACK, COMPACT_MSGPACK):
+        return msgpack.packb(obj, use_bin_type=True, default=_msgpack_default)
+    return dumps(obj)
+
+
+def is_compact(media_type):
+    return media_type in (COMPACT_JSON, COMPACT_MSGPACK)
+
+
+def compact(obj):
+    """Rename keys to their COMPACT_KEYS form and drop echoed inputs, recursively"""
+    if isinstance(obj, dict):
+        return {COMPACT_KEYS.get(key, key): compact(value)
+                for key, value in obj.items() if key not in COMPACT_DROPPED}
+    if isinstance(obj, (list, tuple)):
+        return [compact(value) for value in obj]
+    return obj
+
+
+def expand(obj):
+    """Rename COMPACT_KEYS back to their long form, recursively (the inverse of compact)"""
+    if isinstance(obj, dict):
+        return {COMPACT_NAMES.get(key, key): expand(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [expand(value) for value in obj]
+    return obj
+
+
+def negotiate(accept):
+    """
+    Pick the response media type from a werkzeug MIMEAccept (request.accept_mimetypes)
+    Falls back to full JSON when nothing offered is acceptable.
+    """
+    offered = MEDIA_TYPES + (tuple(MSGPACK_ALIASES) if msgpack is not None else ())
+    media_type = accept.best_match(offered, default=JSON) or JSON
+    return MSGPACK_ALIASES.get(media_type, media_type)
+
+
+def compress(body, accept_encodings, min_bytes, gzip_level=6, brotli_quality=5):
+    """
+    Compress a body if it is large enough and the client accepts it
+    accept_encodings is request.accept_encodings.
+    Returns: (body, content encoding or None)
+    """
+    if len(body) < min_bytes:
+        return body, None
+    if brotli is not None and accept_encodings['br']:
+        return brotli.compress(body, quality=brotli_quality), 'br'
+    if accept_encodings['gzip']:
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0), 'gzip'
+    return body, None
@@ -0,0 +1,36 @@
+"""
+Production server for AI Crop Recommendation System
+
+    python serve.py
+
+Runs gunicorn with gunicorn.conf.py on Linux/macOS. Gunicorn does not
+support Windows, so there waitress serves the app from one process with
+a thread pool instead. APP_ENV defaults to production.
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    os.environ.setdefault('APP_ENV', 'production')
+    os.chdir(BACKEND_DIR)
+
+    if sys.platform == 'win32':
+        # One process, so it may use every analysis slot and batch process
+        os.environ['WEB_CONCURRENCY'] = '1'
+        from waitress import serve
+        from wsgi import app
+        host, _, port = os.environ.get('BIND', '0.0.0.0:5000').rpartition(':')
+        print(f"🏭 Serving with waitress on http://{host}:{port}")
+        serve(app, host=host, port=int(port), threads=int(os.environ.get('WEB_THREADS', 8)))
+    else:
+        os.execvp(sys.executable, [
+            sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'wsgi:app'
+        ])
+
+
+if __name__ == '__main__':
+    main()
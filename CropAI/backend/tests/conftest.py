@@ -0,0 +1,53 @@
+"""
+Test setup for AI Crop Recommendation System
+
+    cd CropAI/backend
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# The backend modules are imported by name, as the app imports them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@pytest.fixture(scope='session')
+def soil_jpeg():
+    """A small soil-coloured JPEG textured enough to pass the photo quality check"""
+    texture = np.random.default_rng(0).normal(0, 20, size=(30, 40, 3)).repeat(8, 0).repeat(8, 1)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(np.array([118, 88, 62]) + texture, 0, 255).astype(np.uint8)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    Build the app with every file it writes under tmp_path
+    make_app(**settings) overrides TestingConfig, e.g. to turn the rate limit on.
+    """
+    import app as backend
+    from config import TestingConfig
+
+    def make(**overrides):
+        settings = dict({
+            'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+            'HISTORY_DB_PATH': str(tmp_path / 'history.db'),
+            'RATE_LIMIT_DB_PATH': str(tmp_path / 'ratelimit.db'),
+            'JOB_DB_PATH': str(tmp_path / 'jobs.db')
+        }, **overrides)
+        return backend.create_app(type('IsolatedTestingConfig', (TestingConfig,), settings))
+    return make
+
+
+@pytest.fixture
+def client(make_app):
+    """Test client of an app built by make_app with the testing defaults"""
+    return make_app().test_client()
@@ -0,0 +1,112 @@
+"""
+Rate limiters and analysis slots
+"""
+
+import threading
+
+import pytest
+
+import admission
+from admission import ConcurrencyLimiter, MemoryRateLimiter, SQLiteRateLimiter, analysis_slots
+from config import TestingConfig
+
+
+class Clock:
+    """Stands in for the time module: monotonic() and time() both read now"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def limiter(request, tmp_path, clock):
+    # One token a second, up to 5 saved up
+    if request.param == 'memory':
+        return MemoryRateLimiter(1.0, 5)
+    return SQLiteRateLimiter(str(tmp_path / 'ratelimit.db'), 1.0, 5)
+
+
+def test_bursts_then_refills_at_the_rate(limiter, clock):
+    assert [limiter.acquire('a')[0] for _ in range(5)] == [True] * 5
+    assert limiter.acquire('a') == (False, pytest.approx(1.0))
+    assert limiter.acquire('b')[0]
+    clock.now += 2.5
+    assert [limiter.acquire('a')[0] for _ in range(3)] == [True, True, False]
+
+
+def test_costs_above_the_burst_leave_the_bucket_in_debt(limiter, clock):
+    assert limiter.acquire('a', cost=20) == (True, 0.0)
+    # 5 - 20 = -15 tokens; one more needs 16 seconds
+    allowed, retry_after = limiter.acquire('a')
+    assert not allowed and retry_after == pytest.approx(16.0)
+    clock.now += 15.5
+    assert not limiter.acquire('a')[0]
+    clock.now += 0.5
+    assert limiter.acquire('a')[0]
+
+
+def test_large_costs_need_a_full_bucket(limiter, clock):
+    assert limiter.acquire('a', cost=3)[0]
+    allowed, retry_after = limiter.acquire('a', cost=20)
+    assert not allowed and retry_after == pytest.approx(3.0)
+    clock.now += 3
+    assert limiter.acquire('a', cost=20)[0]
+
+
+def test_sqlite_buckets_are_shared_and_pruning_keeps_debts(tmp_path, clock):
+    path = str(tmp_path / 'ratelimit.db')
+    first, second = SQLiteRateLimiter(path, 1.0, 5), SQLiteRateLimiter(path, 1.0, 5)
+    assert first.acquire('a', cost=100)[0]
+    assert first.acquire('b')[0]
+    clock.now += SQLiteRateLimiter.PRUNE_INTERVAL + 1
+    second.acquire('c')
+    rows = dict(second._connection().execute('SELECT client, tokens FROM rate_buckets'))
+    assert 'b' not in rows and rows['a'] == -95
+    assert not second.acquire('a')[0]
+
+
+def test_concurrency_limiter_counts_slots():
+    limiter = ConcurrencyLimiter(2)
+    assert limiter.acquire() and limiter.acquire()
+    assert limiter.in_use == 2
+    assert not limiter.acquire()
+    assert not limiter.acquire(timeout=0.01)
+    limiter.release()
+    assert limiter.in_use == 1
+    assert limiter.acquire()
+
+
+def test_concurrency_limiter_waits_for_a_release():
+    limiter = ConcurrencyLimiter(1)
+    assert limiter.acquire()
+    timer = threading.Timer(0.05, limiter.release)
+    timer.start()
+    assert limiter.acquire(timeout=5)
+    timer.join()
+    assert limiter.in_use == 1
+
+
+def test_memory_slots_are_shared_between_workers(monkeypatch):
+    monkeypatch.setattr(admission, 'available_memory', lambda: 64 * admission.request_memory(TestingConfig))
+
+    def slots(**settings):
+        return analysis_slots(type('SlotsConfig', (TestingConfig,), dict({'ADMISSION_MAX_CONCURRENT': None},
+                                                                           **settings)))
+
+    assert slots(WEB_WORKERS=1, ADMISSION_MEMORY_FRACTION=0.5) == 32
+    assert slots(WEB_WORKERS=4, ADMISSION_MEMORY_FRACTION=0.5) == 8
+    assert slots(WEB_WORKERS=100, ADMISSION_MEMORY_FRACTION=0.5) == 1
+    assert slots(WEB_WORKERS=4, ADMISSION_MAX_CONCURRENT=3) == 3
@@ -0,0 +1,17 @@
+"""
+Crop variety suggestions in the precomputed advisories
+"""
+
+from knowledge import get_knowledge_base
+
+
+def test_crops_without_varieties_in_season_have_no_entry():
+    kb = get_knowledge_base()
+    soil_index = kb.engine.soil_types.index('Clay Soil')
+
+    kharif = {crop['name']: crop for crop in kb.advisory.lookup(soil_index, 'kharif', 28.0, 800.0).recommended_crops}
+    assert 'varieties' not in kharif['Wheat']
+    assert kharif['Rice']['varieties']
+
+    rabi = {crop['name']: crop for crop in kb.advisory.lookup(soil_index, 'rabi', 22.0, 500.0).recommended_crops}
+    assert rabi['Wheat']['varieties'] == kb.catalog.varieties('Wheat', 'rabi')
@@ -0,0 +1,124 @@
+"""
+Request validation of the API endpoints
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+
+def soil_image(name='field.jpg'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), (118, 88, 62)).save(buffer, 'JPEG')
+    buffer.seek(0)
+    return buffer, name
+
+
+@pytest.mark.parametrize('url', ['/api/analyze/batch', '/api/jobs'])
+@pytest.mark.parametrize('metadata', ['{not json', '{"season": "rabi"}', '["rabi"]', '[{}, {}]'])
+def test_bad_batch_metadata_is_rejected(client, url, metadata):
+    response = client.post(url, content_type='multipart/form-data', data={
+        'soil_images': [soil_image()], 'metadata': metadata
+    })
+    assert response.status_code == 400
+    assert 'metadata' in response.get_json()['error']
+
+
+def test_unknown_api_keys_share_the_address_bucket(make_app, soil_jpeg):
+    client = make_app(RATE_LIMIT_STORE='memory', RATE_LIMIT_PER_MINUTE=0.06, RATE_LIMIT_BURST=1,
+                      API_KEYS=frozenset({'farm-co-op'})).test_client()
+
+    def analyze(key):
+        return client.post('/api/analyze', headers={'X-API-Key': key}, content_type='multipart/form-data',
+                           data={'soil_image': (io.BytesIO(soil_jpeg), 'field.jpg')}).status_code
+
+    assert analyze('made-up-1') == 200
+    assert analyze('made-up-2') == 429
+    assert analyze('farm-co-op') == 200
+    assert analyze('farm-co-op') == 429
+
+
+@pytest.mark.parametrize('steps', [0, -5, 10 ** 12])
+def test_plan_range_steps_are_bounded(client, steps):
+    response = client.post('/api/plan', json={
+        'scenarios': {'rainfall': {'start': 200, 'stop': 2500, 'steps': steps}}
+    })
+    assert response.status_code == 400
+    assert 'steps' in response.get_json()['error']
+
+
+def test_analysis_posts_ignore_if_none_match(client, soil_jpeg):
+    def analyze(headers):
+        return client.post('/api/analyze', headers=headers, content_type='multipart/form-data',
+                           data={'soil_image': (io.BytesIO(soil_jpeg), 'field.jpg')})
+
+    first = analyze({})
+    assert first.status_code == 200
+    assert 'ETag' not in first.headers
+    assert analyze({'If-None-Match': '*'}).status_code == 200
+
+
+def test_get_responses_are_conditional(client):
+    first = client.get('/api/uploads/config')
+    assert first.status_code == 200
+    assert client.get('/api/uploads/config', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+
+def test_tiny_images_are_rejected(client):
+    buffer = io.BytesIO()
+    Image.new('RGB', (3, 3), (118, 88, 62)).save(buffer, 'PNG')
+    response = client.post('/api/analyze', content_type='multipart/form-data', data={
+        'soil_image': (io.BytesIO(buffer.getvalue()), 'field.png')
+    })
+    assert response.status_code == 400
+    assert 'at least' in response.get_json()['error']
+
+
+def test_season_spelling_does_not_change_the_analysis(client, soil_jpeg):
+    def analyze(season):
+        response = client.post('/api/analyze', content_type='multipart/form-data', data={
+            'soil_image': (io.BytesIO(soil_jpeg), 'field.jpg'), 'season': season, 'location': 'Pune'
+        })
+        assert response.status_code == 200
+        return response.get_json()
+
+    expected, mixed = analyze('rabi'), analyze(' Rabi ')
+    assert mixed['input_data'] == expected['input_data']
+    assert mixed['input_data']['season'] == 'rabi'
+    assert mixed['recommended_crops'] == expected['recommended_crops']
+    assert mixed['tips'] == expected['tips']
+
+
+def test_pipeline_follows_the_active_feature_size(make_app, soil_jpeg):
+    def pipeline(client):
+        response = client.post('/api/analyze', content_type='multipart/form-data', data={
+            'soil_image': (io.BytesIO(soil_jpeg), 'field.jpg')
+        })
+        assert response.status_code == 200
+        return response.get_json()['pipeline']
+
+    default = pipeline(make_app().test_client())
+    assert pipeline(make_app(FEATURE_MAX_SIDE=512).test_client()) != default
+    assert pipeline(make_app().test_client()) == default
+
+
+@pytest.mark.parametrize('workers', [0, 1])
+def test_batches_check_the_quality_of_decoded_pngs(make_app, soil_jpeg, workers):
+    def png(img):
+        buffer = io.BytesIO()
+        img.save(buffer, 'PNG')
+        buffer.seek(0)
+        return buffer
+
+    textured = png(Image.open(io.BytesIO(soil_jpeg)))
+    featureless = png(Image.new('RGB', (240, 320), (118, 88, 62)))
+    client = make_app(BATCH_WORKERS=workers).test_client()
+    response = client.post('/api/analyze/batch', content_type='multipart/form-data', data={
+        'soil_images': [(textured, 'good.png'), (featureless, 'blurry.png')]
+    })
+    assert response.status_code == 200
+    good, blurry = response.get_json()['results']
+    assert good['status'] == 'success'
+    assert blurry['status'] == 'error'
+    assert 'blurry' in blurry['error']
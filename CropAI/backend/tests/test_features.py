@@ -0,0 +1,80 @@
+"""
+Downscaled feature extraction against exact full-resolution statistics
+
+A photo is analysed at Config.FEATURE_MAX_SIDE; FEATURE_MAX_SIDE=None
+gives the exact statistics of every pixel. For soil texture coarser than
+the reduction factor the two agree within:
+
+    channel means and brightness   MEAN_TOLERANCE levels (of 255)
+    colour variance                VARIANCE_TOLERANCE relative
+"""
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from config import Config
+from features import color_features_from_image
+
+MEAN_TOLERANCE = 0.5
+VARIANCE_TOLERANCE = 0.1
+
+# Larger than FEATURE_MAX_SIDE in both directions, so every format is reduced
+WIDTH, HEIGHT = 4000, 3000
+
+
+def soil_photo(width=WIDTH, height=HEIGHT, block=32, seed=0):
+    """A brown soil-like RGB image with texture in blocks of `block` pixels"""
+    rng = np.random.default_rng(seed)
+    texture = rng.normal(0, 20, size=(height // block + 1, width // block + 1, 3))
+    texture = texture.repeat(block, 0).repeat(block, 1)[:height, :width]
+    return Image.fromarray(np.clip(np.array([118, 88, 62]) + texture, 0, 255).astype(np.uint8))
+
+
+def encoded(img, image_format):
+    buffer = io.BytesIO()
+    img.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='module')
+def photo():
+    return soil_photo()
+
+
+@pytest.mark.parametrize('image_format, prepare', [
+    ('JPEG', None),
+    ('PNG', None),
+    ('PNG', lambda img: img.convert('L')),
+    ('PNG', lambda img: img.quantize(64)),
+    ('GIF', None)
+], ids=['jpeg', 'png', 'grey png', 'palette png', 'gif'])
+def test_downscaled_features_match_full_resolution(photo, image_format, prepare):
+    data = encoded(prepare(photo) if prepare else photo, image_format)
+
+    exact = color_features_from_image(Image.open(io.BytesIO(data)), None)
+    reduced = color_features_from_image(Image.open(io.BytesIO(data)), Config.FEATURE_MAX_SIDE)
+
+    assert exact['analysed_size'] == [WIDTH, HEIGHT]
+    assert max(reduced['analysed_size']) < WIDTH
+    for key in ('r', 'g', 'b', 'brightness'):
+        assert reduced[key] == pytest.approx(exact[key], abs=MEAN_TOLERANCE), key
+    assert reduced['variance'] == pytest.approx(exact['variance'], rel=VARIANCE_TOLERANCE)
+
+
+@pytest.mark.parametrize('mode', ['1', 'P', 'I;16'])
+def test_modes_without_reduce_are_downscaled(mode):
+    # Image.reduce() rejects these modes; they must not fail the analysis
+    data = encoded(Image.new(mode, (2500, 1500)), 'PNG')
+    features = color_features_from_image(Image.open(io.BytesIO(data)), Config.FEATURE_MAX_SIDE)
+    assert max(features['analysed_size']) < 2500
+
+
+def test_palette_gif_is_analysed(client, photo):
+    response = client.post('/api/analyze', content_type='multipart/form-data', data={
+        'soil_image': (io.BytesIO(encoded(photo.quantize(64), 'GIF')), 'field.gif')
+    })
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['soil_analysis']['soil_type']
@@ -0,0 +1,48 @@
+"""
+History queries when row ids and created_at disagree
+"""
+
+import pytest
+
+from history import HistoryStore, parse_cursor
+
+
+def record(created_at, soil_type='Black Soil (Regur)'):
+    return {
+        'created_at': created_at, 'location': 'Nagpur, Maharashtra', 'season': 'kharif',
+        'soil_type': soil_type, 'confidence': 80.0, 'top_crop': 'Cotton',
+        'temperature': 28.0, 'rainfall': 900.0, 'humidity': 60.0,
+        'image_digest': 'digest', 'response': {}
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    # Two writers flushing late: ids are not in created_at order
+    store.insert_many([record(t) for t in (100, 300, 500, 700, 900)])
+    store.insert_many([record(t, 'Clay Soil') for t in (200, 400, 600, 800)])
+    return store
+
+
+def pages(store, limit, **filters):
+    rows, cursor = store.query(limit=limit, **filters)
+    while cursor:
+        page, cursor = store.query(limit=limit, cursor=parse_cursor(cursor), **filters)
+        rows += page
+    return [row['created_at'] for row in rows]
+
+
+@pytest.mark.parametrize('limit', [1, 2, 50])
+def test_time_ranges_use_created_at_not_ids(store, limit):
+    assert pages(store, limit) == [900, 800, 700, 600, 500, 400, 300, 200, 100]
+    assert pages(store, limit, since=250, until=750) == [700, 600, 500, 400, 300]
+    assert pages(store, limit, since=250, until=750, soil_type='Clay Soil') == [600, 400]
+    assert pages(store, limit, until=200) == [100]
+    assert pages(store, limit, since=901) == []
+
+
+def test_malformed_cursors_are_rejected(client):
+    response = client.get('/api/history', query_string={'cursor': 'page-2'})
+    assert response.status_code == 400
+    assert 'cursor' in response.get_json()['error']
@@ -0,0 +1,44 @@
+"""
+Job queue limits and recovery of the SQLite job store
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, MemoryJobStore, QueueFullError, SQLiteJobStore
+
+
+def test_queued_bytes_are_capped():
+    release = threading.Event()
+    jobs = JobQueue(MemoryJobStore(60), lambda payload: release.wait(5), workers=1, max_pending=10,
+                    max_pending_bytes=100)
+    jobs.submit('first', 60)
+    with pytest.raises(QueueFullError):
+        jobs.submit('second', 60)
+    jobs.submit('third', 40)
+
+    release.set()
+    jobs._queue.join()
+    assert jobs.pending_bytes == 0
+    jobs.submit('fourth', 100)
+
+
+def test_jobs_of_exited_processes_fail_on_startup(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    store = SQLiteJobStore(path, 60)
+    for job_id in ('queued', 'running', 'done'):
+        store.create(job_id)
+    store.update('running', RUNNING)
+    store.update('done', SUCCEEDED, result={'ok': True})
+    store.create('live')
+    with sqlite3.connect(path) as conn:
+        # A process id that cannot exist
+        conn.execute("UPDATE jobs SET pid = 2147483647 WHERE job_id != 'live'")
+
+    store = SQLiteJobStore(path, 60)
+    assert store.get('queued')['status'] == FAILED
+    assert store.get('running')['status'] == FAILED
+    assert store.get('done')['status'] == SUCCEEDED
+    assert store.get('live')['status'] == QUEUED
@@ -0,0 +1,49 @@
+"""
+The vectorized planner against the scalar formulas in utils.py
+"""
+
+import numpy as np
+import pytest
+
+from knowledge import get_knowledge_base
+from planner import PlanError, build_plan, scenario_values
+from utils import calculate_irrigation_requirement, calculate_roi, estimate_yield
+
+# Around both yield thresholds, and a fractional area
+RAINFALL = [300.0, 499.9, 500.0, 800.0, 1500.0, 1500.1, 2200.0]
+AREA = [0.4, 1.0, 7.5]
+
+
+@pytest.mark.parametrize('season', get_knowledge_base().seasons)
+def test_single_scenarios_match_the_scalar_functions(season):
+    kb = get_knowledge_base()
+    plan = build_plan(kb, season=season, scenarios={'rainfall': RAINFALL, 'area': AREA})
+    for index, (rainfall, area) in enumerate(zip(plan.scenarios['rainfall'], plan.scenarios['area'])):
+        for crop in plan.crops:
+            roi = calculate_roi(crop, area)
+            for soil in plan.soils:
+                row = plan.scenario(crop, soil, index)
+                assert row['total_investment'] == roi['total_investment']
+                assert row['expected_revenue'] == roi['expected_revenue']
+                assert row['net_profit'] == roi['net_profit']
+                assert row['roi_percentage'] == roi['roi_percentage']
+                assert row['yield_t_ha'] == estimate_yield(crop, soil, rainfall)
+                assert row['water_mm'] == calculate_irrigation_requirement(crop, soil, season)['total_water_mm']
+
+
+@pytest.mark.parametrize('steps', [0, -1, 101, 10 ** 12])
+def test_range_steps_are_bounded_before_allocating(steps):
+    with pytest.raises(PlanError, match='steps must be between 1 and 100'):
+        scenario_values({'start': 0, 'stop': 1, 'steps': steps}, 'rainfall', 100)
+
+
+def test_scenario_values():
+    assert np.array_equal(scenario_values({'start': 200, 'stop': 400, 'steps': 3}, 'rainfall', 3),
+                          [200.0, 300.0, 400.0])
+    assert np.array_equal(scenario_values({'start': 5, 'stop': 9, 'steps': 1}, 'rainfall', 3), [5.0])
+    assert np.array_equal(scenario_values([1, 2.5], 'area', 3), [1.0, 2.5])
+    assert np.array_equal(scenario_values(2, 'price', 3), [2.0])
+    for spec, name in (([], 'rainfall'), ([1, float('nan')], 'rainfall'), ('many', 'area'), ([1, 0], 'area'),
+                       ({'start': 1}, 'price')):
+        with pytest.raises(PlanError):
+            scenario_values(spec, name, 3)
@@ -0,0 +1,98 @@
+"""
+Resumable uploads: concurrent chunks, interrupted chunks and clean-up
+"""
+
+import io
+import threading
+
+import pytest
+
+from resumable import ResumableUploads
+from uploads import UploadError
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    return ResumableUploads(str(tmp_path), 1024 * 1024, {'jpg'}, 3600, 10)
+
+
+class SlowStream(io.BytesIO):
+    """A request body that arrives after `ready` is set"""
+
+    def __init__(self, data, ready):
+        super().__init__(data)
+        self.ready = ready
+
+    def read(self, size=-1):
+        self.ready.wait(5)
+        return super().read(size)
+
+
+class DroppedStream(io.BytesIO):
+    """A request body whose connection drops after its bytes"""
+
+    def read(self, size=-1):
+        data = super().read(size)
+        if not data:
+            raise ConnectionResetError('client went away')
+        return data
+
+
+def test_only_one_chunk_is_appended_at_an_offset(uploads):
+    upload_id = uploads.create('field.jpg', 8)['upload_id']
+    ready, errors = threading.Event(), []
+
+    def send(data):
+        try:
+            uploads.append(upload_id, 0, SlowStream(data, ready), 4)
+        except UploadError as e:
+            errors.append(e.status_code)
+
+    threads = [threading.Thread(target=send, args=(data,)) for data in (b'aaaa', b'bbbb')]
+    for thread in threads:
+        thread.start()
+    ready.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == [409]
+    assert uploads.status(upload_id)['offset'] == 4
+
+
+def test_slow_chunk_does_not_block_other_uploads(uploads):
+    slow = uploads.create('slow.jpg', 4)['upload_id']
+    fast = uploads.create('fast.jpg', 4)['upload_id']
+    ready = threading.Event()
+    thread = threading.Thread(target=uploads.append, args=(slow, 0, SlowStream(b'slow', ready), 4))
+    thread.start()
+
+    assert uploads.append(fast, 0, io.BytesIO(b'fast'), 4)['complete']
+    ready.set()
+    thread.join()
+    assert uploads.status(slow)['complete']
+
+
+def test_interrupted_chunk_keeps_what_arrived(uploads):
+    upload_id = uploads.create('field.jpg', 8)['upload_id']
+    with pytest.raises(ConnectionResetError):
+        uploads.append(upload_id, 0, DroppedStream(b'abc'), 6)
+    assert uploads.status(upload_id)['offset'] == 3
+    assert uploads.append(upload_id, 3, io.BytesIO(b'defgh'), 5)['complete']
+    file = uploads.open(upload_id)
+    assert file.read() == b'abcdefgh'
+    file.close()
+
+
+def test_upload_is_deleted_once_analysed(client, soil_jpeg):
+    created = client.post('/api/uploads', json={'filename': 'field.jpg', 'size': len(soil_jpeg)})
+    upload_id = created.get_json()['upload_id']
+    client.patch(f'/api/uploads/{upload_id}', data=soil_jpeg, headers={'Upload-Offset': '0'})
+
+    # A failed analysis keeps the upload for a retry
+    response = client.post('/api/analyze', data={'upload_id': upload_id, 'temperature': 'hot'})
+    assert response.status_code >= 400
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 200
+
+    response = client.post('/api/analyze', data={'upload_id': upload_id})
+    assert response.status_code == 200, response.get_json()
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
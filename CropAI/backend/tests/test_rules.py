@@ -0,0 +1,140 @@
+"""
+The vectorized RuleEngine against the original scalar classify_soil
+
+reference_classify is the if/elif chain the knowledge base rules were
+taken from, minus its random confidence. Soil type and the ranked crop
+list must match it exactly on and around every threshold.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from knowledge import get_knowledge_base
+
+SANDY = [
+    {'name': 'Groundnut', 'suitability': 90, 'yield': '2.2 tons/ha', 'duration': '100-130 days', 'profit': 'High'},
+    {'name': 'Bajra (Pearl Millet)', 'suitability': 88, 'yield': '1.8 tons/ha', 'duration': '70-90 days',
+     'profit': 'Medium-High'},
+    {'name': 'Watermelon', 'suitability': 85, 'yield': '25 tons/ha', 'duration': '80-90 days', 'profit': 'High'}
+]
+BLACK = [
+    {'name': 'Cotton', 'suitability': 95, 'yield': '3.2 tons/ha', 'duration': '150-180 days', 'profit': 'Very High'},
+    {'name': 'Soybean', 'suitability': 92, 'yield': '2.8 tons/ha', 'duration': '90-110 days', 'profit': 'High'},
+    {'name': 'Jowar (Sorghum)', 'suitability': 89, 'yield': '2.5 tons/ha', 'duration': '110-130 days',
+     'profit': 'Medium-High'}
+]
+RED = [
+    {'name': 'Groundnut', 'suitability': 91, 'yield': '2.4 tons/ha', 'duration': '100-130 days', 'profit': 'High'},
+    {'name': 'Ragi (Finger Millet)', 'suitability': 89, 'yield': '2.0 tons/ha', 'duration': '100-120 days',
+     'profit': 'Medium-High'},
+    {'name': 'Cashew', 'suitability': 86, 'yield': '1.2 tons/ha', 'duration': '2-3 years', 'profit': 'Very High'}
+]
+CLAY = [
+    {'name': 'Rice', 'suitability': 93, 'yield': '4.5 tons/ha', 'duration': '120-150 days', 'profit': 'High'},
+    {'name': 'Cotton', 'suitability': 90, 'yield': '2.8 tons/ha', 'duration': '150-180 days', 'profit': 'Very High'},
+    {'name': 'Wheat', 'suitability': 87, 'yield': '3.2 tons/ha', 'duration': '110-130 days', 'profit': 'Medium-High'}
+]
+LOAMY = [
+    {'name': 'Rice', 'suitability': 95, 'yield': '4.8 tons/ha', 'duration': '120-150 days', 'profit': 'High'},
+    {'name': 'Wheat', 'suitability': 93, 'yield': '3.5 tons/ha', 'duration': '110-130 days', 'profit': 'High'},
+    {'name': 'Sugarcane', 'suitability': 91, 'yield': '75 tons/ha', 'duration': '12-18 months', 'profit': 'Very High'}
+]
+SILTY = [
+    {'name': 'Vegetables (Mixed)', 'suitability': 92, 'yield': '18 tons/ha', 'duration': '60-90 days',
+     'profit': 'High'},
+    {'name': 'Maize', 'suitability': 89, 'yield': '3.8 tons/ha', 'duration': '90-120 days', 'profit': 'Medium-High'},
+    {'name': 'Pulses', 'suitability': 86, 'yield': '1.5 tons/ha', 'duration': '90-120 days', 'profit': 'Medium'}
+]
+LOAMY_DEFAULT = [
+    {'name': 'Rice', 'suitability': 95, 'yield': '4.8 tons/ha', 'duration': '120-150 days', 'profit': 'High'},
+    {'name': 'Wheat', 'suitability': 91, 'yield': '3.5 tons/ha', 'duration': '110-130 days', 'profit': 'High'},
+    {'name': 'Maize', 'suitability': 89, 'yield': '4.2 tons/ha', 'duration': '90-120 days', 'profit': 'Medium-High'}
+]
+
+
+def reference_classify(r, g, b, brightness, variance, temperature, rainfall):
+    """The original scalar classify_soil, without confidence; returns (soil_type, crops)"""
+    if brightness > 140 and r > 150 and variance < 1500:
+        soil_type, crops = 'Sandy Soil', SANDY
+    elif brightness < 80:
+        soil_type, crops = 'Black Soil (Regur)', BLACK
+    elif r > 130 and r / g > 1.3 and brightness > 100 and brightness < 150:
+        soil_type, crops = 'Red Laterite Soil', RED
+    elif brightness < 120 and variance > 800:
+        soil_type, crops = 'Clay Soil', CLAY
+    elif brightness > 100 and brightness < 150 and variance > 500 and variance < 2000:
+        soil_type, crops = 'Loamy Soil', LOAMY
+    elif brightness > 120 and variance < 1000:
+        soil_type, crops = 'Silty Soil', SILTY
+    else:
+        soil_type, crops = 'Loamy Soil', LOAMY_DEFAULT
+
+    crops = [dict(crop) for crop in crops]
+    for crop in crops:
+        if crop['name'] == 'Rice' and temperature >= 25 and rainfall >= 800:
+            crop['suitability'] = min(98, crop['suitability'] + 3)
+        elif crop['name'] == 'Wheat' and temperature <= 25 and rainfall < 800:
+            crop['suitability'] = min(98, crop['suitability'] + 3)
+        elif crop['name'] == 'Cotton' and temperature >= 25:
+            crop['suitability'] = min(98, crop['suitability'] + 2)
+    return soil_type, sorted(crops, key=lambda x: x['suitability'], reverse=True)
+
+
+def around(*thresholds):
+    """Each threshold and a value just either side of it"""
+    return [value + step for value in thresholds for step in (-0.1, 0.0, 0.1)]
+
+
+BRIGHTNESS = around(80, 100, 120, 140, 150)
+RED_VALUES = around(130, 150)
+VARIANCE = around(500, 800, 1000, 1500, 2000)
+CLIMATE = list(itertools.product(around(25), around(800)))
+
+# One sample well inside each soil rule, for the climate adjustments
+RULE_SAMPLES = [
+    (170, 120, 100, 150, 1000),  # Sandy
+    (60, 50, 40, 60, 1000),      # Black
+    (140, 100, 80, 120, 1000),   # Red laterite
+    (100, 95, 90, 110, 900),     # Clay
+    (120, 110, 100, 130, 1200),  # Loamy
+    (130, 125, 120, 155, 400),   # Silty
+    (120, 115, 110, 90, 300)     # Loamy (default)
+]
+
+
+def colours(brightness):
+    """Samples around every colour and variance threshold at one brightness"""
+    for r, variance in itertools.product(RED_VALUES, VARIANCE):
+        # Green at, just above and just below red / 1.3
+        for g in (r / 1.3, r / 1.3 - 0.1, r / 1.3 + 0.1):
+            yield r, g, 90.0, brightness, variance
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return get_knowledge_base().engine
+
+
+@pytest.mark.parametrize('brightness', BRIGHTNESS)
+def test_soil_thresholds_match_the_scalar_reference(engine, brightness):
+    for colour in colours(brightness):
+        soil_type, _, crops = engine.classify(*colour, 28.0, 900.0)
+        assert (soil_type, crops) == reference_classify(*colour, 28.0, 900.0), colour
+
+
+@pytest.mark.parametrize('colour', RULE_SAMPLES)
+def test_climate_thresholds_match_the_scalar_reference(engine, colour):
+    for temperature, rainfall in CLIMATE:
+        soil_type, _, crops = engine.classify(*colour, temperature, rainfall)
+        assert (soil_type, crops) == reference_classify(*colour, temperature, rainfall), (temperature, rainfall)
+
+
+def test_batches_match_the_scalar_reference(engine):
+    rows = [colour + climate for brightness in BRIGHTNESS for colour in colours(brightness) for climate in CLIMATE]
+    result = engine.evaluate(*np.array(rows).T)
+    for sample, row in enumerate(rows):
+        soil_type, crops = reference_classify(*row)
+        assert engine.soil_types[result.soil_index[sample]] == soil_type, row
+        assert engine.crops_for(result, sample) == crops, row
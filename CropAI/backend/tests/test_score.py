@@ -0,0 +1,90 @@
+"""
+Offline scoring: output formats and resuming an interrupted run
+"""
+
+import csv
+import json
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pytest
+
+import score
+
+
+@pytest.fixture
+def photos(tmp_path, soil_jpeg):
+    folder = tmp_path / 'photos'
+    (folder / 'north').mkdir(parents=True)
+    (folder / 'north' / 'a.jpg').write_bytes(soil_jpeg)
+    (folder / 'b.jpg').write_bytes(soil_jpeg)
+    (folder / 'broken.jpg').write_bytes(b'\xff\xd8\xff not really a jpeg')
+    (folder / 'notes.txt').write_text('not an image')
+    return folder
+
+
+def run(monkeypatch, source, output, *options):
+    monkeypatch.setattr(sys, 'argv', ['score.py', str(source), '-o', str(output), '--workers', '0', *options])
+    score.main()
+
+
+def read_rows(output, output_format):
+    """(name, status) of every row in the order written"""
+    if output_format == 'jsonl':
+        with open(output, encoding='utf-8') as f:
+            return [(row['name'], row['status']) for row in map(json.loads, f)]
+    if output_format == 'csv':
+        with open(output, newline='', encoding='utf-8') as f:
+            return [(row['name'], row['status']) for row in csv.DictReader(f)]
+    rows = []
+    for filename in sorted(os.listdir(output)):
+        path = os.path.join(output, filename)
+        if filename.endswith('.parquet'):
+            table = score.parquet.read_table(path, columns=['name', 'status']).to_pylist()
+            rows += [(row['name'], row['status']) for row in table]
+        else:
+            with np.load(path) as part:
+                rows += list(zip(part['name'].tolist(), part['status'].tolist()))
+    return rows
+
+
+@pytest.mark.parametrize('output_format, output_name', [
+    ('jsonl', 'scores.jsonl'), ('csv', 'scores.csv'), ('columnar', 'scores')
+])
+def test_resume_skips_scored_images_and_retries_failures(monkeypatch, tmp_path, photos, output_format,
+                                                         output_name):
+    output = tmp_path / output_name
+    run(monkeypatch, photos, output)
+    first = read_rows(output, output_format)
+    assert first == [('b.jpg', 'success'), ('broken.jpg', 'error'), ('north/a.jpg', 'success')]
+
+    # Scored images are not even read again; the failed one is retried
+    opened = []
+
+    def tracking_open(path, *args, **kwargs):
+        opened.append(str(path))
+        return open(path, *args, **kwargs)
+
+    monkeypatch.setattr(score, 'open', tracking_open, raising=False)
+    run(monkeypatch, photos, output)
+    assert [path for path in opened if path.startswith(str(photos))] == [str(photos / 'broken.jpg')]
+    assert read_rows(output, output_format) == first + [('broken.jpg', 'error')]
+
+
+def test_interrupted_lines_are_dropped_on_resume(tmp_path):
+    output = tmp_path / 'scores.jsonl'
+    output.write_text('{"name":"a.jpg","status":"success"}\n{"name":"b.jpg","sta')
+    writer = score.JsonlWriter(str(output))
+    writer.close()
+    assert writer.done == {'a.jpg'}
+    assert output.read_text() == '{"name":"a.jpg","status":"success"}\n'
+
+
+def test_skipped_archive_members_are_not_yielded(tmp_path, soil_jpeg):
+    archive = tmp_path / 'photos.zip'
+    with zipfile.ZipFile(archive, 'w') as f:
+        f.writestr('a.jpg', soil_jpeg)
+        f.writestr('b.jpg', soil_jpeg)
+    assert [name for name, _ in score.iter_source(str(archive), {'a.jpg'})] == ['b.jpg']
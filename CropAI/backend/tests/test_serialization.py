@@ -0,0 +1,55 @@
+"""
+The compact response schema round-trips to the full response
+"""
+
+import io
+import json
+import os
+import re
+
+from serialization import COMPACT_DROPPED, COMPACT_JSON, COMPACT_NAMES, compact, expand
+
+API_JS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'frontend', 'js', 'api.js')
+
+
+def without(obj, keys):
+    """obj with the given keys removed at every level"""
+    if isinstance(obj, dict):
+        return {key: without(value, keys) for key, value in obj.items() if key not in keys}
+    if isinstance(obj, list):
+        return [without(value, keys) for value in obj]
+    return obj
+
+
+def analyses(client, soil_jpeg, accept='application/json'):
+    def soil_image():
+        return io.BytesIO(soil_jpeg), 'field.jpg'
+
+    single = client.post('/api/analyze', headers={'Accept': accept}, content_type='multipart/form-data',
+                         data={'soil_image': soil_image(), 'location': 'Pune', 'season': 'kharif'})
+    batch = client.post('/api/analyze/batch', headers={'Accept': accept}, content_type='multipart/form-data',
+                        data={'soil_images': [soil_image(), (io.BytesIO(b'not an image'), 'bad.jpg')],
+                              'season': 'rabi'})
+    assert single.status_code == batch.status_code == 200
+    return [single, batch]
+
+
+def test_expand_undoes_compact(client, soil_jpeg):
+    for response in analyses(client, soil_jpeg):
+        full = response.get_json()
+        assert expand(compact(full)) == without(full, COMPACT_DROPPED)
+
+
+def test_compact_responses_expand_to_full_responses(client, soil_jpeg):
+    # Only the timestamp differs between the two requests
+    volatile = COMPACT_DROPPED | {'timestamp'}
+    for full, short in zip(analyses(client, soil_jpeg), analyses(client, soil_jpeg, COMPACT_JSON)):
+        assert short.mimetype == COMPACT_JSON
+        assert without(expand(json.loads(short.data)), volatile) == without(full.get_json(), volatile)
+
+
+def test_frontend_expands_the_same_keys():
+    with open(API_JS, encoding='utf-8') as f:
+        source = f.read()
+    table = re.search(r'const COMPACT_KEYS = \{(.*?)\};', source, re.S).group(1)
+    assert dict(re.findall(r"(\w+): '(\w+)'", table)) == COMPACT_NAMES
@@ -0,0 +1,16 @@
+"""
+Texture descriptors of images of any shape
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from texture import FEATURE_LENGTH, describe_image
+
+
+@pytest.mark.parametrize('size', [(1, 1), (3, 2), (16, 4000), (4000, 16), (300, 200)])
+def test_tiny_and_thin_images_have_a_descriptor(size):
+    descriptor = describe_image(Image.new('RGB', size, (120, 90, 60)))
+    assert descriptor.shape == (FEATURE_LENGTH,)
+    assert np.isfinite(descriptor).all()
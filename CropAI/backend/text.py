@@ -0,0 +1,17 @@
+"""
+Text normalization for AI Crop Recommendation System
+
+Shared by the location index (locations.py, build_locations.py) and the
+crop search (catalog.py) without importing NumPy.
+"""
+
+import re
+import unicodedata
+
+_NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text):
+    """Lowercase ASCII form used for keys and queries ("Tiruchirāppalli" -> "tiruchirappalli")"""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    return _NON_ALPHANUMERIC.sub(' ', text.lower()).strip()
@@ -0,0 +1,213 @@
+"""
+Texture and colour descriptors for AI Crop Recommendation System
+
+The mean-colour features in features.py say little about how a soil
+looks, only what its average colour is. This module describes an image
+with a fixed-length float32 vector for the classifier:
+
+    rgb_*        mean and standard deviation of R, G, B         (6)
+    hsv_*        hue, saturation and value histograms            (20)
+    lab_*        CIE Lab mean, standard deviation, histograms    (30)
+    tile_*       per-tile mean and std of lightness (4x4 grid)   (34)
+    grad_*       gradient energy and edge density                (4)
+
+Everything is computed on a working copy whose longest side is resized
+to TEXTURE_SIDE pixels, so the cost per image is close to constant.
+Only the box reduction scales with input size; a 1 MP image takes about
+10 ms on one core, within TEXTURE_BUDGET_MS.
+Values are scaled to roughly [0, 1].
+"""
+
+import numpy as np
+from PIL import Image
+
+from features import channel_histograms
+
+# Longest side of the working copy the descriptors are computed on
+TEXTURE_SIDE = 256
+
+# Per-image time budget checked by benchmarks/bench.py (1 MP, one core)
+TEXTURE_BUDGET_MS = 20
+
+# Histogram bins per channel
+HUE_BINS = 12
+SATURATION_BINS = 4
+VALUE_BINS = 4
+LAB_BINS = 8
+
+# Tile grid for local statistics (rows, columns)
+TILE_GRID = (4, 4)
+
+# Lightness step (Lab L units per pixel) counted as an edge
+EDGE_THRESHOLD = 8.0
+
+# Histogram ranges for a* and b*; soils sit in the warm quadrant
+LAB_A_RANGE = (-32.0, 48.0)
+LAB_B_RANGE = (-16.0, 64.0)
+
+# sRGB (D65) to XYZ, with the white point folded in
+_RGB_TO_XYZ = (np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041]
+]) / np.array([[0.95047], [1.0], [1.08883]])).T.astype(np.float32)
+
+# sRGB gamma decoding for every 8-bit value
+_SRGB_TO_LINEAR = np.where(
+    np.arange(256) / 255.0 <= 0.04045,
+    np.arange(256) / 255.0 / 12.92,
+    ((np.arange(256) / 255.0 + 0.055) / 1.055) ** 2.4
+).astype(np.float32)
+
+
+def _feature_names():
+    names = [f'rgb_mean_{c}' for c in 'rgb'] + [f'rgb_std_{c}' for c in 'rgb']
+    names += [f'hsv_h_{i}' for i in range(HUE_BINS)]
+    names += [f'hsv_s_{i}' for i in range(SATURATION_BINS)]
+    names += [f'hsv_v_{i}' for i in range(VALUE_BINS)]
+    names += [f'lab_mean_{c}' for c in 'lab'] + [f'lab_std_{c}' for c in 'lab']
+    for channel in 'lab':
+        names += [f'lab_{channel}_{i}' for i in range(LAB_BINS)]
+    rows, cols = TILE_GRID
+    names += [f'tile_mean_{i}_{j}' for i in range(rows) for j in range(cols)]
+    names += [f'tile_std_{i}_{j}' for i in range(rows) for j in range(cols)]
+    names += ['tile_mean_spread', 'tile_std_mean']
+    names += ['grad_x', 'grad_y', 'grad_energy', 'edge_density']
+    return names
+
+
+# Name of every position in the feature vector, in order
+FEATURE_NAMES = tuple(_feature_names())
+FEATURE_LENGTH = len(FEATURE_NAMES)
+
+
+def working_image(img, side=TEXTURE_SIDE):
+    """
+    Resize an opened PIL image so its longest side is exactly `side` pixels, in RGB
+    A fixed working size keeps texture measures comparable across input
+    resolutions; smaller images are used as they are. Either side is
+    stretched to at least the tile grid, so every tile has a pixel however
+    thin or tiny the image.
+    """
+    width, height = img.size
+    scale = min(1.0, side / max(width, height))
+    rows, cols = TILE_GRID
+    size = (max(cols, round(width * scale)), max(rows, round(height * scale)))
+    if size != img.size:
+        img = img.resize(size, Image.BOX, reducing_gap=2.0 if scale < 1 else None)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+
+def _histogram(indices, bins):
+    """Normalised histogram of precomputed bin indices"""
+    counts = np.bincount(indices.ravel(), minlength=bins)[:bins]
+    return counts / max(indices.size, 1)
+
+
+def _quantize(values, low, high, bins):
+    """Map values in [low, high] to bin indices 0..bins-1"""
+    scaled = (values - low) * (bins / (high - low))
+    return np.clip(scaled, 0, bins - 1).astype(np.intp)
+
+
+def rgb_to_lab(rgb):
+    """Convert an (..., 3) uint8 sRGB array to float32 CIE Lab"""
+    xyz = _SRGB_TO_LINEAR[rgb] @ _RGB_TO_XYZ
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), xyz * 7.787 + 16.0 / 116.0)
+    lab = np.empty_like(f)
+    lab[..., 0] = 116.0 * f[..., 1] - 16.0
+    lab[..., 1] = 500.0 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200.0 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+def tile_statistics(values, grid=TILE_GRID):
+    """
+    Mean and standard deviation of a 2-D array over a grid of tiles
+    Uses integral images, so the cost does not depend on the tile count.
+    Returns: (means, stds), each of shape grid
+    """
+    height, width = values.shape
+    rows, cols = grid
+    if height < rows or width < cols:
+        raise ValueError(f'Image is smaller than the {rows}x{cols} tile grid')
+
+    plain = np.zeros((height + 1, width + 1))
+    squared = np.zeros((height + 1, width + 1))
+    np.cumsum(np.cumsum(values, axis=0, dtype=np.float64), axis=1, out=plain[1:, 1:])
+    np.cumsum(np.cumsum(np.square(values, dtype=np.float64), axis=0), axis=1, out=squared[1:, 1:])
+
+    ys = np.linspace(0, height, rows + 1).astype(np.intp)
+    xs = np.linspace(0, width, cols + 1).astype(np.intp)
+    y0, y1 = ys[:-1, np.newaxis], ys[1:, np.newaxis]
+    x0, x1 = xs[np.newaxis, :-1], xs[np.newaxis, 1:]
+    area = (y1 - y0) * (x1 - x0)
+
+    def box_sum(table):
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+    means = box_sum(plain) / area
+    variances = np.maximum(box_sum(squared) / area - means ** 2, 0.0)
+    return means, np.sqrt(variances)
+
+
+def describe_array(rgb):
+    """
+    Compute the descriptor vector for an RGB uint8 array (already small)
+    Returns: float32 array of length FEATURE_LENGTH
+    """
+    rgb = np.ascontiguousarray(rgb[..., :3], dtype=np.uint8)
+    count = rgb.shape[0] * rgb.shape[1]
+    levels = np.arange(256)
+    histograms = channel_histograms(rgb)
+    rgb_mean = histograms @ levels / count
+    rgb_var = histograms @ np.square(levels) / count - np.square(rgb_mean)
+    parts = [rgb_mean / 255.0, np.sqrt(np.maximum(rgb_var, 0.0)) / 255.0]
+
+    hsv = np.asarray(Image.fromarray(rgb).convert('HSV'))
+    parts.append(_histogram((hsv[..., 0].astype(np.uint16) * HUE_BINS) >> 8, HUE_BINS))
+    parts.append(_histogram((hsv[..., 1].astype(np.uint16) * SATURATION_BINS) >> 8, SATURATION_BINS))
+    parts.append(_histogram((hsv[..., 2].astype(np.uint16) * VALUE_BINS) >> 8, VALUE_BINS))
+
+    lab = rgb_to_lab(rgb)
+    # Column reductions of an (N, 3) array are slow in numpy; a matrix-vector
+    # product with a vector of ones does the same sums through BLAS
+    lab_pixels = lab.reshape(-1, 3)
+    weights = np.full(count, 1.0 / count, dtype=np.float32)
+    lab_mean = weights @ lab_pixels
+    lab_std = np.sqrt(weights @ np.square(lab_pixels - lab_mean))
+    lab_scale = np.array([100.0, 128.0, 128.0], dtype=np.float32)
+    parts += [lab_mean / lab_scale, lab_std / lab_scale]
+    lightness = lab[..., 0]
+    parts.append(_histogram(_quantize(lightness, 0.0, 100.0, LAB_BINS), LAB_BINS))
+    parts.append(_histogram(_quantize(lab[..., 1], *LAB_A_RANGE, LAB_BINS), LAB_BINS))
+    parts.append(_histogram(_quantize(lab[..., 2], *LAB_B_RANGE, LAB_BINS), LAB_BINS))
+
+    means, stds = tile_statistics(lightness)
+    parts += [means.ravel() / 100.0, stds.ravel() / 100.0]
+    parts.append([means.std() / 100.0, stds.mean() / 100.0])
+
+    grad_x = np.abs(np.diff(lightness, axis=1))
+    grad_y = np.abs(np.diff(lightness, axis=0))
+    energy = (np.square(grad_x[:-1]) + np.square(grad_y[:, :-1])).mean()
+    edges = (np.maximum(grad_x[:-1], grad_y[:, :-1]) > EDGE_THRESHOLD).mean()
+    parts.append([grad_x.mean() / 100.0, grad_y.mean() / 100.0, energy / 1000.0, edges])
+
+    return np.concatenate([np.ravel(part) for part in parts]).astype(np.float32)
+
+
+def describe_image(img, side=TEXTURE_SIDE):
+    """Compute the descriptor vector for an opened PIL image"""
+    return describe_array(np.asarray(working_image(img, side)))
+
+
+def texture_features_from_array(img_array, side=TEXTURE_SIDE):
+    """Compute the descriptor vector for a decoded image array of any size"""
+    img_array = np.asarray(img_array)
+    if img_array.dtype != np.uint8:
+        img_array = np.clip(img_array, 0, 255).astype(np.uint8)
+    if img_array.ndim == 2:
+        img_array = np.repeat(img_array[:, :, np.newaxis], 3, axis=2)
+    return describe_image(Image.fromarray(np.ascontiguousarray(img_array[:, :, :3])), side)
@@ -0,0 +1,175 @@
+"""
+Train the soil classifier used by classifier.py
+
+    python train_model.py --data /path/to/photos                  # -> models/soil_classifier
+    python train_model.py --data /path/to/photos --name soil_v2
+
+The data folder holds one sub-folder per soil type, named exactly as in
+the knowledge base soil rules (e.g. "Red Laterite Soil"), each containing
+labelled photos. Texture descriptors are extracted in parallel, a
+class-balanced multinomial logistic regression is fitted with NumPy, and
+the model is written with feature standardization folded into its weights.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from classifier import MODEL_FILE
+from config import Config
+from features import open_image
+from knowledge import get_knowledge_base
+from texture import FEATURE_NAMES, describe_image
+from utils import allowed_file
+
+def find_images(folder):
+    """
+    List labelled images as (path, soil type) from one sub-folder per soil type
+    Returns: (paths, labels, classes)
+    """
+    if not os.path.isdir(folder):
+        raise SystemExit(f'❌ {folder} is not a folder of labelled soil photos (one sub-folder per soil type)')
+
+    paths, labels = [], []
+    classes = sorted(entry for entry in os.listdir(folder) if os.path.isdir(os.path.join(folder, entry)))
+    for label, soil_type in enumerate(classes):
+        directory = os.path.join(folder, soil_type)
+        for filename in sorted(os.listdir(directory)):
+            if allowed_file(filename, Config.ALLOWED_EXTENSIONS):
+                paths.append(os.path.join(directory, filename))
+                labels.append(label)
+    return paths, np.array(labels, dtype=np.intp), classes
+
+
+def describe_file(path):
+    """Worker task: texture descriptor of one image file"""
+    return describe_image(open_image(path, Config.FEATURE_MAX_SIDE))
+
+
+def fit_logistic_regression(x, y, n_classes, epochs, learning_rate, l2):
+    """
+    Fit a class-balanced softmax regression by full-batch gradient descent
+    x must already be standardized.
+    Returns: (weights, bias)
+    """
+    n, n_features = x.shape
+    targets = np.eye(n_classes)[y]
+    counts = np.bincount(y, minlength=n_classes)
+    sample_weight = (n / (n_classes * np.maximum(counts, 1)))[y][:, np.newaxis] / n
+
+    weights = np.zeros((n_features, n_classes))
+    bias = np.zeros(n_classes)
+    for _ in range(epochs):
+        logits = x @ weights + bias
+        logits -= logits.max(axis=1, keepdims=True)
+        proba = np.exp(logits)
+        proba /= proba.sum(axis=1, keepdims=True)
+        error = (proba - targets) * sample_weight
+        weights -= learning_rate * (x.T @ error + l2 * weights)
+        bias -= learning_rate * error.sum(axis=0)
+    return weights, bias
+
+
+def split(labels, fraction, seed):
+    """Stratified train/validation split; returns index arrays"""
+    rng = np.random.default_rng(seed)
+    train, validation = [], []
+    for label in np.unique(labels):
+        members = rng.permutation(np.flatnonzero(labels == label))
+        cut = int(round(len(members) * fraction)) if len(members) > 1 else 0
+        validation.extend(members[:cut])
+        train.extend(members[cut:])
+    return np.array(train, dtype=np.intp), np.array(validation, dtype=np.intp)
+
+
+def accuracy(weights, bias, x, y):
+    if not len(y):
+        return None
+    return float(((x @ weights + bias).argmax(axis=1) == y).mean())
+
+
+def save_model(folder, name, classes, weights, bias, metrics):
+    """Write the model files; model.json is replaced last so readers never see a mix"""
+    os.makedirs(folder, exist_ok=True)
+    for filename, array in (('weights.npy', weights), ('bias.npy', bias)):
+        temporary = os.path.join(folder, f'.{filename}.tmp')
+        with open(temporary, 'wb') as f:
+            np.save(f, array.astype(np.float32))
+        os.replace(temporary, os.path.join(folder, filename))
+
+    meta = {
+        'name': name,
+        'version': time.strftime('%Y%m%d%H%M%S'),
+        'type': 'logistic_regression',
+        'classes': classes,
+        'feature_names': list(FEATURE_NAMES),
+        'metrics': metrics
+    }
+    temporary = os.path.join(folder, f'.{MODEL_FILE}.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(temporary, os.path.join(folder, MODEL_FILE))
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', required=True, help='folder with one sub-folder per soil type')
+    parser.add_argument('--models', default=Config.MODELS_FOLDER, help='models folder to write into')
+    parser.add_argument('--name', default=Config.SOIL_MODEL, help='model name (sub-folder of --models)')
+    parser.add_argument('--validation', type=float, default=0.2, help='held-out fraction per class')
+    parser.add_argument('--epochs', type=int, default=500)
+    parser.add_argument('--learning-rate', type=float, default=0.5)
+    parser.add_argument('--l2', type=float, default=1e-2)
+    parser.add_argument('--workers', type=int, default=None, help='decode processes (default: one per core)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    paths, labels, classes = find_images(args.data)
+    if len(classes) < 2 or not len(paths):
+        raise SystemExit(f'❌ Need labelled photos for at least two soil types in {args.data}')
+
+    known = set(get_knowledge_base().engine.soil_types)
+    for soil_type in classes:
+        if soil_type not in known:
+            print(f'⚠️  "{soil_type}" is not a soil type in the knowledge base; '
+                  f'predictions of it will fall back to the rules', file=sys.stderr)
+
+    print(f'🖼️  Extracting descriptors from {len(paths)} images in {len(classes)} classes...')
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        x = np.array(list(pool.map(describe_file, paths, chunksize=8)), dtype=np.float64)
+    print(f'   {len(paths) / (time.perf_counter() - started):.1f} images/sec')
+
+    train, validation = split(labels, args.validation, args.seed)
+    mean = x[train].mean(axis=0)
+    scale = x[train].std(axis=0)
+    scale[scale < 1e-6] = 1.0
+    standardized = (x - mean) / scale
+
+    weights, bias = fit_logistic_regression(
+        standardized[train], labels[train], len(classes), args.epochs, args.learning_rate, args.l2
+    )
+    metrics = {
+        'samples': int(len(paths)),
+        'per_class': {soil_type: int(count) for soil_type, count in zip(classes, np.bincount(labels, minlength=len(classes)))},
+        'train_accuracy': accuracy(weights, bias, standardized[train], labels[train]),
+        'validation_accuracy': accuracy(weights, bias, standardized[validation], labels[validation])
+    }
+
+    # Fold the standardization into the weights: ((x - mean) / scale) @ W + b
+    fused_weights = weights / scale[:, np.newaxis]
+    fused_bias = bias - (mean / scale) @ weights
+
+    meta = save_model(os.path.join(args.models, args.name), args.name, classes, fused_weights, fused_bias, metrics)
+    print(f"✅ Saved {meta['name']}@{meta['version']} to {os.path.abspath(os.path.join(args.models, args.name))}")
+    print(json.dumps(metrics, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Upload validation for AI Crop Recommendation System
+
+Uploads are checked from the cheapest signal to the most expensive one,
+so bad input is rejected before any pixel memory is allocated:
+
+1. Content-Length against MAX_CONTENT_LENGTH (before the body is parsed)
+2. File extension against ALLOWED_EXTENSIONS
+3. Magic bytes (first 16 bytes) against the allowed image formats
+4. Dimensions from the image header against MAX_IMAGE_PIXELS and, after
+   JPEG decode-time scaling is configured, against MAX_DECODE_PIXELS
+
+Werkzeug streams the multipart body and spools file parts larger than
+500 KB to a temporary file, so the upload itself never sits in memory.
+
+Peak memory per request is therefore bounded by roughly
+    500 KB                                   (in-memory upload spool)
+  + MAX_DECODE_PIXELS x 4 bytes              (decoded image, up to RGBA)
+  + MAX_DECODE_PIXELS x 4 / 4 bytes          (box-reduced copy, factor >= 2)
+  + STRIP_ROWS x 2 x FEATURE_MAX_SIDE x 48   (int64 strip buffers)
+which with the defaults (16 MP, 1024 px) is about 64 + 16 + 12 = 92 MB.
+"""
+
+import os
+import warnings
+
+from utils import allowed_file
+
+# Leading bytes of each accepted image format
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+    (b'BM', 'BMP')
+]
+
+# File extensions that may carry each format
+FORMAT_EXTENSIONS = {
+    'JPEG': {'jpg', 'jpeg'},
+    'PNG': {'png'},
+    'GIF': {'gif'},
+    'BMP': {'bmp'}
+}
+
+SNIFF_BYTES = 16
+
+
+class UploadError(Exception):
+    """An upload was rejected; carries the HTTP status to respond with"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def sniff_format(stream):
+    """Identify the image format from its magic bytes and rewind the stream"""
+    head = stream.read(SNIFF_BYTES)
+    stream.seek(0)
+    for signature, image_format in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    return None
+
+
+def stream_size(stream):
+    """Size in bytes of a seekable stream, leaving it rewound"""
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def open_upload(stream, filename, config):
+    """
+    Validate an uploaded image and open it without decoding any pixels
+    JPEG decode-time scaling to config.FEATURE_MAX_SIDE is already set up.
+    Returns: (image, source_size)
+    Raises: UploadError
+    """
+    # Pillow is imported by the first upload, not at startup
+    from PIL import Image
+    from features import draft_image
+
+    if not allowed_file(filename, config.ALLOWED_EXTENSIONS):
+        allowed = ', '.join(sorted(config.ALLOWED_EXTENSIONS))
+        raise UploadError(f'Unsupported file type. Allowed types: {allowed}', 415)
+
+    if stream_size(stream) > config.MAX_CONTENT_LENGTH:
+        raise UploadError(f'Image too large (maximum {config.MAX_CONTENT_LENGTH // (1024 * 1024)} MB)', 413)
+
+    image_format = sniff_format(stream)
+    allowed_extensions = {ext.lower() for ext in config.ALLOWED_EXTENSIONS}
+    if image_format is None or not FORMAT_EXTENSIONS[image_format] & allowed_extensions:
+        raise UploadError('File content is not a supported image format', 415)
+
+    # Image.open only parses the header; pixels are decoded on first access.
+    # Pillow's own bomb warning is redundant with the pixel budget below.
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            img = Image.open(stream, formats=[image_format])
+    except Image.DecompressionBombError:
+        raise UploadError('Image dimensions are too large', 413)
+    except Exception:
+        raise UploadError('Image file is corrupt or truncated', 400)
+
+    source_size = img.size
+    width, height = source_size
+    if width * height > config.MAX_IMAGE_PIXELS:
+        raise UploadError(
+            f'Image is {width}x{height}; the maximum is {config.MAX_IMAGE_PIXELS // 1000000} megapixels', 413
+        )
+    if min(width, height) < config.MIN_IMAGE_SIDE:
+        raise UploadError(
+            f'Image is {width}x{height}; it must be at least {config.MIN_IMAGE_SIDE} pixels on each side', 400
+        )
+
+    img = draft_image(img, config.FEATURE_MAX_SIDE)
+    decode_width, decode_height = img.size
+    if decode_width * decode_height > config.MAX_DECODE_PIXELS:
+        raise UploadError(
+            f'Image is {width}x{height}; {image_format} images larger than '
+            f'{config.MAX_DECODE_PIXELS // 1000000} megapixels are not supported', 413
+        )
+
+    return img, source_size
@@ -0,0 +1,20 @@
+"""
+WSGI entry point for production servers
+
+    gunicorn wsgi:app            (settings in gunicorn.conf.py)
+    waitress-serve wsgi:app      (Windows)
+
+The production configuration sets WARM_UP, so building the app loads
+everything a worker needs - NumPy, Pillow and its format plugins, the
+knowledge base, soil model and location index (see app.warm_up) - and with
+gunicorn's preload_app the master does this once and forked workers share
+the pages copy-on-write instead of each paying the import and memory cost.
+"""
+
+import os
+
+os.environ.setdefault('APP_ENV', 'production')
+
+from app import create_app  # noqa: E402
+
+app = create_app()
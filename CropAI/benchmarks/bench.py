@@ -0,0 +1,250 @@
+"""
+Benchmark suite for the soil analysis hot path
+
+    python benchmarks/bench.py                         # full run, JSON to stdout
+    python benchmarks/bench.py --quick -o results.json
+    python benchmarks/bench.py --compare baseline.json # exit 1 on regression
+
+Synthetic soil photos are generated at several resolutions and formats,
+then each stage is timed in isolation:
+
+    decode      open + decode-time downscale + pixel decode
+    features    colour statistics over the decoded image
+    texture     texture/colour descriptor vector (texture.py)
+    classify    soil rule engine and crop ranking
+    serialize   building the response and encoding it as JSON
+    end_to_end  POST /api/analyze through the Flask test client
+
+For every case the report holds p50/p95/p99 latency per stage, the peak
+memory traced by tracemalloc during one decode + features run, and the
+process max RSS. Compare mode flags any stage whose p50 or p95 is slower
+than the baseline by more than --threshold (default 20%).
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import PIL
+from PIL import Image
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+import app as backend  # noqa: E402
+from features import color_features_from_image, open_image  # noqa: E402
+from texture import TEXTURE_BUDGET_MS, describe_image  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# (label, width, height)
+RESOLUTIONS = [
+    ('0.3mp', 640, 480),
+    ('1mp', 1152, 864),
+    ('3mp', 2048, 1536),
+    ('12mp', 4000, 3000),
+    ('24mp', 6000, 4000),
+    ('48mp', 8000, 6000)
+]
+QUICK_RESOLUTIONS = ['0.3mp', '1mp', '3mp']
+FORMATS = ['JPEG', 'PNG']
+STAGES = ['decode', 'features', 'texture', 'classify', 'serialize', 'end_to_end']
+
+# Ignore differences below this many milliseconds when comparing
+NOISE_FLOOR_MS = 0.5
+
+
+def synthetic_soil(width, height, seed=0):
+    """A brown, textured soil-like RGB image built from a repeated tile"""
+    rng = np.random.default_rng(seed)
+    tile = 256
+    base = np.array([118, 88, 62], dtype=np.float32)
+    coarse = rng.normal(0, 12, size=(tile // 32, tile // 32, 1)).repeat(32, 0).repeat(32, 1)
+    fine = rng.normal(0, 18, size=(tile, tile, 3))
+    patch = np.clip(base + coarse + fine, 0, 255).astype(np.uint8)
+    reps = (-(-height // tile), -(-width // tile), 1)
+    return Image.fromarray(np.tile(patch, reps)[:height, :width])
+
+
+def encode(img, image_format):
+    """Encode an image to bytes in the given format"""
+    buffer = io.BytesIO()
+    if image_format == 'JPEG':
+        img.save(buffer, 'JPEG', quality=90)
+    else:
+        img.save(buffer, image_format, compress_level=1)
+    return buffer.getvalue()
+
+
+def percentiles(samples):
+    """Summarize timings (seconds) in milliseconds"""
+    ms = np.array(samples) * 1000
+    return {
+        'runs': len(samples),
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3)
+    }
+
+
+def max_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def bench_case(client, data, repeat, max_side):
+    """Time every stage for one encoded image"""
+    timings = {stage: [] for stage in STAGES}
+    inputs = backend.parse_farm_inputs({'season': 'kharif'})
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        img = open_image(io.BytesIO(data), max_side)
+        img.load()
+        timings['decode'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        features = color_features_from_image(img, max_side)
+        timings['features'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        describe_image(img)
+        timings['texture'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        backend.classify_soil(features['r'], features['g'], features['b'], features['brightness'],
+                              features['variance'], inputs['temperature'], inputs['rainfall'])
+        timings['classify'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        backend.encode_analysis(backend.build_analysis_response(inputs, features))
+        timings['serialize'].append(time.perf_counter() - start)
+
+        # Start from an empty result cache so every request does the full work
+        backend.result_cache.clear()
+        start = time.perf_counter()
+        response = client.post('/api/analyze', content_type='multipart/form-data', data={
+            'soil_image': (io.BytesIO(data), 'soil.jpg' if data[:2] == b'\xff\xd8' else 'soil.png')
+        })
+        timings['end_to_end'].append(time.perf_counter() - start)
+        status = response.status_code
+
+    tracemalloc.start()
+    color_features_from_image(open_image(io.BytesIO(data), max_side), max_side)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {stage: percentiles(samples) for stage, samples in timings.items()}
+    result['end_to_end']['status'] = status
+    result['texture']['budget_ms'] = TEXTURE_BUDGET_MS
+    result['encoded_bytes'] = len(data)
+    result['peak_traced_mb'] = round(peak / (1024 * 1024), 2)
+    result['max_rss_mb'] = max_rss_mb()
+    return result
+
+
+def run(app, resolutions, formats, repeat, max_side):
+    """Run every (resolution, format) case and return the full report"""
+    app.config['TESTING'] = True
+    client = app.test_client()
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'feature_max_side': max_side,
+            'repeat': repeat
+        },
+        'results': {}
+    }
+
+    for label, width, height in RESOLUTIONS:
+        if label not in resolutions:
+            continue
+        img = synthetic_soil(width, height)
+        for image_format in formats:
+            case = f'{image_format.lower()}_{label}'
+            print(f'⏱️  {case}', file=sys.stderr)
+            report['results'][case] = bench_case(client, encode(img, image_format), repeat, max_side)
+    return report
+
+
+def compare(report, baseline, threshold):
+    """
+    Compare a report against a baseline report
+    Returns: list of regression descriptions
+    """
+    regressions = []
+    for case, stages in report['results'].items():
+        base_stages = baseline.get('results', {}).get(case)
+        if base_stages is None:
+            continue
+        for stage in STAGES:
+            for metric in ('p50_ms', 'p95_ms'):
+                current = stages.get(stage, {}).get(metric)
+                previous = base_stages.get(stage, {}).get(metric)
+                if current is None or previous is None:
+                    continue
+                if current - previous > NOISE_FLOOR_MS and current > previous * (1 + threshold):
+                    regressions.append(
+                        f'{case} {stage} {metric}: {previous:.2f} -> {current:.2f} ms '
+                        f'(+{(current / previous - 1) * 100:.0f}%)'
+                    )
+    return regressions
+
+
+def main():
+    app = backend.create_app()
+    # Time the analysis alone, without the per-client rate limit
+    backend.rate_limiter = None
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='only resolutions up to 3 MP')
+    parser.add_argument('--sizes', nargs='+', choices=[label for label, _, _ in RESOLUTIONS])
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per case (default 10)')
+    parser.add_argument('--max-side', type=int, default=backend.settings.FEATURE_MAX_SIDE,
+                        help='feature extraction max side (0 = full resolution)')
+    parser.add_argument('-o', '--output', help='write the JSON report to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='baseline JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown ratio (default 0.2)')
+    args = parser.parse_args()
+
+    resolutions = args.sizes or (QUICK_RESOLUTIONS if args.quick else [label for label, _, _ in RESOLUTIONS])
+    report = run(app, resolutions, args.formats, args.repeat, args.max_side or None)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f'❌ Regression: {line}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print('✅ No regressions against baseline', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
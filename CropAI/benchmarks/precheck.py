@@ -0,0 +1,101 @@
+"""
+Benchmark for the image quality pre-check
+
+    python benchmarks/precheck.py               # 12 MP camera photos and 1024 px client uploads
+    python benchmarks/precheck.py --repeat 10 --sizes 12mp
+
+Builds a mixed corpus of synthetic photos: good soil, and soil that is
+blurry, too dark, overexposed or not soil at all (grass). Each photo is
+posted to /api/analyze through the Flask test client with
+QUALITY_CHECK on and off, with the result cache cleared before every
+request. The report gives the median latency and status of each photo in
+both modes, and the time for the whole corpus with and without the check.
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from bench import backend, encode, synthetic_soil
+
+# (label, width, height): a phone camera original, and what the browser uploads
+SIZES = [('12mp', 4000, 3000), ('1024px', 1024, 768)]
+
+
+def grass(width, height, seed=0):
+    """A green, textured photo of plants instead of soil"""
+    rng = np.random.default_rng(seed)
+    pixels = np.array([70, 130, 45], dtype=np.float32) + rng.normal(0, 20, size=(height, width, 3))
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def corpus(width, height):
+    """{name: JPEG bytes} of one good photo and one of each kind of bad photo"""
+    soil = synthetic_soil(width, height)
+    pixels = np.asarray(soil, dtype=np.float32)
+    photos = {
+        'good': soil,
+        'blurry': soil.filter(ImageFilter.GaussianBlur(max(width, height) / 100)),
+        'too_dark': Image.fromarray((pixels * 0.1).astype(np.uint8)),
+        'overexposed': Image.fromarray(np.clip(pixels * 2.6, 0, 255).astype(np.uint8)),
+        'not_soil': grass(width, height)
+    }
+    return {name: encode(img, 'JPEG') for name, img in photos.items()}
+
+
+def time_request(client, data, repeat):
+    """Median latency (ms) and status of posting one photo"""
+    samples = []
+    for _ in range(repeat):
+        backend.result_cache.clear()
+        start = time.perf_counter()
+        response = client.post('/api/analyze', content_type='multipart/form-data', data={
+            'soil_image': (io.BytesIO(data), 'soil.jpg')
+        })
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), response.status_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', choices=[label for label, _, _ in SIZES],
+                        default=[label for label, _, _ in SIZES])
+    parser.add_argument('--repeat', type=int, default=5, help='timed requests per photo and mode (default 5)')
+    args = parser.parse_args()
+
+    app = backend.create_app()
+    app.config['TESTING'] = True
+    client = app.test_client()
+    # Time the analysis alone: no rate limit, everything loaded up front
+    backend.rate_limiter = None
+    backend.warm_up()
+
+    for label, width, height in SIZES:
+        if label not in args.sizes:
+            continue
+        photos = corpus(width, height)
+        time_request(client, photos['good'], 1)
+        totals = {True: 0.0, False: 0.0}
+        print(f'⏱️  {label} ({width}x{height})')
+        print(f"   {'photo':12s} {'check on':>16s} {'check off':>16s}")
+        for name, data in photos.items():
+            results = {}
+            for enabled in (True, False):
+                backend.settings.QUALITY_CHECK = enabled
+                results[enabled] = time_request(client, data, args.repeat)
+                totals[enabled] += results[enabled][0]
+            print(f'   {name:12s} ' + ' '.join(
+                f'{ms:8.1f} ms ({status})' for ms, status in (results[True], results[False])))
+        saved = totals[False] - totals[True]
+        print(f'   corpus       {totals[True]:8.1f} ms       {totals[False]:8.1f} ms       '
+              f'saved {saved:.1f} ms ({saved / totals[False] * 100:.0f}%)')
+    backend.settings.QUALITY_CHECK = True
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Benchmark for the crop and variety search index
+
+    python benchmarks/search.py                   # 5000 extra varieties, exit 1 over budget
+    python benchmarks/search.py --varieties 20000 --repeat 500
+
+Adds synthetic varieties (breeder code prefixes, numbers and suffixes
+such as "Pusa-1234 Early") to every crop of the knowledge base catalog,
+builds the index (catalog.py) and times typeahead queries: single
+letters, prefixes, misspellings, several words, and soil type and season
+filters. The p95 of every query is compared with
+Config.CROP_SEARCH_BUDGET_MS unless --budget is given.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from catalog import CropCatalog  # noqa: E402
+from config import Config  # noqa: E402
+
+PREFIXES = ['Pusa', 'HD', 'Co', 'JS', 'Kadiri', 'DHM', 'Arka', 'GPU', 'CSH', 'Swarna', 'Sona', 'PBW', 'MACS',
+            'RHB', 'TAG', 'Hybrid', 'Super', 'Lok', 'VL', 'ML']
+SUFFIXES = ['', '', ' Gold', ' Early', ' Sub1']
+
+# (query, filters)
+QUERIES = [
+    ('p', {}),
+    ('s', {}),
+    ('ric', {}),
+    ('pusa', {}),
+    ('pusa 12', {}),
+    ('kadiri 4', {}),
+    ('grondnut', {}),
+    ('black', {}),
+    ('pu', {'season': 'kharif'}),
+    ('', {'soil': 'Clay Soil', 'season': 'rabi'})
+]
+
+
+def synthetic_catalog(data, varieties, seed=0):
+    """The knowledge base catalog with `varieties` made-up varieties spread over its crops"""
+    rng = random.Random(seed)
+    catalog = {crop: dict(spec, varieties=list(spec.get('varieties', ())))
+               for crop, spec in data['crop_catalog'].items()}
+    crops = list(catalog)
+    for i in range(varieties):
+        name = f'{rng.choice(PREFIXES)}-{rng.randint(1, 9999)}{rng.choice(SUFFIXES)}'
+        catalog[crops[i % len(crops)]]['varieties'].append(name)
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--varieties', type=int, default=5000, help='synthetic varieties to add (default 5000)')
+    parser.add_argument('--repeat', type=int, default=200, help='timed runs per query (default 200)')
+    parser.add_argument('--budget', type=float, default=Config.CROP_SEARCH_BUDGET_MS,
+                        help=f'p95 budget per query in ms (default {Config.CROP_SEARCH_BUDGET_MS})')
+    args = parser.parse_args()
+
+    with open(Config.KNOWLEDGE_BASE_PATH, encoding='utf-8') as f:
+        data = json.load(f)
+    catalog = synthetic_catalog(data, args.varieties)
+
+    start = time.perf_counter()
+    index = CropCatalog(catalog, data['soil_rules'], data['seasons'])
+    build_ms = (time.perf_counter() - start) * 1000
+    # Memory of a second build; tracing would distort the build time
+    tracemalloc.start()
+    CropCatalog(catalog, data['soil_rules'], data['seasons'])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'⏱️  {len(index)} crops and varieties: built in {build_ms:.0f} ms, {peak / 1e6:.1f} MB')
+    print(f"   {'query':28s} {'results':>7s} {'p50':>9s} {'p95':>9s}")
+
+    over = []
+    for query, filters in QUERIES:
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results = index.search(query, limit=10, **filters)
+            samples.append((time.perf_counter() - start) * 1000)
+        p50 = statistics.median(samples)
+        p95 = statistics.quantiles(samples, n=20)[-1]
+        label = ' '.join([repr(query)] + [f'{key}={value}' for key, value in filters.items()])
+        print(f'   {label:28s} {len(results):7d} {p50 * 1000:6.0f} us {p95 * 1000:6.0f} us')
+        if p95 > args.budget:
+            over.append(label)
+
+    if over:
+        print(f"❌ Over the {args.budget} ms budget: {', '.join(over)}", file=sys.stderr)
+        sys.exit(1)
+    print(f'✅ Every query within {args.budget} ms (p95)')
+
+
+if __name__ == '__main__':
+    main()
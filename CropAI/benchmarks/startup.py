@@ -0,0 +1,110 @@
+"""
+Cold start check for the backend
+
+    python benchmarks/startup.py                  # report, exit 1 over budget
+    python benchmarks/startup.py --budget 300 --runs 9
+
+Starts a fresh interpreter with ``python -X importtime`` several times.
+Each run imports app, calls create_app() (WARM_UP off) and requests
+/api/health. From the import time log it takes the cumulative time of the
+app module, the median over all runs is compared with the budget
+(Config.STARTUP_IMPORT_BUDGET_MS unless --budget is given), and the
+slowest modules imported by app are listed. The check also fails if any
+module that should load on first use (NumPy, Pillow, the knowledge base,
+soil model or location index) was imported by then.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from config import Config  # noqa: E402
+
+# Modules that must not be imported until a request needs them
+DEFERRED_MODULES = ['numpy', 'PIL.Image', 'features', 'knowledge', 'classifier', 'locations', 'planner']
+
+# Run in the child interpreter; prints the deferred modules that did load
+CHILD = '''
+import json, sys
+from app import create_app
+create_app().test_client().get('/api/health')
+print(json.dumps([name for name in %r if name in sys.modules]))
+''' % (DEFERRED_MODULES,)
+
+# "import time:  self [us] | cumulative | imported package", nesting by indent
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def measure():
+    """
+    One cold start in a fresh interpreter
+    Returns: (app cumulative import ms, {module imported by app: cumulative ms}, deferred modules loaded)
+    """
+    env = dict(os.environ, WARM_UP='0', LOG_LEVEL='WARNING')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD], cwd=BACKEND_DIR, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f'Startup failed:\n{proc.stderr}')
+
+    # A module's children are logged before it, one indent level deeper
+    total, modules, children = None, {}, {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), (len(match.group(3)) - 1) // 2, match.group(4)
+        if depth == 1:
+            children[name] = cumulative
+        elif depth == 0:
+            if name == 'app':
+                total, modules = cumulative, children
+            children = {}
+    if total is None:
+        raise RuntimeError('app was not found in the import time log')
+    return total / 1000, {name: us / 1000 for name, us in modules.items()}, json.loads(proc.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='cold starts to take the median of (default 5)')
+    parser.add_argument('--budget', type=float, default=Config.STARTUP_IMPORT_BUDGET_MS,
+                        help=f'import time budget in ms (default {Config.STARTUP_IMPORT_BUDGET_MS})')
+    parser.add_argument('--top', type=int, default=8, help='slowest imports to list (default 8)')
+    args = parser.parse_args()
+
+    totals, slowest, loaded = [], {}, set()
+    for _ in range(args.runs):
+        total, modules, deferred = measure()
+        totals.append(total)
+        loaded.update(deferred)
+        for name, ms in modules.items():
+            slowest.setdefault(name, []).append(ms)
+
+    median = statistics.median(totals)
+    print(f'⏱️  import app: median {median:.1f} ms over {args.runs} runs '
+          f'(min {min(totals):.1f}, max {max(totals):.1f}; budget {args.budget:.0f} ms)')
+    ranked = sorted(((statistics.median(times), name) for name, times in slowest.items()), reverse=True)
+    for ms, name in ranked[:args.top]:
+        print(f'   {ms:8.1f} ms  {name}')
+
+    failed = False
+    if loaded:
+        print(f"❌ Imported before first use: {', '.join(sorted(loaded))}", file=sys.stderr)
+        failed = True
+    if median > args.budget:
+        print(f'❌ Startup over budget: {median:.1f} ms > {args.budget:.0f} ms', file=sys.stderr)
+        failed = True
+    if failed:
+        sys.exit(1)
+    print('✅ Startup within budget')
+
+
+if __name__ == '__main__':
+    main()
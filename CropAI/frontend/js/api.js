@@ -3,9 +3,62 @@
  * Handles all backend API calls
  */
 
+// Compact response schema (see backend/serialization.py): short key -> full key
+const COMPACT_MEDIA_TYPE = 'application/vnd.cropai.compact+json';
+const COMPACT_KEYS = {
+    st: 'status', ts: 'timestamp', sa: 'soil_analysis', t: 'soil_type', c: 'confidence',
+    m: 'classifier', rgb: 'rgb_values', br: 'brightness', rc: 'recommended_crops', n: 'name',
+    s: 'suitability', y: 'yield', d: 'duration', p: 'profit', v: 'varieties', f: 'fertilizer', N: 'nitrogen',
+    P: 'phosphorus', K: 'potassium', o: 'organic', tm: 'timing', b0: 'basal', b1: 'first_top',
+    b2: 'second_top', ir: 'irrigation', fq: 'frequency', me: 'method', w: 'water_requirement',
+    cs: 'critical_stages', tp: 'tips', rs: 'results', i: 'index', fn: 'filename', e: 'error',
+    nc: 'count', ok: 'succeeded', ko: 'failed'
+};
+
+// Consecutive failed chunk requests before a resumable upload gives up
+const UPLOAD_MAX_RETRIES = 5;
+
 const API = {
     baseURL: window.location.origin,
     
+    // Upload preferences from /api/uploads/config (a promise, fetched once)
+    uploadConfig: null,
+    
+    // Image preparation worker and its pending requests
+    imageWorker: null,
+    imageJobs: new Map(),
+    imageJobId: 0,
+    preparedImages: new WeakMap(),
+    
+    /**
+     * Expand a compact-schema value back to full key names
+     * @param {*} value - Parsed compact JSON
+     */
+    expandCompact(value) {
+        if (Array.isArray(value)) {
+            return value.map(item => this.expandCompact(item));
+        }
+        if (value && typeof value === 'object') {
+            const expanded = {};
+            for (const [key, item] of Object.entries(value)) {
+                expanded[COMPACT_KEYS[key] || key] = this.expandCompact(item);
+            }
+            return expanded;
+        }
+        return value;
+    },
+
+    /**
+     * Parse a response negotiated with the compact schema
+     * (the browser undoes gzip/brotli compression itself)
+     * @param {Response} response - fetch response
+     */
+    async readResponse(response) {
+        const data = await response.json();
+        const type = response.headers.get('Content-Type') || '';
+        return type.startsWith(COMPACT_MEDIA_TYPE) ? this.expandCompact(data) : data;
+    },
+    
     /**
      * Check API health status
      */
@@ -21,6 +74,127 @@ const API = {
         }
     },
 
+    /**
+     * How the server wants images prepared and sent (null if unavailable)
+     */
+    getUploadConfig() {
+        if (!this.uploadConfig) {
+            this.uploadConfig = fetch(`${this.baseURL}/api/uploads/config`)
+                .then(response => (response.ok ? response.json() : null))
+                .catch(() => null);
+        }
+        return this.uploadConfig;
+    },
+
+    /**
+     * Shrink an image to the server's analysis size, apply its EXIF
+     * orientation and re-encode it, in a Web Worker
+     * Resolves to the original file when it is already suitable or the
+     * browser cannot do this off the main thread. Repeated calls for the
+     * same file share one result, so this can start as soon as a photo is picked.
+     * @param {File} file - The selected image
+     */
+    prepareImage(file) {
+        if (!this.preparedImages.has(file)) {
+            this.preparedImages.set(file, this.shrinkImage(file).catch(error => {
+                console.warn('⚠️ Image preparation failed, sending the original:', error);
+                return file;
+            }));
+        }
+        return this.preparedImages.get(file);
+    },
+
+    async shrinkImage(file) {
+        const config = await this.getUploadConfig();
+        if (!config || typeof Worker === 'undefined' || typeof OffscreenCanvas === 'undefined') {
+            return file;
+        }
+        if (!this.imageWorker) {
+            this.imageWorker = new Worker('js/image-worker.js');
+            this.imageWorker.onmessage = (event) => {
+                const job = this.imageJobs.get(event.data.id);
+                this.imageJobs.delete(event.data.id);
+                if (job) {
+                    event.data.error ? job.reject(new Error(event.data.error)) : job.resolve(event.data);
+                }
+            };
+        }
+        
+        const id = ++this.imageJobId;
+        const result = await new Promise((resolve, reject) => {
+            this.imageJobs.set(id, { resolve, reject });
+            this.imageWorker.postMessage({
+                id, file, maxSide: config.max_side, type: config.format, quality: config.quality
+            });
+        });
+        if (!result.blob) {
+            return file;
+        }
+        
+        // The server checks the extension against the content
+        const name = file.name.replace(/\.[^.]*$/, '') + '.jpg';
+        console.log(`📐 Prepared ${name}: ${result.width}x${result.height}, ` +
+                    `${Math.round(file.size / 1024)} KB -> ${Math.round(result.blob.size / 1024)} KB`);
+        return new File([result.blob], name, { type: result.blob.type });
+    },
+
+    /**
+     * Send a file in chunks, resuming from the last stored byte after a
+     * dropped connection
+     * @param {File} file - The (prepared) image
+     * @param {number} chunkSize - Bytes per request
+     * @returns {string} upload_id for /api/analyze
+     */
+    async uploadResumable(file, chunkSize) {
+        const created = await fetch(`${this.baseURL}/api/uploads`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, size: file.size })
+        });
+        const session = await created.json();
+        if (!created.ok) {
+            throw new Error(session.error || 'Upload failed');
+        }
+        
+        const url = `${this.baseURL}/api/uploads/${session.upload_id}`;
+        let offset = 0;
+        let failures = 0;
+        while (offset < file.size) {
+            let response;
+            try {
+                response = await fetch(url, {
+                    method: 'PATCH',
+                    headers: {
+                        'Upload-Offset': String(offset),
+                        'Content-Type': 'application/offset+octet-stream'
+                    },
+                    body: file.slice(offset, offset + chunkSize)
+                });
+            } catch (error) {
+                // Connection dropped: wait, then ask how much arrived
+                if (++failures > UPLOAD_MAX_RETRIES) {
+                    throw error;
+                }
+                console.warn(`⚠️ Upload interrupted at ${offset} bytes, retrying...`);
+                await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** (failures - 1)));
+                const status = await fetch(url).then(r => (r.ok ? r.json() : null)).catch(() => null);
+                if (status) {
+                    offset = status.offset;
+                }
+                continue;
+            }
+            
+            const data = await response.json();
+            // 409 carries the offset the server has, to continue from
+            if (!response.ok && response.status !== 409) {
+                throw new Error(data.error || 'Upload failed');
+            }
+            offset = data.offset;
+            failures = 0;
+        }
+        return session.upload_id;
+    },
+
     /**
      * Analyze soil image and get crop recommendations
      * @param {File} imageFile - The soil image file
@@ -28,26 +202,39 @@ const API = {
      */
     async analyzeSoil(imageFile, farmData) {
         try {
+            // Send the shrunken image; large ones go up in resumable chunks
+            const image = await this.prepareImage(imageFile);
+            const config = await this.getUploadConfig();
+            
             // Create FormData object
             const formData = new FormData();
-            formData.append('soil_image', imageFile);
+            if (config && image.size > config.chunk_size) {
+                formData.append('upload_id', await this.uploadResumable(image, config.chunk_size));
+            } else {
+                formData.append('soil_image', image);
+            }
             formData.append('location', farmData.location);
             formData.append('season', farmData.season);
-            formData.append('temperature', farmData.temperature);
-            formData.append('rainfall', farmData.rainfall);
-            formData.append('humidity', farmData.humidity);
+            // Climate fields left blank are filled in from the location's normals
+            ['temperature', 'rainfall', 'humidity'].forEach(field => {
+                if (Number.isFinite(farmData[field])) {
+                    formData.append(field, farmData[field]);
+                }
+            });
             
             if (farmData.previousCrop) {
                 formData.append('previous_crop', farmData.previousCrop);
             }
 
             console.log('📤 Sending analysis request...');
-            console.log('📸 Image:', imageFile.name);
+            console.log('📸 Image:', image.name);
             console.log('📍 Location:', farmData.location);
 
             // Make API call
+            // Ask for the compact schema: a smaller payload on slow links
             const response = await fetch(`${this.baseURL}/api/analyze`, {
                 method: 'POST',
+                headers: { 'Accept': `${COMPACT_MEDIA_TYPE}, application/json;q=0.9` },
                 body: formData
             });
 
@@ -57,7 +244,7 @@ const API = {
                 throw new Error(errorData.error || 'Analysis failed');
             }
 
-            const data = await response.json();
+            const data = await this.readResponse(response);
             console.log('✅ Analysis complete:', data);
             return data;
 
@@ -67,6 +254,25 @@ const API = {
         }
     },
 
+    /**
+     * Suggest districts for a partly typed location
+     * @param {string} query - Text typed so far
+     * @param {number} limit - Maximum suggestions
+     */
+    async searchLocations(query, limit = 8) {
+        try {
+            const params = new URLSearchParams({ q: query, limit });
+            const response = await fetch(`${this.baseURL}/api/locations?${params}`, {
+                headers: { 'Accept': `${COMPACT_MEDIA_TYPE}, application/json;q=0.9` }
+            });
+            const data = await this.readResponse(response);
+            return data.results || [];
+        } catch (error) {
+            console.error('❌ Location Search Failed:', error);
+            return [];
+        }
+    },
+
     /**
      * Validate image file
      * @param {File} file - Image file to validate
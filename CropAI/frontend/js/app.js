@@ -32,6 +32,7 @@ const elements = {
     // Form elements
     form: document.getElementById('farm-details-form'),
     locationInput: document.getElementById('location'),
+    locationSuggestions: document.getElementById('location-suggestions'),
     seasonInput: document.getElementById('season'),
     temperatureInput: document.getElementById('temperature'),
     rainfallInput: document.getElementById('rainfall'),
@@ -83,6 +84,9 @@ function initializeEventListeners() {
     // Form validation
     elements.form.addEventListener('input', validateForm);
     
+    // Location typeahead
+    elements.locationInput.addEventListener('input', suggestLocations);
+    
     // Drag and drop
     elements.uploadBox.addEventListener('dragover', handleDragOver);
     elements.uploadBox.addEventListener('drop', handleDrop);
@@ -120,6 +124,9 @@ function handleImageUpload(event) {
     // Store file
     selectedImage = file;
     
+    // Start shrinking it for upload while the farm details are filled in
+    API.prepareImage(file);
+    
     // Show preview
     const reader = new FileReader();
     reader.onload = (e) => {
@@ -171,15 +178,36 @@ function handleDrop(e) {
 }
 
 /**
- * Validate form
+ * Fill the location suggestions list as the user types
+ */
+let locationQuery = '';
+async function suggestLocations() {
+    const query = elements.locationInput.value.trim();
+    locationQuery = query;
+    if (query.length < 2) {
+        elements.locationSuggestions.innerHTML = '';
+        return;
+    }
+    
+    const results = await API.searchLocations(query);
+    if (query !== locationQuery) return;  // A newer query is on its way
+    
+    elements.locationSuggestions.innerHTML = '';
+    results.forEach(result => {
+        const option = document.createElement('option');
+        option.value = result.label;
+        option.textContent = result.match ? `${result.match} (${result.climate_region})` : result.climate_region;
+        elements.locationSuggestions.appendChild(option);
+    });
+}
+
+/**
+ * Validate form (climate fields are optional; the server fills them in)
  */
 function validateForm() {
     const isValid = 
         elements.locationInput.value.trim() !== '' &&
-        elements.seasonInput.value !== '' &&
-        elements.temperatureInput.value !== '' &&
-        elements.rainfallInput.value !== '' &&
-        elements.humidityInput.value !== '';
+        elements.seasonInput.value !== '';
     
     elements.analyzeBtn.disabled = !isValid;
     return isValid;
@@ -333,6 +361,11 @@ function createCropsCard(crops) {
                     <strong>Profit:</strong>
                     <span>${crop.profit}</span>
                 </div>
+                ${crop.varieties && crop.varieties.length ? `
+                <div class="crop-detail-item">
+                    <strong>Varieties:</strong>
+                    <span>${crop.varieties.join(', ')}</span>
+                </div>` : ''}
             </div>
         </div>
     `).join('');
@@ -0,0 +1,92 @@
+/**
+ * Image Preparation Worker
+ * Shrinks a photo to the size the server analyses, applies its EXIF
+ * orientation and re-encodes it, off the UI thread
+ *
+ * Message in:  { id, file, maxSide, type, quality }
+ * Message out: { id, blob, width, height, orientation } - blob is null when
+ *              the original file is already suitable - or { id, error }
+ */
+
+/**
+ * EXIF orientation (1-8) of a JPEG, 1 when absent
+ * @param {ArrayBuffer} buffer - The first bytes of the file
+ */
+function readOrientation(buffer) {
+    const view = new DataView(buffer);
+    if (view.byteLength < 4 || view.getUint16(0) !== 0xFFD8) {
+        return 1;
+    }
+    let offset = 2;
+    while (offset + 4 <= view.byteLength) {
+        const marker = view.getUint16(offset);
+        const length = view.getUint16(offset + 2);
+        // APP1 segment starting with "Exif\0\0"
+        if (marker === 0xFFE1 && offset + 10 <= view.byteLength && view.getUint32(offset + 4) === 0x45786966) {
+            const tiff = offset + 10;
+            const little = view.getUint16(tiff) === 0x4949;
+            const ifd = tiff + view.getUint32(tiff + 4, little);
+            if (ifd + 2 > view.byteLength) {
+                return 1;
+            }
+            const entries = view.getUint16(ifd, little);
+            for (let i = 0; i < entries; i++) {
+                const entry = ifd + 2 + i * 12;
+                if (entry + 10 > view.byteLength) {
+                    break;
+                }
+                if (view.getUint16(entry, little) === 0x0112) {
+                    const orientation = view.getUint16(entry + 8, little);
+                    return orientation >= 1 && orientation <= 8 ? orientation : 1;
+                }
+            }
+            return 1;
+        }
+        // Stop at start of scan, or anything that is not a marker
+        if ((marker & 0xFF00) !== 0xFF00 || marker === 0xFFDA) {
+            break;
+        }
+        offset += 2 + length;
+    }
+    return 1;
+}
+
+/**
+ * Shrink, orient and re-encode one image
+ */
+async function prepare({ file, maxSide, type, quality }) {
+    const orientation = readOrientation(await file.slice(0, 64 * 1024).arrayBuffer());
+
+    // The browser rotates and flips the pixels according to the EXIF tag
+    const bitmap = await createImageBitmap(file, { imageOrientation: 'from-image' });
+    const scale = maxSide ? Math.min(1, maxSide / Math.max(bitmap.width, bitmap.height)) : 1;
+    const width = Math.max(1, Math.round(bitmap.width * scale));
+    const height = Math.max(1, Math.round(bitmap.height * scale));
+
+    if (scale === 1 && orientation === 1 && file.type === type) {
+        bitmap.close();
+        return { blob: null, width, height, orientation };
+    }
+
+    const canvas = new OffscreenCanvas(width, height);
+    const context = canvas.getContext('2d');
+    context.imageSmoothingQuality = 'high';
+    context.drawImage(bitmap, 0, 0, width, height);
+    bitmap.close();
+
+    // The new JPEG has no EXIF, so nothing downstream rotates it again
+    const blob = await canvas.convertToBlob({ type, quality });
+    if (scale === 1 && orientation === 1 && blob.size >= file.size) {
+        return { blob: null, width, height, orientation };
+    }
+    return { blob, width, height, orientation };
+}
+
+self.onmessage = async (event) => {
+    const { id } = event.data;
+    try {
+        self.postMessage({ id, ...(await prepare(event.data)) });
+    } catch (error) {
+        self.postMessage({ id, error: error.message || String(error) });
+    }
+};